@@ -1,17 +1,50 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
 
 from jose import jwt
 from passlib.context import CryptContext
 
+from . import metrics
 from .config import settings
 
+T = TypeVar("T")
+
 pwd_context = CryptContext(
     schemes=["pbkdf2_sha256", "bcrypt"],
     deprecated="auto",
     pbkdf2_sha256__default_rounds=390000,
 )
 
+# pbkdf2 releases the GIL inside hashlib, so a small thread pool keeps hashing off the
+# event loop without the pickling overhead of a process pool.
+_hash_executor = (
+    ThreadPoolExecutor(max_workers=settings.hash_pool_workers, thread_name_prefix="pwhash")
+    if settings.hash_pool_workers > 0
+    else None
+)
+_hash_pending = 0
+# Bulk provisioning hashes thousands of passwords at once; the thread pool above is
+# sized for interactive logins, so imports get their own processes, started on first use.
+_bulk_hash_executor: Optional[ProcessPoolExecutor] = None
+
+hash_latency = metrics.histogram("password_hash_seconds", "Time spent hashing or verifying a password.")
+hash_wait = metrics.histogram("password_hash_wait_seconds", "Time a hash job waited for a pool worker.")
+bulk_hash_seconds = metrics.histogram(
+    "password_bulk_hash_seconds",
+    "Wall time to hash one bulk provisioning upload.",
+    buckets=(0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 900.0),
+)
+hash_rejected = metrics.counter("password_hash_rejected_total", "Hash jobs shed because the pool queue was full.")
+
+
+class HashPoolSaturated(RuntimeError):
+    pass
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -21,6 +54,95 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_hash_job(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_hash_job(get_password_hash, password)
+
+
+async def _run_hash_job(func: Callable[..., T], *args: Any) -> T:
+    global _hash_pending
+
+    if _hash_executor is None:
+        return _timed(func, time.perf_counter(), *args)
+    if _hash_pending >= settings.hash_pool_workers + settings.hash_queue_limit:
+        hash_rejected.inc()
+        raise HashPoolSaturated("Password hashing queue is full")
+
+    _hash_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, _timed, func, time.perf_counter(), *args)
+    finally:
+        _hash_pending -= 1
+
+
+def _timed(func: Callable[..., T], submitted: float, *args: Any) -> T:
+    started = time.perf_counter()
+    hash_wait.observe(started - submitted)
+    try:
+        return func(*args)
+    finally:
+        hash_latency.observe(time.perf_counter() - started)
+
+
+def hash_passwords(passwords: Sequence[str]) -> List[str]:
+    return [pwd_context.hash(password) for password in passwords]
+
+
+def bulk_hash_processes() -> int:
+    """``BULK_HASH_PROCESSES``, or this web worker's share of the cores when it is 0.
+
+    Every web worker has its own pool, so with ``WEB_WORKERS`` workers (0 = one per core)
+    each one gets ``cores // WEB_WORKERS`` processes and, at the default, just one.
+    """
+    if settings.bulk_hash_processes:
+        return settings.bulk_hash_processes
+    cores = os.cpu_count() or 1
+    return max(1, cores // (settings.web_workers or cores))
+
+
+async def hash_passwords_parallel(passwords: Sequence[str], processes: Optional[int] = None) -> List[str]:
+    """Hash ``passwords`` across ``processes`` worker processes (default: ``bulk_hash_processes()``).
+
+    The pool is created by the first call and keeps its size until
+    ``shutdown_bulk_hash_pool``. Work is sent in batches of ``BULK_HASH_BATCH_SIZE`` so
+    pickling stays negligible next to the hashing itself. The order of the result matches
+    ``passwords``.
+    """
+    global _bulk_hash_executor
+
+    if not passwords:
+        return []
+    if _bulk_hash_executor is None:
+        # spawn: forking a process that runs an event loop and thread pools is unsafe.
+        _bulk_hash_executor = ProcessPoolExecutor(
+            max_workers=processes or bulk_hash_processes(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    loop = asyncio.get_running_loop()
+    size = settings.bulk_hash_batch_size
+    started = time.perf_counter()
+    batches = await asyncio.gather(
+        *(
+            loop.run_in_executor(_bulk_hash_executor, hash_passwords, passwords[start : start + size])
+            for start in range(0, len(passwords), size)
+        )
+    )
+    bulk_hash_seconds.observe(time.perf_counter() - started)
+    return [hashed for batch in batches for hashed in batch]
+
+
+def shutdown_bulk_hash_pool() -> None:
+    global _bulk_hash_executor
+
+    if _bulk_hash_executor is not None:
+        _bulk_hash_executor.shutdown(cancel_futures=True)
+        _bulk_hash_executor = None
+
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes))
@@ -1,56 +1,294 @@
 from __future__ import annotations
 
-from typing import Dict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from sqlalchemy import select
+import numpy as np
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .models import InvoiceRow, Trip, Vendor
+from . import crud, idempotency, queries, reporting, rollup
+from .models import BillingJob, InvoiceRow, Trip, Vendor
+from .ratecard import RateCard, compile_rate_card, get_rate_card, get_rate_cards, rate_card_cache
+from .schemas import TripIn
 
 
 async def compute_trip_amount(vendor: Vendor, trip: Trip) -> float:
-    cfg: Dict[str, float] = vendor.billing_config or {}
-    model = vendor.billing_model
-    amount = 0.0
-
-    if model == "trip":
-        amount += trip.distance_km * cfg.get("per_km", 1.0)
-        amount += (trip.duration_minutes / 60) * cfg.get("per_hour", 0.0)
-        amount += trip.extra_km * cfg.get("extra_km_rate", 2.0)
-        amount += trip.extra_hours * cfg.get("extra_hour_rate", 5.0)
-    elif model == "package":
-        amount = cfg.get("monthly_cost", 1000.0)
-        amount += trip.extra_km * cfg.get("extra_km_rate", 2.0)
-    elif model == "hybrid":
-        base = cfg.get("monthly_cost", 500.0)
-        per_km = cfg.get("per_km", 1.0)
-        amount = base + (trip.distance_km * per_km)
-        amount += trip.extra_km * cfg.get("extra_km_rate", 2.0)
-    else:
-        amount = trip.distance_km * 1.0
-
-    return round(amount, 2)
+    return compile_rate_card(vendor).rate(trip)
 
 
-async def bill_trip_and_store(db: AsyncSession, trip: Trip) -> InvoiceRow:
-    vendor = await _get_vendor(db, trip.vendor_id)
+def rate_trip_arrays(
+    vendor: Vendor,
+    distance_km: np.ndarray,
+    duration_minutes: np.ndarray,
+    extra_km: np.ndarray,
+    extra_hours: np.ndarray,
+) -> np.ndarray:
+    # Vectorized twin of compute_trip_amount; every element matches the scalar result bit for bit.
+    return compile_rate_card(vendor).rate_arrays(distance_km, duration_minutes, extra_km, extra_hours)
+
+
+async def rerate_vendor_month(db: AsyncSession, vendor_id: int, year: int, month: int) -> Dict[str, Any]:
+    # Re-rating follows a config change, so the card is compiled from the row rather than the cache.
+    vendor = await _get_vendor(db, vendor_id)
     if not vendor:
         raise ValueError("Vendor not found")
+    card = compile_rate_card(vendor)
+    rate_card_cache.set(vendor_id, card)
+
+    month_start, month_end = reporting.month_bounds(year, month)
+    rows = (
+        await db.execute(
+            select(
+                InvoiceRow.id,
+                InvoiceRow.created_at,
+                Trip.distance_km,
+                Trip.duration_minutes,
+                func.coalesce(Trip.extra_km, 0.0),
+                func.coalesce(Trip.extra_hours, 0.0),
+            )
+            .join(Trip, Trip.id == InvoiceRow.trip_id)
+            .where(InvoiceRow.vendor_id == vendor_id)
+            # The month an invoice row belongs to is its created_at month, as in statements,
+            # rollups and archival; a trip billed after its month ends is re-rated with that one.
+            .where(InvoiceRow.created_at >= month_start)
+            .where(InvoiceRow.created_at < month_end)
+        )
+    ).all()
+
+    total = 0.0
+    if rows:
+        row_ids, created_at, distance_km, duration_minutes, extra_km, extra_hours = zip(*rows)
+        amounts = card.rate_arrays(
+            np.array(distance_km, dtype=np.float64),
+            np.array(duration_minutes, dtype=np.int64),
+            np.array(extra_km, dtype=np.float64),
+            np.array(extra_hours, dtype=np.float64),
+        )
+        await db.execute(
+            update(InvoiceRow),
+            [{"id": row_id, "amount": amount} for row_id, amount in zip(row_ids, amounts.tolist())],
+        )
+        first_day, last_day = min(created_at).date(), max(created_at).date()
+        await rollup.rebuild(db, vendor_id=vendor_id, start=first_day, end=last_day + timedelta(days=1))
+        await db.commit()
+        await reporting.invalidate_vendor_statements(vendor_id, [(year, month)])
+        reporting.invalidate_dashboard(vendor.tenant_id)
+        total = float(amounts.sum())
 
-    amount = await compute_trip_amount(vendor, trip)
+    return {"vendor_id": vendor_id, "year": year, "month": month, "rows": len(rows), "total": round(total, 2)}
+
+
+async def bill_trip_and_store(db: AsyncSession, trip: Trip) -> InvoiceRow:
+    card = await get_rate_card(db, trip.vendor_id)
+    if not card:
+        raise ValueError("Vendor not found")
+
+    amount = card.rate(trip)
     row = InvoiceRow(
         tenant_id=trip.tenant_id,
         vendor_id=trip.vendor_id,
         trip_id=trip.id,
         amount=amount,
         note="auto",
+        created_at=datetime.utcnow(),
     )
     db.add(row)
+    await rollup.apply_invoice_rows(db, [(row.tenant_id, row.vendor_id, row.created_at, amount)])
     await db.commit()
     await db.refresh(row)
+    await reporting.append_statement_rows([(row.id, row.vendor_id, row.trip_id, amount, row.note, row.created_at)])
+    reporting.invalidate_dashboard(row.tenant_id)
     return row
 
 
+async def ingest_trip(
+    db: AsyncSession, trip_in: TripIn, *, enqueue_billing: bool
+) -> Tuple[Trip, Optional[InvoiceRow], bool]:
+    """Create and bill one trip; returns ``(trip, invoice_row, replayed)``.
+
+    A trip whose ``external_id`` was already ingested for the vendor is returned with
+    its invoice row instead of being created again. Keys this process saw recently are
+    answered with one read; any other replay, including one racing the original
+    request, fails on the unique index and is answered from the existing row. A replayed
+    trip without an invoice row is billed, or queued, before it is returned. Raises
+    ValueError if the vendor does not exist in ``trip_in.tenant_id``.
+    """
+    card = await get_rate_card(db, trip_in.vendor_id)
+    if card is None or card.tenant_id != trip_in.tenant_id:
+        raise ValueError("Vendor not found")
+    key = idempotency.trip_key(trip_in.tenant_id, trip_in.vendor_id, trip_in.external_id)
+    trip_id = idempotency.recent_trip_id(key)
+    if trip_id is not None:
+        found = await crud.get_trip_with_invoice(db, trip_id)
+        if found is not None:
+            return found[0], found[1] or await _bill_once(db, found[0], enqueue_billing), True
+
+    try:
+        trip = await crud.create_trip(db, trip_in.model_dump(), enqueue_billing=enqueue_billing)
+    except IntegrityError:
+        await db.rollback()
+        existing = await crud.find_trips_by_external_id(db, [key]) if key is not None else {}
+        if key not in existing:
+            raise
+        trip_id = existing[key][0]
+        idempotency.remember(key, trip_id)
+        trip, invoice = await crud.get_trip_with_invoice(db, trip_id)
+        return trip, invoice or await _bill_once(db, trip, enqueue_billing), True
+
+    idempotency.remember(key, trip.id)
+    invoice = None if enqueue_billing else await _bill_once(db, trip, enqueue_billing=False)
+    return trip, invoice, False
+
+
+async def _bill_once(db: AsyncSession, trip: Trip, enqueue_billing: bool) -> Optional[InvoiceRow]:
+    # Bills (or queues) a trip that has no invoice row yet, e.g. a replay of one whose
+    # inline billing failed after the trip committed. The unique billing_jobs.trip_id
+    # lets one request do it: inline billing commits a "done" job with the invoice row,
+    # and a request that loses the race returns whatever the winner produced.
+    trip_id = trip.id
+    job = BillingJob(trip_id=trip_id, tenant_id=trip.tenant_id)
+    db.add(job)
+    try:
+        if enqueue_billing:
+            await db.commit()
+            return None
+        job.status, job.completed_at = "done", datetime.utcnow()
+        return await bill_trip_and_store(db, trip)
+    except IntegrityError:
+        await db.rollback()
+        # Also reloads ``trip``, which the rollback expired.
+        return (await crud.get_trip_with_invoice(db, trip_id))[1]
+
+
+async def ingest_trip_chunk(db: AsyncSession, items: Sequence[Tuple[int, TripIn]]) -> List[Dict[str, Any]]:
+    # One transaction per chunk; unknown vendors, and vendors of another tenant, are
+    # reported per row instead of failing the chunk.
+    cards = await get_rate_cards(db, {trip_in.vendor_id for _, trip_in in items})
+
+    results: List[Dict[str, Any]] = []
+    candidates: List[Tuple[int, TripIn, RateCard]] = []
+    for index, trip_in in items:
+        card = cards.get(trip_in.vendor_id)
+        if card is None or card.tenant_id != trip_in.tenant_id:
+            results.append({"index": index, "status": "error", "error": "Vendor not found"})
+            continue
+        candidates.append((index, trip_in, card))
+
+    # Rows whose external_id already exists, or repeats one earlier in the chunk, are
+    # reported as duplicates of the original trip instead of being inserted.
+    keys = {
+        key
+        for _, trip_in, _ in candidates
+        if (key := idempotency.trip_key(trip_in.tenant_id, trip_in.vendor_id, trip_in.external_id)) is not None
+    }
+    known = await crud.find_trips_by_external_id(db, list(keys))
+    accepted: List[Tuple[int, TripIn, RateCard]] = []
+    duplicates: List[Tuple[int, idempotency.TripKey]] = []
+    claimed = set()
+    for index, trip_in, card in candidates:
+        key = idempotency.trip_key(trip_in.tenant_id, trip_in.vendor_id, trip_in.external_id)
+        if key is not None and (key in known or key in claimed):
+            duplicates.append((index, key))
+            continue
+        if key is not None:
+            claimed.add(key)
+        accepted.append((index, trip_in, card))
+
+    if accepted:
+        results.extend(await _insert_trip_chunk(db, accepted, known))
+    for index, key in duplicates:
+        if key not in known:
+            # Its original was in this chunk and was rejected with it.
+            results.append({"index": index, "status": "error", "error": "Original trip was rejected"})
+            continue
+        trip_id, invoice_id, amount = known[key]
+        results.append(
+            {"index": index, "status": "duplicate", "trip_id": trip_id, "invoice_row_id": invoice_id, "amount": amount}
+        )
+    return results
+
+
+async def _insert_trip_chunk(
+    db: AsyncSession,
+    accepted: Sequence[Tuple[int, TripIn, RateCard]],
+    known: Dict[idempotency.TripKey, Tuple[int, Optional[int], Optional[float]]],
+) -> List[Dict[str, Any]]:
+    # Adds the keys of created trips to ``known`` so later duplicates in the chunk resolve.
+    results: List[Dict[str, Any]] = []
+    try:
+        trip_ids = await crud.insert_trips(db, [trip_in.model_dump() for _, trip_in, _ in accepted])
+        amounts = [card.rate(trip_in) for _, trip_in, card in accepted]
+        created_at = datetime.utcnow()
+        entries = [
+            (trip_in.tenant_id, trip_in.vendor_id, trip_id, amount)
+            for (_, trip_in, _), trip_id, amount in zip(accepted, trip_ids, amounts)
+        ]
+        invoice_ids = await insert_invoice_rows(db, entries, created_at)
+        await db.commit()
+    except SQLAlchemyError as exc:
+        await db.rollback()
+        error = f"Chunk rejected: {exc.__class__.__name__}"
+        results.extend({"index": index, "status": "error", "error": error} for index, _, _ in accepted)
+        return results
+
+    await publish_billed(entries, invoice_ids, created_at)
+
+    for (index, trip_in, _), trip_id, invoice_id, amount in zip(accepted, trip_ids, invoice_ids, amounts):
+        key = idempotency.trip_key(trip_in.tenant_id, trip_in.vendor_id, trip_in.external_id)
+        if key is not None:
+            known[key] = (trip_id, invoice_id, amount)
+            idempotency.remember(key, trip_id)
+        results.append(
+            {
+                "index": index,
+                "status": "created",
+                "trip_id": trip_id,
+                "invoice_row_id": invoice_id,
+                "amount": amount,
+            }
+        )
+    return results
+
+
+async def insert_invoice_rows(
+    db: AsyncSession,
+    entries: Sequence[Tuple[int, int, int, float]],
+    created_at: datetime,
+) -> List[int]:
+    # Multi-row insert of (tenant_id, vendor_id, trip_id, amount) plus the matching
+    # rollup update; the caller owns the transaction.
+    result = await db.execute(
+        insert(InvoiceRow).returning(InvoiceRow.id, sort_by_parameter_order=True),
+        [
+            {
+                "tenant_id": tenant_id,
+                "vendor_id": vendor_id,
+                "trip_id": trip_id,
+                "amount": amount,
+                "note": "auto",
+                "created_at": created_at,
+            }
+            for tenant_id, vendor_id, trip_id, amount in entries
+        ],
+    )
+    await rollup.apply_invoice_rows(db, ((tenant_id, vendor_id, created_at, amount) for tenant_id, vendor_id, _, amount in entries))
+    return list(result.scalars().all())
+
+
+async def publish_billed(
+    entries: Sequence[Tuple[int, int, int, float]], invoice_ids: Sequence[int], created_at: datetime
+) -> None:
+    # After commit: append the new rows to cached statements and refresh dashboards.
+    await reporting.append_statement_rows(
+        (invoice_id, vendor_id, trip_id, amount, "auto", created_at)
+        for (_, vendor_id, trip_id, amount), invoice_id in zip(entries, invoice_ids)
+    )
+    for tenant_id in {tenant_id for tenant_id, _, _, _ in entries}:
+        reporting.invalidate_dashboard(tenant_id)
+
+
 async def _get_vendor(db: AsyncSession, vendor_id: int) -> Vendor | None:
-    result = await db.execute(select(Vendor).where(Vendor.id == vendor_id))
+    result = await db.execute(queries.VENDOR_BY_ID, {"vendor_id": vendor_id})
     return result.scalars().first()
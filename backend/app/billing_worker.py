@@ -0,0 +1,243 @@
+"""Billing of queued trips (``BILLING_MODE=queue``).
+
+``POST /trips`` writes the trip and its ``billing_jobs`` row in one transaction. The
+workers here claim jobs in batches of ``BILLING_BATCH_SIZE`` and retry failures with
+exponential backoff up to ``BILLING_MAX_ATTEMPTS``. A claim holds a job for
+``BILLING_JOB_LEASE_SECONDS``, after which another worker may take it over; a batch that
+outlived its lease is rolled back rather than billing those trips twice.
+``python -m app.tasks.reconcile_billing`` finds trips that never got an invoice row.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import billing, metrics
+from .config import settings
+from .db import AsyncSessionLocal
+from .models import BillingJob, Trip
+from .ratecard import get_rate_cards
+
+logger = logging.getLogger(__name__)
+
+queue_lag = metrics.histogram(
+    "billing_queue_lag_seconds",
+    "Time from enqueue to a worker claiming the job.",
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+)
+jobs_completed = metrics.counter("billing_jobs_completed_total", "Billing jobs that produced an invoice row.")
+jobs_retried = metrics.counter("billing_jobs_retried_total", "Billing job attempts that failed and were rescheduled.")
+jobs_failed = metrics.counter("billing_jobs_failed_total", "Billing jobs that exhausted their attempts.")
+jobs_lease_lost = metrics.counter(
+    "billing_jobs_lease_lost_total", "Billing jobs rolled back because another worker re-claimed them after the lease."
+)
+
+
+class LeaseLost(Exception):
+    """Another worker re-claimed a job after its lease lapsed; it bills the job instead."""
+
+
+class BillingWorkerPool:
+    """asyncio workers that claim batches of ``billing_jobs`` and bill them."""
+
+    def __init__(self, workers: int, batch_size: int, poll_interval: float) -> None:
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+        self._wakeup = asyncio.Event()
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._run(), name=f"billing-worker-{n}") for n in range(self.workers)]
+
+    async def stop(self, timeout: Optional[float] = None) -> None:
+        # Workers finish the batch they hold before exiting, so nothing is left half-billed.
+        # Past ``timeout`` they are cancelled; their jobs are reclaimed once the lease lapses.
+        self._stopping.set()
+        self._wakeup.set()
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+            if pending:
+                logger.warning("Cancelling %s billing workers still busy after %ss", len(pending), timeout)
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                processed = await run_batch(self.batch_size)
+            except SQLAlchemyError:
+                logger.exception("Billing worker failed to claim jobs")
+                processed = 0
+            if processed:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+
+pool: Optional[BillingWorkerPool] = None
+
+
+def start_workers() -> None:
+    global pool
+    pool = BillingWorkerPool(settings.billing_workers, settings.billing_batch_size, settings.billing_poll_interval_seconds)
+    pool.start()
+
+
+async def stop_workers() -> None:
+    global pool
+    if pool is not None:
+        await pool.stop(settings.billing_drain_timeout_seconds)
+        pool = None
+
+
+def notify() -> None:
+    if pool is not None:
+        pool.notify()
+
+
+async def run_batch(batch_size: int) -> int:
+    async with AsyncSessionLocal() as db:
+        jobs = await claim_jobs(db, batch_size)
+        if not jobs:
+            return 0
+        try:
+            await _bill_jobs(db, jobs)
+        except Exception:
+            await db.rollback()
+            # Fall back to one job per transaction so a single bad trip cannot block the batch.
+            for job in jobs:
+                try:
+                    await _bill_jobs(db, [job])
+                except LeaseLost:
+                    logger.warning("Billing job %s was re-claimed by another worker", job[0])
+                except Exception as exc:
+                    await db.rollback()
+                    await _reschedule(db, job, exc)
+        return len(jobs)
+
+
+async def claim_jobs(db: AsyncSession, batch_size: int) -> List[tuple]:
+    now = datetime.utcnow()
+    claimable = or_(
+        and_(BillingJob.status == "pending", BillingJob.available_at <= now),
+        # Jobs whose worker died mid-batch become claimable again once the lease lapses.
+        and_(BillingJob.status == "running", BillingJob.locked_at < now - timedelta(seconds=settings.billing_job_lease_seconds)),
+    )
+    candidates = (
+        select(BillingJob.id)
+        .where(claimable)
+        .order_by(BillingJob.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    job_ids = (await db.execute(candidates)).scalars().all()
+    if not job_ids:
+        await db.rollback()
+        return []
+
+    # Re-checking `claimable` makes the claim safe on SQLite, which ignores FOR UPDATE.
+    claimed = await db.execute(
+        update(BillingJob)
+        .where(BillingJob.id.in_(job_ids))
+        .where(claimable)
+        .values(status="running", locked_at=now, attempts=BillingJob.attempts + 1)
+        .returning(BillingJob.id, BillingJob.trip_id, BillingJob.attempts, BillingJob.created_at)
+        .execution_options(synchronize_session=False)
+    )
+    rows = claimed.all()
+    await db.commit()
+    for _, _, _, created_at in rows:
+        queue_lag.observe((now - created_at).total_seconds())
+    # locked_at identifies this claim: the job is only ours while it is unchanged.
+    return [(job_id, trip_id, attempts, now) for job_id, trip_id, attempts, _ in rows]
+
+
+async def _bill_jobs(db: AsyncSession, jobs: Sequence[tuple]) -> None:
+    trip_ids = [trip_id for _, trip_id, _, _ in jobs]
+    trips = {trip.id: trip for trip in (await db.execute(select(Trip).where(Trip.id.in_(trip_ids)))).scalars()}
+    cards = await get_rate_cards(db, {trip.vendor_id for trip in trips.values()})
+
+    entries = []
+    for trip_id in trip_ids:
+        trip = trips.get(trip_id)
+        if trip is None:
+            raise LookupError(f"Trip {trip_id} not found")
+        card = cards.get(trip.vendor_id)
+        if card is None:
+            raise LookupError(f"Vendor {trip.vendor_id} not found")
+        entries.append((trip.tenant_id, trip.vendor_id, trip.id, card.rate(trip)))
+
+    created_at = datetime.utcnow()
+    invoice_ids = await billing.insert_invoice_rows(db, entries, created_at)
+    done = await db.execute(
+        update(BillingJob)
+        .where(BillingJob.id.in_([job_id for job_id, _, _, _ in jobs]))
+        .where(_still_claimed(jobs[0][3]))
+        .values(status="done", completed_at=created_at, last_error=None)
+        .execution_options(synchronize_session=False)
+    )
+    if done.rowcount != len(jobs):
+        # A slow batch outlived its lease and a job was re-claimed: committing would
+        # bill that trip twice, so the whole batch is rolled back.
+        await db.rollback()
+        jobs_lease_lost.inc(len(jobs) - done.rowcount)
+        raise LeaseLost(f"{len(jobs) - done.rowcount} of {len(jobs)} jobs were re-claimed")
+    await db.commit()
+    jobs_completed.inc(len(jobs))
+    await billing.publish_billed(entries, invoice_ids, created_at)
+
+
+def _still_claimed(locked_at: datetime):
+    # Jobs claimed together share their locked_at.
+    return and_(BillingJob.status == "running", BillingJob.locked_at == locked_at)
+
+
+async def _reschedule(db: AsyncSession, job: tuple, exc: Exception) -> None:
+    job_id, _, attempts, locked_at = job
+    if attempts >= settings.billing_max_attempts:
+        values = {"status": "failed"}
+        jobs_failed.inc()
+        logger.error("Billing job %s failed permanently: %r", job_id, exc)
+    else:
+        delay = min(settings.billing_retry_base_seconds * 2 ** (attempts - 1), settings.billing_retry_max_seconds)
+        values = {"status": "pending", "available_at": datetime.utcnow() + timedelta(seconds=delay)}
+        jobs_retried.inc()
+        logger.warning("Billing job %s failed (attempt %s), retrying in %.0fs: %r", job_id, attempts, delay, exc)
+    await db.execute(
+        update(BillingJob)
+        .where(BillingJob.id == job_id)
+        .where(_still_claimed(locked_at))
+        .values(last_error=repr(exc)[:500], **values)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+
+async def queue_stats(db: AsyncSession) -> dict:
+    counts = dict((await db.execute(select(BillingJob.status, func.count()).group_by(BillingJob.status))).all())
+    oldest = (
+        await db.execute(select(func.min(BillingJob.created_at)).where(BillingJob.status.in_(["pending", "running"])))
+    ).scalar()
+    return {
+        "pending": counts.get("pending", 0),
+        "running": counts.get("running", 0),
+        "done": counts.get("done", 0),
+        "failed": counts.get("failed", 0),
+        "oldest_pending_age_seconds": (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0,
+    }
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple, Type
+
+from . import metrics
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Size-bounded LRU mapping whose entries expire ``ttl`` seconds after being set."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def keys(self) -> List[Hashable]:
+        return list(self._data)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TwoTierCache:
+    """In-process LRU (L1) in front of Redis (L2) with single-flight loads.
+
+    Entries carry a freshness deadline and a longer stale deadline: stale values are
+    served immediately while one background load refreshes them. Redis failures are
+    logged and treated as misses, and Redis is skipped for ``redis_retry_seconds``
+    afterwards so an outage does not add a connect timeout to every request.
+    Other workers' L1 copies are only dropped by expiry, so keep ``l1_ttl`` short.
+    The Redis client (and the ``redis`` package itself) is only created on first use,
+    which keeps it off the import and startup path.
+    """
+
+    def __init__(
+        self,
+        redis_url: str,
+        *,
+        l1_size: int,
+        l1_ttl: float,
+        fresh_ttl: float,
+        stale_ttl: float,
+        redis_retry_seconds: float = 5.0,
+        name: str = "cache",
+    ) -> None:
+        self.redis_url = redis_url
+        self._redis: Optional[Redis] = None
+        self._redis_exceptions: Tuple[Type[BaseException], ...] = (OSError,)
+        self.l1 = TTLCache(l1_size, l1_ttl)
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.redis_retry_seconds = redis_retry_seconds
+        self._redis_down_until = 0.0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.l1_hits = metrics.counter(f"{name}_l1_hits_total", "Lookups served from the in-process cache.")
+        self.l2_hits = metrics.counter(f"{name}_l2_hits_total", "Lookups served from Redis.")
+        self.misses = metrics.counter(f"{name}_misses_total", "Lookups that had to load the value.")
+        self.stale_served = metrics.counter(f"{name}_stale_served_total", "Stale values served while revalidating.")
+        self.coalesced = metrics.counter(f"{name}_coalesced_total", "Loads joined onto an in-flight load.")
+        self.redis_errors = metrics.counter(f"{name}_redis_errors_total", "Redis calls that failed and were skipped.")
+
+    @property
+    def redis(self) -> Redis:
+        if self._redis is None:
+            from redis.asyncio import Redis
+            from redis.exceptions import RedisError
+
+            self._redis = Redis.from_url(self.redis_url, encoding="utf-8", decode_responses=True)
+            self._redis_exceptions = (RedisError, OSError)
+        return self._redis
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        now = time.time()
+        entry = self.l1.get(key)
+        if entry is not None:
+            self.l1_hits.inc()
+        else:
+            entry = await self._redis_get(key)
+            if entry is not None:
+                self.l2_hits.inc()
+                self.l1.set(key, entry)
+
+        if entry is not None and now < entry["stale_until"]:
+            if now >= entry["fresh_until"]:
+                self.stale_served.inc()
+                self._load(key, loader)
+            return entry["value"]
+
+        self.misses.inc()
+        # Shielded so a disconnecting client does not cancel the load other requests wait on.
+        return await asyncio.shield(self._load(key, loader))
+
+    async def invalidate(self, key: str) -> None:
+        self.l1.pop(key)
+        self._inflight.pop(key, None)
+        await self.redis_call(self.redis.delete, key)
+
+    async def invalidate_prefix(self, prefix: str) -> None:
+        for key in [key for key in self.l1.keys() if key.startswith(prefix)]:
+            self.l1.pop(key)
+        for key in [key for key in self._inflight if key.startswith(prefix)]:
+            self._inflight.pop(key, None)
+        if self._redis_available():
+            try:
+                redis = self.redis
+                keys = [key async for key in redis.scan_iter(match=f"{prefix}*")]
+                if keys:
+                    await redis.delete(*keys)
+            except self._redis_exceptions as exc:
+                self._redis_failed(exc)
+
+    def _load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced.inc()
+            return task
+        task = asyncio.ensure_future(self._load_and_store(key, loader))
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return task
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Cache load for %s failed: %r", key, task.exception())
+
+    async def _load_and_store(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = await loader()
+        # An invalidation while loading detaches this task; its result may predate the
+        # write that caused it, so it is returned to its waiters but not cached.
+        if self._inflight.get(key) is asyncio.current_task():
+            now = time.time()
+            entry = {"value": value, "fresh_until": now + self.fresh_ttl, "stale_until": now + self.stale_ttl}
+            self.l1.set(key, entry)
+            await self.redis_call(self.redis.set, key, json.dumps(entry), ex=int(self.stale_ttl))
+        return value
+
+    async def _redis_get(self, key: str) -> Optional[dict]:
+        raw = await self.redis_call(self.redis.get, key)
+        return json.loads(raw) if raw else None
+
+    async def redis_call(self, func: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        # Also used for keys this cache does not manage, so they share its outage back-off.
+        if not self._redis_available():
+            return None
+        try:
+            return await func(*args, **kwargs)
+        except self._redis_exceptions as exc:
+            self._redis_failed(exc)
+            return None
+
+    def _redis_available(self) -> bool:
+        return time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, exc: Exception) -> None:
+        self.redis_errors.inc()
+        self._redis_down_until = time.monotonic() + self.redis_retry_seconds
+        logger.warning("Redis unavailable, serving without L2 cache: %s", exc)
@@ -1,3 +1,4 @@
+import os
 from functools import lru_cache
 
 from pydantic import Field
@@ -8,11 +9,76 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
     database_url: str = Field(default="sqlite+aiosqlite:///./moviesync.db", alias="DATABASE_URL")
+    db_pool_size: int = Field(default=10, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=20, alias="DB_MAX_OVERFLOW")
+    db_pool_timeout_seconds: float = Field(default=30.0, alias="DB_POOL_TIMEOUT_SECONDS")
+    db_pool_recycle_seconds: int = Field(default=1800, alias="DB_POOL_RECYCLE_SECONDS")
+    db_pool_pre_ping: bool = Field(default=True, alias="DB_POOL_PRE_PING")
+    db_statement_timeout_ms: int = Field(default=30_000, alias="DB_STATEMENT_TIMEOUT_MS")
+    db_prepared_statement_cache_size: int = Field(default=256, alias="DB_PREPARED_STATEMENT_CACHE_SIZE")
+    db_query_cache_size: int = Field(default=1200, alias="DB_QUERY_CACHE_SIZE")
+    sqlite_journal_mode: str = Field(default="WAL", alias="SQLITE_JOURNAL_MODE")
+    sqlite_synchronous: str = Field(default="NORMAL", alias="SQLITE_SYNCHRONOUS")
+    sqlite_busy_timeout_ms: int = Field(default=5000, alias="SQLITE_BUSY_TIMEOUT_MS")
     redis_url: str = Field(default="redis://localhost:6379/0", alias="REDIS_URL")
+    startup_mode: str = Field(default="development", pattern=r"^(development|production)$", alias="STARTUP_MODE")
+    readiness_timeout_seconds: float = Field(default=2.0, alias="READINESS_TIMEOUT_SECONDS")
+    web_workers: int = Field(default=0, alias="WEB_WORKERS")
+    web_host: str = Field(default="0.0.0.0", alias="WEB_HOST")
+    web_port: int = Field(default=8000, alias="WEB_PORT")
+    graceful_shutdown_seconds: int = Field(default=30, alias="GRACEFUL_SHUTDOWN_SECONDS")
+    warmup_rate_cards: int = Field(default=2000, alias="WARMUP_RATE_CARDS")
+    warmup_principals: int = Field(default=2000, alias="WARMUP_PRINCIPALS")
+    warmup_timeout_seconds: float = Field(default=5.0, alias="WARMUP_TIMEOUT_SECONDS")
     secret_key: str = Field(default="dev-secret-key", alias="SECRET_KEY")
     access_token_expire_minutes: int = Field(default=60 * 24 * 7, alias="ACCESS_TOKEN_EXPIRE_MINUTES")
     algorithm: str = Field(default="HS256", alias="ALGORITHM")
     allowed_hosts: str = Field(default="*", alias="ALLOWED_HOSTS")
+    principal_cache_size: int = Field(default=10_000, alias="PRINCIPAL_CACHE_SIZE")
+    principal_cache_ttl_seconds: float = Field(default=60.0, alias="PRINCIPAL_CACHE_TTL_SECONDS")
+    token_version_refresh_seconds: float = Field(default=30.0, alias="TOKEN_VERSION_REFRESH_SECONDS")
+    token_version_max_staleness_seconds: float = Field(default=120.0, alias="TOKEN_VERSION_MAX_STALENESS_SECONDS")
+    hash_pool_workers: int = Field(default=min(4, os.cpu_count() or 1), alias="HASH_POOL_WORKERS")
+    hash_queue_limit: int = Field(default=32, alias="HASH_QUEUE_LIMIT")
+    bulk_hash_processes: int = Field(default=0, alias="BULK_HASH_PROCESSES")
+    bulk_hash_batch_size: int = Field(default=50, alias="BULK_HASH_BATCH_SIZE")
+    provision_batch_size: int = Field(default=1000, alias="PROVISION_BATCH_SIZE")
+    provision_max_rows: int = Field(default=50_000, alias="PROVISION_MAX_ROWS")
+    provision_request_max_rows: int = Field(default=500, alias="PROVISION_REQUEST_MAX_ROWS")
+    report_cache_ttl_seconds: int = Field(default=3600, alias="REPORT_CACHE_TTL_SECONDS")
+    report_cache_stale_seconds: int = Field(default=300, alias="REPORT_CACHE_STALE_SECONDS")
+    report_cache_l1_size: int = Field(default=256, alias="REPORT_CACHE_L1_SIZE")
+    report_cache_l1_ttl_seconds: float = Field(default=15.0, alias="REPORT_CACHE_L1_TTL_SECONDS")
+    statement_cache_ttl_seconds: int = Field(default=7 * 24 * 3600, alias="STATEMENT_CACHE_TTL_SECONDS")
+    dashboard_memo_size: int = Field(default=1024, alias="DASHBOARD_MEMO_SIZE")
+    dashboard_memo_ttl_seconds: float = Field(default=5.0, alias="DASHBOARD_MEMO_TTL_SECONDS")
+    dashboard_stream_interval_seconds: float = Field(default=15.0, alias="DASHBOARD_STREAM_INTERVAL_SECONDS")
+    trip_page_size: int = Field(default=200, alias="TRIP_PAGE_SIZE")
+    trip_page_size_max: int = Field(default=1000, alias="TRIP_PAGE_SIZE_MAX")
+    rate_card_cache_size: int = Field(default=10_000, alias="RATE_CARD_CACHE_SIZE")
+    rate_card_cache_ttl_seconds: float = Field(default=300.0, alias="RATE_CARD_CACHE_TTL_SECONDS")
+    billing_mode: str = Field(default="queue", pattern=r"^(queue|inline)$", alias="BILLING_MODE")
+    billing_workers: int = Field(default=2, alias="BILLING_WORKERS")
+    billing_batch_size: int = Field(default=100, alias="BILLING_BATCH_SIZE")
+    billing_poll_interval_seconds: float = Field(default=1.0, alias="BILLING_POLL_INTERVAL_SECONDS")
+    billing_max_attempts: int = Field(default=8, alias="BILLING_MAX_ATTEMPTS")
+    billing_retry_base_seconds: float = Field(default=2.0, alias="BILLING_RETRY_BASE_SECONDS")
+    billing_retry_max_seconds: float = Field(default=300.0, alias="BILLING_RETRY_MAX_SECONDS")
+    billing_job_lease_seconds: float = Field(default=300.0, alias="BILLING_JOB_LEASE_SECONDS")
+    billing_drain_timeout_seconds: float = Field(default=20.0, alias="BILLING_DRAIN_TIMEOUT_SECONDS")
+    bulk_trip_chunk_size: int = Field(default=500, alias="BULK_TRIP_CHUNK_SIZE")
+    idempotency_cache_size: int = Field(default=100_000, alias="IDEMPOTENCY_CACHE_SIZE")
+    idempotency_cache_ttl_seconds: float = Field(default=24 * 3600.0, alias="IDEMPOTENCY_CACHE_TTL_SECONDS")
+    partition_months_ahead: int = Field(default=3, alias="PARTITION_MONTHS_AHEAD")
+    archive_dir: str = Field(default="archive", alias="ARCHIVE_DIR")
+    export_dir: str = Field(default="exports", alias="EXPORT_DIR")
+    export_batch_size: int = Field(default=10_000, alias="EXPORT_BATCH_SIZE")
+    export_concurrency: int = Field(default=4, alias="EXPORT_CONCURRENCY")
+    month_close_chunk_size: int = Field(default=500, alias="MONTH_CLOSE_CHUNK_SIZE")
+    month_close_concurrency: int = Field(default=4, alias="MONTH_CLOSE_CONCURRENCY")
+    metrics_sample_rate: float = Field(default=1.0, ge=0.0, le=1.0, alias="METRICS_SAMPLE_RATE")
+    slow_query_ms: float = Field(default=200.0, alias="SLOW_QUERY_MS")
+    slow_query_log_chars: int = Field(default=2000, alias="SLOW_QUERY_LOG_CHARS")
 
 
 @lru_cache
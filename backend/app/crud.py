@@ -1,10 +1,13 @@
-from typing import Any, Dict, List, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import Row, insert, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from . import models
-from .auth import get_password_hash
+from . import models, queries, reporting
+from .auth import get_password_hash_async
+from .principals import invalidate_principal
+from .ratecard import invalidate_rate_card
 
 
 async def create_tenant(db: AsyncSession, *, name: str) -> models.Tenant:
@@ -24,7 +27,7 @@ async def create_user(
     role: str = "employee",
     is_admin: bool = False,
 ) -> models.User:
-    hashed_password = get_password_hash(password)
+    hashed_password = await get_password_hash_async(password)
     user = models.User(
         email=email,
         hashed_password=hashed_password,
@@ -35,17 +38,68 @@ async def create_user(
     db.add(user)
     await db.commit()
     await db.refresh(user)
+    invalidate_principal(user.email, user.tenant_id)
     return user
 
 
 async def get_user_by_email(db: AsyncSession, email: str) -> Optional[models.User]:
-    result = await db.execute(select(models.User).where(models.User.email == email))
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": email})
     return result.scalars().first()
 
 
-async def list_users_by_tenant(db: AsyncSession, tenant_id: int) -> List[models.User]:
-    result = await db.execute(select(models.User).where(models.User.tenant_id == tenant_id).order_by(models.User.email))
-    return result.scalars().all()
+async def get_principal_row(db: AsyncSession, email: str) -> Optional[Row]:
+    """(id, email, tenant_id, role, is_admin) of the user, without loading the ORM object."""
+    return (await db.execute(queries.PRINCIPAL_BY_EMAIL, {"email": email})).first()
+
+
+async def get_user(db: AsyncSession, user_id: int) -> Optional[models.User]:
+    result = await db.execute(queries.USER_BY_ID, {"user_id": user_id})
+    return result.scalars().first()
+
+
+DEFAULT_ADMIN_EMAILS = ("admin@acme.com", "admin1@acme.com", "admin2@acme.com", "admin3@acme.com")
+
+
+async def ensure_default_admins(
+    db: AsyncSession,
+    *,
+    tenant_name: str = "AcmeCorp",
+    emails: Sequence[str] = DEFAULT_ADMIN_EMAILS,
+    password: str = "123",
+) -> List[str]:
+    """Create the tenant and whichever admin accounts are missing; returns the emails created.
+
+    One query finds the existing accounts and one insert adds the rest. The accounts
+    share a password, so it is hashed once and the hash reused.
+    """
+    tenant_id = await db.scalar(select(models.Tenant.id).where(models.Tenant.name == tenant_name))
+    if tenant_id is None:
+        tenant_id = await db.scalar(insert(models.Tenant).values(name=tenant_name).returning(models.Tenant.id))
+    existing = set((await db.execute(select(models.User.email).where(models.User.email.in_(emails)))).scalars())
+    missing = [email for email in emails if email not in existing]
+    if missing:
+        hashed_password = await get_password_hash_async(password)
+        await db.execute(
+            insert(models.User),
+            [
+                {"email": email, "hashed_password": hashed_password, "tenant_id": tenant_id, "is_admin": True, "role": "admin"}
+                for email in missing
+            ],
+        )
+    await db.commit()
+    return missing
+
+
+USER_LIST_FIELDS = ("id", "email", "role", "tenant_id", "is_admin")
+
+
+async def list_users_by_tenant(db: AsyncSession, tenant_id: int) -> List[Row]:
+    result = await db.execute(
+        select(*(getattr(models.User, name) for name in USER_LIST_FIELDS))
+        .where(models.User.tenant_id == tenant_id)
+        .order_by(models.User.email)
+    )
+    return result.all()
 
 
 async def create_vendor(db: AsyncSession, payload: Dict[str, Any]) -> models.Vendor:
@@ -53,30 +107,120 @@ async def create_vendor(db: AsyncSession, payload: Dict[str, Any]) -> models.Ven
     db.add(vendor)
     await db.commit()
     await db.refresh(vendor)
+    reporting.invalidate_dashboard(vendor.tenant_id)
+    return vendor
+
+
+async def update_vendor_billing(
+    db: AsyncSession,
+    vendor: models.Vendor,
+    *,
+    billing_model: str,
+    billing_config: Dict[str, Any],
+) -> models.Vendor:
+    vendor.billing_model = billing_model
+    vendor.billing_config = billing_config
+    await db.commit()
+    await db.refresh(vendor)
+    await invalidate_rate_card(vendor.id)
     return vendor
 
 
 async def get_vendor(db: AsyncSession, vendor_id: int) -> Optional[models.Vendor]:
-    result = await db.execute(select(models.Vendor).where(models.Vendor.id == vendor_id))
+    result = await db.execute(queries.VENDOR_BY_ID, {"vendor_id": vendor_id})
     return result.scalars().first()
 
 
-async def create_trip(db: AsyncSession, payload: Dict[str, Any]) -> models.Trip:
+async def create_trip(db: AsyncSession, payload: Dict[str, Any], *, enqueue_billing: bool = False) -> models.Trip:
     trip = models.Trip(**payload)
     db.add(trip)
+    if enqueue_billing:
+        # Outbox row committed atomically with the trip; billing_worker picks it up.
+        await db.flush()
+        db.add(models.BillingJob(trip_id=trip.id, tenant_id=trip.tenant_id))
     await db.commit()
     await db.refresh(trip)
+    reporting.invalidate_dashboard(trip.tenant_id)
     return trip
 
 
+async def get_trip_with_invoice(
+    db: AsyncSession, trip_id: int
+) -> Optional[Tuple[models.Trip, Optional[models.InvoiceRow]]]:
+    row = (
+        await db.execute(
+            select(models.Trip, models.InvoiceRow)
+            .outerjoin(models.InvoiceRow, models.InvoiceRow.trip_id == models.Trip.id)
+            .where(models.Trip.id == trip_id)
+            .order_by(models.InvoiceRow.id)
+            .limit(1)
+        )
+    ).first()
+    return (row[0], row[1]) if row else None
+
+
+async def find_trips_by_external_id(
+    db: AsyncSession, keys: Sequence[Tuple[int, int, str]]
+) -> Dict[Tuple[int, int, str], Tuple[int, Optional[int], Optional[float]]]:
+    """Map (tenant_id, vendor_id, external_id) keys that already exist to (trip_id, invoice_row_id, amount)."""
+    if not keys:
+        return {}
+    trip = models.Trip
+    result = await db.execute(
+        select(trip.tenant_id, trip.vendor_id, trip.external_id, trip.id, models.InvoiceRow.id, models.InvoiceRow.amount)
+        .outerjoin(models.InvoiceRow, models.InvoiceRow.trip_id == trip.id)
+        .where(tuple_(trip.tenant_id, trip.vendor_id, trip.external_id).in_(list(keys)))
+        .order_by(models.InvoiceRow.id.desc())
+    )
+    # Newest invoice first, so each trip's first invoice row is the one left in the dict.
+    return {(tenant_id, vendor_id, external_id): tuple(rest) for tenant_id, vendor_id, external_id, *rest in result.all()}
+
+
+async def insert_trips(db: AsyncSession, payloads: List[Dict[str, Any]]) -> List[int]:
+    # Multi-row INSERT ... RETURNING; the caller owns the transaction.
+    if not payloads:
+        return []
+    result = await db.execute(
+        insert(models.Trip).returning(models.Trip.id, sort_by_parameter_order=True),
+        payloads,
+    )
+    return list(result.scalars().all())
+
+
+TRIP_LIST_FIELDS = (
+    "id",
+    "tenant_id",
+    "vendor_id",
+    "employee_id",
+    "distance_km",
+    "duration_minutes",
+    "date",
+    "extra_km",
+    "extra_hours",
+    "payload",
+    "external_id",
+)
+
+
 async def list_trips_for_tenant(
     db: AsyncSession,
     *,
     tenant_id: int,
     employee_id: Optional[int] = None,
-) -> List[models.Trip]:
-    stmt = select(models.Trip).where(models.Trip.tenant_id == tenant_id).order_by(models.Trip.date.desc())
+    limit: int,
+    after: Optional[Tuple[datetime, int]] = None,
+    fields: Sequence[str] = TRIP_LIST_FIELDS,
+) -> List[Row]:
+    # Keyset pagination on (date, id) descending; `after` is the last (date, id) already
+    # returned. date and id are always selected because the next cursor is built from them.
+    columns = {"id", "date", *fields}
+    stmt = queries.trip_page(
+        tuple(name for name in TRIP_LIST_FIELDS if name in columns), employee_id is not None, after is not None
+    )
+    params: Dict[str, Any] = {"tenant_id": tenant_id, "limit": limit}
     if employee_id is not None:
-        stmt = stmt.where(models.Trip.employee_id == employee_id)
-    result = await db.execute(stmt)
-    return result.scalars().all()
+        params["employee_id"] = employee_id
+    if after is not None:
+        params["after_date"], params["after_id"] = after
+    result = await db.execute(stmt, params)
+    return result.all()
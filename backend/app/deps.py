@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Any, Dict
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
@@ -7,30 +9,70 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from . import crud
 from .config import settings
-from .db import get_db
+from .db import AsyncSessionLocal, get_db
+from .principals import Principal, cache_principal, get_cached_principal
+from .revocation import is_token_revoked
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+
+def _decode_token(token: str) -> Dict[str, Any]:
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        email: str | None = payload.get("sub")
-        tenant_id: int | None = payload.get("tenant_id")
-        if email is None or tenant_id is None:
-            raise credentials_exception
     except JWTError as exc:
         raise credentials_exception from exc
+    if payload.get("sub") is None or payload.get("tenant_id") is None:
+        raise credentials_exception
+    return payload
+
+
+async def _load_principal(payload: Dict[str, Any], db: AsyncSession) -> Principal:
+    email, tenant_id = payload["sub"], payload["tenant_id"]
+    principal = get_cached_principal(email, tenant_id)
+    if principal is None:
+        row = await crud.get_principal_row(db, email)
+        if row is None or row.tenant_id != tenant_id:
+            raise credentials_exception
+        principal = Principal(id=row.id, email=row.email, tenant_id=row.tenant_id, role=row.role, is_admin=bool(row.is_admin))
+        cache_principal(principal)
+    if await is_token_revoked(db, principal.id, payload.get("ver", 0)):
+        raise credentials_exception
+    return principal
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> Principal:
+    return await _load_principal(_decode_token(token), db)
 
-    user = await crud.get_user_by_email(db, email=email)
-    if user is None or user.tenant_id != tenant_id:
+
+async def get_token_principal(token: str = Depends(oauth2_scheme)) -> Principal:
+    """Claims-only variant of ``get_current_user`` for read-only endpoints.
+
+    Trusts the signed ``user_id``/``role``/``is_admin`` claims and only checks the
+    in-memory token version map, so role changes and revocations made by another
+    process apply after at most ``TOKEN_VERSION_REFRESH_SECONDS`` (or token expiry for
+    role changes without a revocation). Tokens issued before these claims existed go
+    through the regular lookup.
+    """
+    payload = _decode_token(token)
+    user_id = payload.get("user_id")
+    if user_id is None or payload.get("is_admin") is None or payload.get("role") is None:
+        async with AsyncSessionLocal() as db:
+            return await _load_principal(payload, db)
+    if await is_token_revoked(None, user_id, payload.get("ver", 0)):
         raise credentials_exception
-    return user
+    return Principal(
+        id=user_id,
+        email=payload["sub"],
+        tenant_id=payload["tenant_id"],
+        role=payload["role"],
+        is_admin=bool(payload["is_admin"]),
+    )
 
 
 def require_role(*roles: str):
@@ -0,0 +1,170 @@
+"""Finance exports of invoice rows joined with their trip metrics, as Parquet or Arrow.
+
+Rows stream from a server-side cursor in ``EXPORT_BATCH_SIZE`` batches that become
+Arrow record batches, so memory stays flat for large vendors.
+"""
+from __future__ import annotations
+
+import asyncio
+import io
+import os
+from typing import AsyncIterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import select
+
+from .config import settings
+from .db import AsyncSessionLocal
+from .models import InvoiceRow, Trip, Vendor
+from .reporting import month_bounds
+
+# Invoice rows joined with the metrics of the trip they bill, in cursor column order.
+STATEMENT_SCHEMA = pa.schema(
+    [
+        ("invoice_row_id", pa.int64()),
+        ("trip_id", pa.int64()),
+        ("amount", pa.float64()),
+        ("note", pa.string()),
+        ("created_at", pa.timestamp("us")),
+        ("trip_date", pa.timestamp("us")),
+        ("employee_id", pa.int64()),
+        ("distance_km", pa.float64()),
+        ("duration_minutes", pa.int32()),
+        ("extra_km", pa.float64()),
+        ("extra_hours", pa.float64()),
+    ]
+)
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+# Ids and timestamps grow almost monotonically, so delta encoding beats dictionaries there.
+PARQUET_OPTIONS = {
+    "compression": "zstd",
+    "use_dictionary": ["note", "employee_id", "amount", "distance_km", "duration_minutes", "extra_km", "extra_hours"],
+    "column_encoding": {
+        "invoice_row_id": "DELTA_BINARY_PACKED",
+        "trip_id": "DELTA_BINARY_PACKED",
+        "created_at": "DELTA_BINARY_PACKED",
+        "trip_date": "DELTA_BINARY_PACKED",
+    },
+}
+PARQUET_ROW_GROUP_ROWS = 128 * 1024
+
+
+def _statement_query(vendor_id: int, year: int, month: int, batch_size: int):
+    month_start, month_end = month_bounds(year, month)
+    return (
+        select(
+            InvoiceRow.id,
+            InvoiceRow.trip_id,
+            InvoiceRow.amount,
+            InvoiceRow.note,
+            InvoiceRow.created_at,
+            Trip.date,
+            Trip.employee_id,
+            Trip.distance_km,
+            Trip.duration_minutes,
+            Trip.extra_km,
+            Trip.extra_hours,
+        )
+        .join(Trip, Trip.id == InvoiceRow.trip_id)
+        .where(InvoiceRow.vendor_id == vendor_id)
+        .where(InvoiceRow.created_at >= month_start)
+        .where(InvoiceRow.created_at < month_end)
+        .order_by(InvoiceRow.created_at, InvoiceRow.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+
+def _record_batch(rows) -> pa.RecordBatch:
+    # The cursor hands back rows; transposing once per batch gives Arrow whole columns.
+    columns = zip(*rows)
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, STATEMENT_SCHEMA)],
+        schema=STATEMENT_SCHEMA,
+    )
+
+
+async def iter_statement_batches(
+    vendor_id: int, year: int, month: int, batch_size: Optional[int] = None
+) -> AsyncIterator[pa.RecordBatch]:
+    query = _statement_query(vendor_id, year, month, batch_size or settings.export_batch_size)
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(query)
+        async for partition in result.partitions():
+            yield _record_batch(partition)
+
+
+def statement_path(out_dir: str, tenant_id: int, vendor_id: int, year: int, month: int, fmt: str) -> str:
+    # Hive-style directories, so the output also reads as one partitioned dataset.
+    return os.path.join(
+        out_dir, f"tenant_id={tenant_id}", f"year={year}", f"month={month:02d}", f"vendor_{vendor_id}{FORMATS[fmt]}"
+    )
+
+
+async def export_vendor_month(
+    tenant_id: int, vendor_id: int, year: int, month: int, out_dir: str, fmt: str = "parquet"
+) -> dict:
+    """Write one vendor-month to Parquet (zstd) or an Arrow IPC file; months without rows are skipped."""
+    path = statement_path(out_dir, tenant_id, vendor_id, year, month, fmt)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = path + ".partial"
+    rows = 0
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(partial, STATEMENT_SCHEMA, **PARQUET_OPTIONS)
+    else:
+        writer = pa.ipc.new_file(partial, STATEMENT_SCHEMA, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+    # Cursor batches are regrouped so each Parquet row group holds up to PARQUET_ROW_GROUP_ROWS.
+    pending: List[pa.RecordBatch] = []
+    pending_rows = 0
+    try:
+        async for batch in iter_statement_batches(vendor_id, year, month):
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            rows += batch.num_rows
+            if pending_rows >= PARQUET_ROW_GROUP_ROWS:
+                # Encoding and compression release the GIL; running them in a thread lets
+                # other vendors' queries proceed meanwhile.
+                await asyncio.to_thread(writer.write_table, pa.Table.from_batches(pending))
+                pending, pending_rows = [], 0
+        if pending:
+            await asyncio.to_thread(writer.write_table, pa.Table.from_batches(pending))
+    finally:
+        writer.close()
+    if not rows:
+        os.remove(partial)
+        return {"vendor_id": vendor_id, "rows": 0, "path": None, "bytes": 0}
+    os.replace(partial, path)
+    return {"vendor_id": vendor_id, "rows": rows, "path": path, "bytes": os.path.getsize(path)}
+
+
+async def export_tenant_month(
+    tenant_id: int,
+    year: int,
+    month: int,
+    out_dir: str,
+    fmt: str = "parquet",
+    concurrency: Optional[int] = None,
+) -> List[dict]:
+    async with AsyncSessionLocal() as session:
+        vendor_ids = (await session.execute(select(Vendor.id).where(Vendor.tenant_id == tenant_id))).scalars().all()
+
+    limit = asyncio.Semaphore(concurrency or settings.export_concurrency)
+
+    async def run(vendor_id: int) -> dict:
+        async with limit:
+            return await export_vendor_month(tenant_id, vendor_id, year, month, out_dir, fmt)
+
+    return list(await asyncio.gather(*(run(vendor_id) for vendor_id in vendor_ids)))
+
+
+async def stream_statement_arrow(vendor_id: int, year: int, month: int) -> AsyncIterator[bytes]:
+    """Arrow IPC stream of a vendor-month, sent batch by batch as the cursor yields."""
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, STATEMENT_SCHEMA, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+    async for batch in iter_statement_batches(vendor_id, year, month):
+        writer.write_batch(batch)
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
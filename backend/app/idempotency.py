@@ -0,0 +1,34 @@
+"""Idempotent trip ingestion keyed on a vendor's ``external_id``.
+
+The unique index on ``(tenant_id, vendor_id, external_id)`` guarantees one trip per key,
+and a resubmission is answered with the original trip and ``Idempotent-Replayed: true``.
+If the original request committed the trip but failed to bill it, the replay bills (or
+queues) it; the trip's unique ``billing_jobs`` row makes sure only one request does so.
+"""
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+from .cache import TTLCache
+from .config import settings
+
+# (tenant_id, vendor_id, external_id), the natural key of an ingested trip.
+TripKey = Tuple[int, int, str]
+
+# Keys this process ingested recently, mapped to their trip id. Vendor retries usually
+# arrive within seconds, so most replays are answered from here with a read by primary
+# key; older or other-process replays are caught by the unique index on insert.
+recent_trips = TTLCache(settings.idempotency_cache_size, settings.idempotency_cache_ttl_seconds)
+
+
+def trip_key(tenant_id: int, vendor_id: int, external_id: Optional[str]) -> Optional[TripKey]:
+    return (tenant_id, vendor_id, external_id) if external_id else None
+
+
+def recent_trip_id(key: Optional[TripKey]) -> Optional[int]:
+    return recent_trips.get(key) if key is not None else None
+
+
+def remember(key: Optional[TripKey], trip_id: int) -> None:
+    if key is not None:
+        recent_trips.set(key, trip_id)
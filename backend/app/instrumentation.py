@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import contextvars
+import logging
+import random
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from . import metrics
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+request_latency = metrics.histogram_family(
+    "http_request_duration_seconds",
+    "Request latency until the response finished, by route template.",
+    ("method", "route", "status"),
+)
+request_db_queries = metrics.histogram_family(
+    "http_request_db_queries",
+    "Database statements executed per request.",
+    ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+request_db_time = metrics.histogram_family(
+    "http_request_db_seconds",
+    "Time spent in database statements per request.",
+    ("method", "route"),
+)
+query_latency = metrics.histogram("db_query_seconds", "Latency of individual database statements.")
+slow_queries = metrics.counter("db_slow_queries_total", "Statements slower than SLOW_QUERY_MS.")
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# SQLAlchemy's async bridge runs the sync cursor events in the calling task's context,
+# so the hooks below can attribute statements to the request that issued them.
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+class MetricsMiddleware:
+    """Records latency and DB usage for a ``METRICS_SAMPLE_RATE`` share of HTTP requests.
+
+    Routes are labelled by their template (``/reports/vendor/{vendor_id}/monthly``);
+    paths that match no route share the ``unmatched`` label to keep cardinality bounded.
+    """
+
+    def __init__(self, app, sample_rate: float = settings.metrics_sample_rate) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not (self.sample_rate >= 1.0 or random.random() < self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            request_latency.labels(method, path, str(status_code)).observe(elapsed)
+            request_db_queries.labels(method, path).observe(stats.queries)
+            request_db_time.labels(method, path).observe(stats.db_seconds)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement on ``engine`` (the ``sync_engine`` of an async engine)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        query_latency.observe(elapsed)
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+        if elapsed * 1000 >= settings.slow_query_ms:
+            slow_queries.inc()
+            logger.warning(
+                "Slow query (%.1f ms%s): %s",
+                elapsed * 1000,
+                ", executemany" if executemany else "",
+                statement[: settings.slow_query_log_chars],
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context):
+        # A failed statement never reaches after_cursor_execute; drop its start time.
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+def expose_cache_stats(name: str, cache) -> None:
+    """Publish a ``TTLCache``'s hit, miss and size counters under ``name``."""
+    metrics.callback(f"{name}_hits_total", "Lookups served from the cache.", lambda: cache.hits, kind="counter")
+    metrics.callback(f"{name}_misses_total", "Lookups that missed the cache.", lambda: cache.misses, kind="counter")
+    metrics.callback(f"{name}_entries", "Entries currently cached.", lambda: len(cache))
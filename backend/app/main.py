@@ -1,20 +1,48 @@
 from __future__ import annotations
 
-from datetime import timedelta
+import asyncio
+import base64
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Tuple
 
-from fastapi import Depends, FastAPI, HTTPException, Query, status
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy import select
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from . import auth, billing, crud, reporting, schemas
+from . import (
+    auth,
+    billing,
+    billing_worker,
+    crud,
+    export,
+    idempotency,
+    instrumentation,
+    metrics,
+    month_close,
+    partitioning,
+    provisioning,
+    reporting,
+    revocation,
+    schema,
+    schemas,
+    warmup,
+)
 from .config import settings
-from .db import AsyncSessionLocal, Base, engine, get_db
-from .deps import get_current_user, require_role
-from .models import Tenant, User
+from .db import AsyncSessionLocal, engine, get_db
+from .deps import get_current_user, get_token_principal, require_role
+from .models import User
+from .principals import principal_cache
+from .ratecard import rate_card_cache, rate_card_invalidations
+from .responses import ORJSONResponse
 
-app = FastAPI(title="MoveInSync Billing API")
+app = FastAPI(title="MoveInSync Billing API", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,51 +50,107 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Idempotent-Replayed"],
+)
+app.add_middleware(instrumentation.MetricsMiddleware)
+instrumentation.instrument_engine(engine.sync_engine)
+instrumentation.expose_cache_stats("principal_cache", principal_cache)
+instrumentation.expose_cache_stats("rate_card_cache", rate_card_cache)
+instrumentation.expose_cache_stats("dashboard_memo", reporting.dashboard_memo)
+instrumentation.expose_cache_stats("idempotency_cache", idempotency.recent_trips)
+metrics.callback(
+    "db_query_cache_entries",
+    "Compiled statements held in the engine's query cache.",
+    lambda: len(engine.sync_engine._compiled_cache or ()),
+)
+metrics.callback(
+    "app_startup_seconds",
+    "Time the startup hook took in this process.",
+    lambda: getattr(app.state, "startup_seconds", 0.0),
 )
 
 
+@app.exception_handler(auth.HashPoolSaturated)
+async def hash_pool_saturated_handler(request: Request, exc: auth.HashPoolSaturated):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Authentication is busy, retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
+async def bootstrap_development() -> None:
+    # Migrates an existing database (including the demo moviesync.db) to head rather than
+    # create_all, which would skip the columns and indexes added to existing tables.
+    async with engine.connect() as conn:
+        await schema.upgrade(conn)
+    async with engine.begin() as conn:
+        await partitioning.ensure_upcoming_partitions(conn)
+    async with AsyncSessionLocal() as session:
+        await crud.ensure_default_admins(session)
+
+
 @app.on_event("startup")
 async def startup_event():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    await ensure_default_admins()
+    started = time.perf_counter()
+    # Production workers run no DDL and no seeding: the schema comes from `alembic upgrade
+    # head`, partitions and default admins from their commands, so a new worker is ready
+    # after checking the schema revision.
+    if settings.startup_mode == "development":
+        await bootstrap_development()
+    else:
+        # One read of alembic_version: refuse to serve against an unmigrated schema.
+        async with engine.connect() as conn:
+            await schema.require_head(conn)
+    # The first refresh runs in the background; until it lands the map is stale and
+    # token versions are read from the database.
+    revocation.token_versions.start()
+    # Subscribed before warmup, so a rate change made meanwhile is not missed.
+    rate_card_invalidations.start()
+    # Caches are per process; each worker fills its own before reporting ready.
+    app.state.warmup = await warmup.warm_up()
+    if settings.billing_mode == "queue":
+        billing_worker.start_workers()
+    app.state.startup_seconds = time.perf_counter() - started
+    app.state.ready = True
 
 
-async def ensure_default_admins():
-    default_accounts = [
-        "admin@acme.com",
-        "admin1@acme.com",
-        "admin2@acme.com",
-        "admin3@acme.com",
-    ]
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.ready = False
+    await billing_worker.stop_workers()
+    await revocation.token_versions.stop()
+    await rate_card_invalidations.stop()
+    await reporting.report_cache.close()
+    auth.shutdown_bulk_hash_pool()
+    # Committed chunks are kept; a later close resumes with the remaining vendors.
+    closes = list(month_close.running.values())
+    for task in closes:
+        task.cancel()
+    await asyncio.gather(*closes, return_exceptions=True)
 
-    async with AsyncSessionLocal() as session:
-        tenant = (
-            await session.execute(select(Tenant).where(Tenant.name == "AcmeCorp"))
-        ).scalars().first()
-        if tenant is None:
-            tenant = Tenant(name="AcmeCorp")
-            session.add(tenant)
-            await session.commit()
-            await session.refresh(tenant)
-
-        for email in default_accounts:
-            exists = (
-                await session.execute(select(User).where(User.email == email))
-            ).scalars().first()
-            if exists:
-                continue
-            session.add(
-                User(
-                    email=email,
-                    hashed_password=auth.get_password_hash("123"),
-                    tenant_id=tenant.id,
-                    is_admin=True,
-                    role="admin",
-                )
-            )
-
-        await session.commit()
+
+@app.get("/ready", include_in_schema=False)
+async def readiness():
+    # Redis is not checked: the report cache fails open without it.
+    if not getattr(app.state, "ready", False):
+        return ORJSONResponse({"status": "starting"}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    try:
+        async with AsyncSessionLocal() as session:
+            await asyncio.wait_for(session.execute(text("SELECT 1")), settings.readiness_timeout_seconds)
+    except (asyncio.TimeoutError, SQLAlchemyError, OSError):
+        return ORJSONResponse({"status": "unavailable", "database": "error"}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return {
+        "status": "ready",
+        "database": "ok",
+        "startup_seconds": round(app.state.startup_seconds, 3),
+        "warmup": app.state.warmup,
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.post("/auth/signup", response_model=schemas.Token)
@@ -78,76 +162,354 @@ async def signup(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
         tenant_id=user.tenant_id,
         role=user.role,
     )
-    token = auth.create_access_token({"sub": created.email, "tenant_id": created.tenant_id, "role": created.role})
+    token = auth.create_access_token(await _token_claims(db, created))
     return {"access_token": token, "token_type": "bearer"}
 
 
 @app.post("/auth/login", response_model=schemas.Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     user = await crud.get_user_by_email(db, email=form_data.username)
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+    if not user or not await auth.verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
     access_token = auth.create_access_token(
-        {"sub": user.email, "tenant_id": user.tenant_id, "role": user.role},
+        await _token_claims(db, user),
         expires_delta=timedelta(minutes=settings.access_token_expire_minutes),
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 
+async def _token_claims(db: AsyncSession, user: User) -> dict[str, Any]:
+    # user_id/is_admin let read-only endpoints authorize from the token alone (see get_token_principal).
+    return {
+        "sub": user.email,
+        "tenant_id": user.tenant_id,
+        "role": user.role,
+        "user_id": user.id,
+        "is_admin": bool(user.is_admin),
+        "ver": await revocation.current_token_version(db, user.id),
+    }
+
+
 @app.get("/me", response_model=schemas.UserOut)
 async def read_current_user(current_user=Depends(get_current_user)):
     return current_user
 
 
+@app.post("/users/bulk", response_model=schemas.UserBulkOut)
+async def provision_users(
+    request: Request,
+    current_admin: schemas.UserOut = Depends(require_role("admin")),
+    db: AsyncSession = Depends(get_db),
+):
+    # Body is the CSV itself (Content-Type: text/csv); users join the admin's tenant. Hashing
+    # holds the request for ~0.16 s per row and core, so larger files go through the CLI.
+    try:
+        text = (await request.body()).decode("utf-8-sig")
+        rows, results = provisioning.parse_users_csv(text, settings.provision_request_max_rows)
+    except (UnicodeDecodeError, ValueError) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    results.extend(await provisioning.provision_users(db, current_admin.tenant_id, rows))
+    results.sort(key=lambda result: result["index"])
+    created = sum(1 for result in results if result["status"] == "created")
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+
 @app.get("/users", response_model=list[schemas.UserOut])
 async def list_users(
     current_admin: schemas.UserOut = Depends(require_role("admin")),
     db: AsyncSession = Depends(get_db),
 ):
-    return await crud.list_users_by_tenant(db, tenant_id=current_admin.tenant_id)
+    rows = await crud.list_users_by_tenant(db, tenant_id=current_admin.tenant_id)
+    return ORJSONResponse([dict(zip(crud.USER_LIST_FIELDS, row)) for row in rows])
 
 
-@app.get("/tasks", response_model=list[schemas.TripOut])
+@app.post("/users/{user_id}/revoke-tokens", response_model=schemas.TokenRevocationOut)
+async def revoke_user_tokens(
+    user_id: int,
+    current_admin: schemas.UserOut = Depends(require_role("admin")),
+    db: AsyncSession = Depends(get_db),
+):
+    user = await crud.get_user(db, user_id)
+    if not user or user.tenant_id != current_admin.tenant_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    version = await revocation.revoke_user_tokens(db, user_id)
+    return {"user_id": user_id, "token_version": version}
+
+
+@app.get(
+    "/tasks",
+    response_class=ORJSONResponse,
+    responses={
+        200: {
+            "model": list[schemas.TripListItem],
+            "headers": {
+                "X-Next-Cursor": {"description": "Cursor of the next page; absent on the last one", "schema": {"type": "string"}}
+            },
+        }
+    },
+)
 async def list_tasks(
     user_id: int | None = Query(None, description="Optional user filter"),
-    current_user=Depends(get_current_user),
+    limit: int | None = Query(None, ge=1, description="Page size, capped at TRIP_PAGE_SIZE_MAX"),
+    cursor: str | None = Query(None, description="X-Next-Cursor value from the previous page"),
+    fields: str | None = Query(None, description="Comma-separated fields to return, e.g. to skip payload"),
+    current_user=Depends(get_token_principal),
     db: AsyncSession = Depends(get_db),
 ):
     employee_filter = user_id if current_user.is_admin else current_user.id
+    selected = crud.TRIP_LIST_FIELDS
+    if fields:
+        selected = tuple(name.strip() for name in fields.split(",") if name.strip())
+        unknown = set(selected) - set(crud.TRIP_LIST_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    page_size = min(limit or settings.trip_page_size, settings.trip_page_size_max)
 
-    trips = await crud.list_trips_for_tenant(
+    rows = await crud.list_trips_for_tenant(
         db,
         tenant_id=current_user.tenant_id,
         employee_id=employee_filter,
+        limit=page_size,
+        after=_decode_trip_cursor(cursor) if cursor else None,
+        fields=selected,
     )
-    return trips
+    # Row tuples go straight to orjson instead of being validated through TripOut one by one.
+    headers = {}
+    if not rows:
+        return ORJSONResponse([], headers=headers)
+    positions = [rows[0]._fields.index(name) for name in selected]
+    items = [{name: row[position] for name, position in zip(selected, positions)} for row in rows]
+    if len(rows) == page_size:
+        headers["X-Next-Cursor"] = _encode_trip_cursor(rows[-1].date, rows[-1].id)
+    return ORJSONResponse(items, headers=headers)
+
 
+def _encode_trip_cursor(date: datetime, trip_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{date.isoformat()}|{trip_id}".encode()).decode()
 
-@app.post("/trips", response_model=schemas.TripOut)
+
+def _decode_trip_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        date, trip_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(date), int(trip_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from exc
+
+
+@app.post("/trips", response_model=schemas.TripIngestOut)
 async def add_trip(
     trip_in: schemas.TripIn,
+    response: Response,
+    idempotency_key: str | None = Header(None, min_length=1, max_length=128, description="Used as external_id"),
     db: AsyncSession = Depends(get_db),
-    _: schemas.UserOut = Depends(require_role("admin", "vendor")),
+    current_user: schemas.UserOut = Depends(require_role("admin", "vendor")),
+):
+    # Trips always join the caller's tenant, whatever the body says.
+    trip_in.tenant_id = current_user.tenant_id
+    if idempotency_key is not None:
+        if trip_in.external_id is not None and trip_in.external_id != idempotency_key:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Idempotency-Key does not match external_id")
+        trip_in.external_id = idempotency_key
+    queue = settings.billing_mode == "queue"
+    try:
+        trip, invoice, replayed = await billing.ingest_trip(db, trip_in, enqueue_billing=queue)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    if queue and invoice is None:
+        billing_worker.notify()
+    return schemas.TripIngestOut(
+        **schemas.TripOut.model_validate(trip).model_dump(),
+        invoice=schemas.InvoiceRowOut.model_validate(invoice) if invoice is not None else None,
+    )
+
+
+@app.post("/trips/bulk", response_model=schemas.TripBulkOut)
+async def add_trips_bulk(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.UserOut = Depends(require_role("admin", "vendor")),
 ):
-    trip = await crud.create_trip(db, trip_in.dict())
-    await billing.bill_trip_and_store(db, trip)
-    return trip
+    results: list[dict[str, Any]] = []
+    chunk: list[Tuple[int, schemas.TripIn]] = []
+    async for index, item in _iter_bulk_items(request):
+        try:
+            trip_in = schemas.TripIn.model_validate(item)
+        except ValidationError as exc:
+            error = exc.errors()[0]
+            location = ".".join(str(part) for part in error["loc"])
+            message = f"{location}: {error['msg']}" if location else error["msg"]
+            results.append({"index": index, "status": "error", "error": message})
+            continue
+        # As in POST /trips, rows join the caller's tenant whatever their tenant_id says.
+        trip_in.tenant_id = current_user.tenant_id
+        chunk.append((index, trip_in))
+        if len(chunk) >= settings.bulk_trip_chunk_size:
+            results.extend(await billing.ingest_trip_chunk(db, chunk))
+            chunk = []
+    if chunk:
+        results.extend(await billing.ingest_trip_chunk(db, chunk))
+
+    results.sort(key=lambda result: result["index"])
+    created = sum(1 for result in results if result["status"] == "created")
+    duplicates = sum(1 for result in results if result["status"] == "duplicate")
+    return {"created": created, "duplicates": duplicates, "failed": len(results) - created - duplicates, "results": results}
+
+
+async def _iter_bulk_items(request: Request) -> AsyncIterator[Tuple[int, Any]]:
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        # Parse NDJSON as it arrives so chunks are flushed while the upload is still streaming.
+        index = 0
+        buffer = b""
+        async for data in request.stream():
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield index, _decode_bulk_line(line)
+                    index += 1
+        if buffer.strip():
+            yield index, _decode_bulk_line(buffer)
+        return
+
+    try:
+        items = json.loads(await request.body())
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array") from exc
+    if not isinstance(items, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array")
+    for index, item in enumerate(items):
+        yield index, item
+
+
+def _decode_bulk_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError:
+        # Left for TripIn validation to report against this row.
+        return None
+
+
+@app.put("/vendors/{vendor_id}/billing", response_model=schemas.VendorOut)
+async def update_vendor_billing(
+    vendor_id: int,
+    update: schemas.VendorBillingUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_admin: schemas.UserOut = Depends(require_role("admin")),
+):
+    vendor = await crud.get_vendor(db, vendor_id)
+    if vendor is None or vendor.tenant_id != current_admin.tenant_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Vendor not found")
+    return await crud.update_vendor_billing(
+        db,
+        vendor,
+        billing_model=update.billing_model,
+        billing_config=update.billing_config,
+    )
+
+
+@app.post("/vendors/{vendor_id}/rerate", response_model=schemas.RerateOut)
+async def rerate_vendor(
+    vendor_id: int,
+    year: int,
+    month: int = Query(..., ge=1, le=12),
+    db: AsyncSession = Depends(get_db),
+    current_admin: schemas.UserOut = Depends(require_role("admin")),
+):
+    vendor = await crud.get_vendor(db, vendor_id)
+    if vendor is None or vendor.tenant_id != current_admin.tenant_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Vendor not found")
+    return await billing.rerate_vendor_month(db, vendor_id, year, month)
+
+
+@app.post("/admin/month-close", response_model=schemas.MonthCloseProgress, status_code=status.HTTP_202_ACCEPTED)
+async def start_month_close(
+    year: int,
+    month: int = Query(..., ge=1, le=12),
+    recompute: bool = Query(False, description="Recompute vendors that already have an invoice"),
+    db: AsyncSession = Depends(get_db),
+    current_admin: schemas.UserOut = Depends(require_role("admin")),
+):
+    if reporting.month_bounds(year, month)[1] > datetime.utcnow():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Month has not ended yet")
+    month_close.start_close(current_admin.tenant_id, year, month, recompute=recompute)
+    return await month_close.close_progress(db, current_admin.tenant_id, year, month)
+
+
+@app.get("/admin/month-close", response_model=schemas.MonthCloseProgress)
+async def month_close_progress(
+    year: int,
+    month: int = Query(..., ge=1, le=12),
+    db: AsyncSession = Depends(get_db),
+    current_admin: schemas.UserOut = Depends(require_role("admin")),
+):
+    return await month_close.close_progress(db, current_admin.tenant_id, year, month)
 
 
 @app.get("/reports/vendor/{vendor_id}/monthly")
 async def vendor_report(
     vendor_id: int,
     year: int,
-    month: int,
-    db: AsyncSession = Depends(get_db),
+    month: int = Query(..., ge=1, le=12),
+    format: str = Query("json", pattern=r"^(json|csv)$", description="csv returns the statement as a raw text/csv body"),
+    _: schemas.UserOut = Depends(require_role("admin", "vendor")),
+):
+    statement = await reporting.vendor_monthly_statement(vendor_id, year, month)
+    if format == "csv":
+        # Skips JSON-escaping the whole CSV into a string field; the total moves to a header.
+        return Response(statement["csv"], media_type="text/csv", headers={"X-Statement-Total": str(statement["total"])})
+    return statement
+
+
+@app.get("/reports/vendor/{vendor_id}/monthly.csv")
+async def vendor_report_csv(
+    vendor_id: int,
+    year: int,
+    month: int = Query(..., ge=1, le=12),
+    gzip: bool = Query(False, description="Compress the CSV stream with gzip"),
     _: schemas.UserOut = Depends(require_role("admin", "vendor")),
 ):
-    return await reporting.vendor_monthly_statement(db, vendor_id, year, month)
+    filename = f"vendor-{vendor_id}-{year}-{month:02d}.csv"
+    if gzip:
+        filename += ".gz"
+    return StreamingResponse(
+        reporting.stream_vendor_statement_csv(vendor_id, year, month, compress=gzip),
+        media_type="application/gzip" if gzip else "text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@app.get("/reports/vendor/{vendor_id}/monthly.arrow")
+async def vendor_report_arrow(
+    vendor_id: int,
+    year: int,
+    month: int = Query(..., ge=1, le=12),
+    _: schemas.UserOut = Depends(require_role("admin", "vendor")),
+):
+    # Invoice rows with trip metrics as an Arrow IPC stream (pyarrow.ipc.open_stream).
+    return StreamingResponse(
+        export.stream_statement_arrow(vendor_id, year, month),
+        media_type="application/vnd.apache.arrow.stream",
+        headers={"Content-Disposition": f'attachment; filename="vendor-{vendor_id}-{year}-{month:02d}.arrows"'},
+    )
 
 
 @app.get("/dashboard/summary")
 async def dashboard_summary(
-    current_user=Depends(get_current_user),
+    current_user=Depends(get_token_principal),
     db: AsyncSession = Depends(get_db),
 ):
     return await reporting.dashboard_summary(db, current_user.tenant_id)
+
+
+@app.get("/dashboard/stream")
+async def dashboard_stream(request: Request, current_user=Depends(get_token_principal)):
+    # No get_db here: a yield dependency is torn down only when the stream ends, so it
+    # would hold a pooled connection for as long as the dashboard stays open.
+    return StreamingResponse(
+        reporting.stream_dashboard_summary(current_user.tenant_id, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
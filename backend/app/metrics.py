@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import math
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        # Observed from executor threads as well as the event loop.
+        with self._lock:
+            self.bucket_counts[bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"count": self.count, "sum": self.sum, "buckets": dict(zip(self.buckets, self.bucket_counts))}
+
+
+class HistogramFamily:
+    """Histograms sharing a name, one per combination of label values."""
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.children: Dict[Tuple[str, ...], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str) -> Histogram:
+        child = self.children.get(values)
+        if child is None:
+            with self._lock:
+                child = self.children.setdefault(values, Histogram(self.name, self.documentation, self.buckets))
+        return child
+
+
+class Callback:
+    """A value read at scrape time, e.g. hit counts kept by a cache object."""
+
+    def __init__(self, name: str, documentation: str, kind: str, read: Callable[[], float]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.read = read
+
+
+registry: Dict[str, Counter | Histogram | HistogramFamily | Callback] = {}
+
+
+def counter(name: str, documentation: str) -> Counter:
+    return registry.setdefault(name, Counter(name, documentation))
+
+
+def histogram(name: str, documentation: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return registry.setdefault(name, Histogram(name, documentation, buckets))
+
+
+def histogram_family(
+    name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float] = DEFAULT_BUCKETS
+) -> HistogramFamily:
+    return registry.setdefault(name, HistogramFamily(name, documentation, labelnames, buckets))
+
+
+def callback(name: str, documentation: str, read: Callable[[], float], kind: str = "gauge") -> Callback:
+    registry[name] = metric = Callback(name, documentation, kind, read)
+    return metric
+
+
+def render() -> str:
+    """The registry in the Prometheus text exposition format (version 0.0.4)."""
+    lines: List[str] = []
+    for name in sorted(registry):
+        metric = registry[name]
+        if isinstance(metric, Counter):
+            lines += _header(metric, "counter")
+            lines.append(f"{name} {_number(metric.value)}")
+        elif isinstance(metric, Callback):
+            lines += _header(metric, metric.kind)
+            lines.append(f"{name} {_number(metric.read())}")
+        elif isinstance(metric, Histogram):
+            lines += _header(metric, "histogram")
+            lines += _histogram_lines(name, "", metric)
+        else:
+            lines += _header(metric, "histogram")
+            for values, child in sorted(metric.children.items()):
+                labels = ",".join(f'{key}="{_escape(value)}"' for key, value in zip(metric.labelnames, values))
+                lines += _histogram_lines(name, labels, child)
+    return "\n".join(lines) + "\n"
+
+
+def _header(metric, kind: str) -> List[str]:
+    return [f"# HELP {metric.name} {metric.documentation}", f"# TYPE {metric.name} {kind}"]
+
+
+def _histogram_lines(name: str, labels: str, histogram: Histogram) -> List[str]:
+    snapshot = histogram.snapshot()
+    prefix = f"{labels}," if labels else ""
+    suffix = f"{{{labels}}}" if labels else ""
+    lines = []
+    cumulative = 0
+    for bound, count in snapshot["buckets"].items():
+        cumulative += count
+        lines.append(f'{name}_bucket{{{prefix}le="{_number(bound)}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {snapshot["count"]}')
+    lines.append(f"{name}_sum{suffix} {_number(snapshot['sum'])}")
+    lines.append(f"{name}_count{suffix} {snapshot['count']}")
+    return lines
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
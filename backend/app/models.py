@@ -3,11 +3,29 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any, Dict
 
-from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, JSON, String
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    JSON,
+    PrimaryKeyConstraint,
+    String,
+    UniqueConstraint,
+)
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import relationship
 
+from .config import settings
 from .db import Base
 
+# Matches migration 0001, which picks the invoice_rows primary key per dialect.
+_POSTGRESQL = make_url(settings.database_url).get_backend_name() == "postgresql"
+
 
 class Tenant(Base):
     __tablename__ = "tenants"
@@ -55,23 +73,124 @@ class Trip(Base):
     extra_km = Column(Float, default=0.0)
     extra_hours = Column(Float, default=0.0)
     payload = Column(JSON, default=dict)
+    # The vendor's own id for the trip; retries carrying the same one are not re-ingested.
+    external_id = Column(String, nullable=True)
 
     vendor = relationship("Vendor")
     tenant = relationship("Tenant")
     employee = relationship("User")
 
+    __table_args__ = (
+        Index("ix_trips_tenant_employee_date_id", "tenant_id", "employee_id", "date", "id"),
+        Index("ix_trips_tenant_date_id", "tenant_id", "date", "id"),
+        Index("ix_trips_vendor_date", "vendor_id", "date"),
+        Index("uq_trips_tenant_vendor_external_id", "tenant_id", "vendor_id", "external_id", unique=True),
+    )
+
 
 class InvoiceRow(Base):
     __tablename__ = "invoice_rows"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, autoincrement=True, nullable=False, index=True)
     tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False, index=True)
     vendor_id = Column(Integer, ForeignKey("vendors.id"), nullable=False, index=True)
     trip_id = Column(Integer, ForeignKey("trips.id"), nullable=False, index=True)
     amount = Column(Float, nullable=False)
     note = Column(String, default="auto")
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
     vendor = relationship("Vendor")
     tenant = relationship("Tenant")
     trip = relationship("Trip")
+
+    # On Postgres the table is range-partitioned by month on created_at (see partitioning.py),
+    # which requires the partition key in its primary key. SQLite keeps ``id`` alone so it
+    # stays the rowid alias. The ORM identifies rows by ``id`` on both.
+    __table_args__ = (
+        PrimaryKeyConstraint(*(("id", "created_at") if _POSTGRESQL else ("id",))),
+        Index("ix_invoice_rows_vendor_created_at", "vendor_id", "created_at"),
+        Index("ix_invoice_rows_tenant_created_at", "tenant_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    __mapper_args__ = {"primary_key": [id]}
+
+
+class InvoiceDailyRollup(Base):
+    __tablename__ = "invoice_daily_rollups"
+
+    vendor_id = Column(Integer, ForeignKey("vendors.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False)
+    total_amount = Column(Float, nullable=False, default=0.0)
+    row_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        PrimaryKeyConstraint("vendor_id", "day"),
+        Index("ix_invoice_daily_rollups_tenant_day", "tenant_id", "day"),
+    )
+
+
+class BillingJob(Base):
+    __tablename__ = "billing_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    trip_id = Column(Integer, ForeignKey("trips.id"), nullable=False, unique=True)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False, index=True)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+
+    trip = relationship("Trip")
+
+    __table_args__ = (Index("ix_billing_jobs_status_available_at", "status", "available_at"),)
+
+
+class UserTokenVersion(Base):
+    __tablename__ = "user_token_versions"
+
+    # Tokens carrying a lower "ver" claim than the stored version are revoked.
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class InvoiceArchive(Base):
+    __tablename__ = "invoice_archives"
+
+    # One row per month of invoice_rows moved out to a compressed file; the daily
+    # rollup keeps the totals of archived months.
+    month = Column(Date, primary_key=True)
+    row_count = Column(Integer, nullable=False)
+    total_amount = Column(Float, nullable=False)
+    path = Column(String, nullable=False)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class MonthlyInvoice(Base):
+    __tablename__ = "monthly_invoices"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False)
+    vendor_id = Column(Integer, ForeignKey("vendors.id"), nullable=False)
+    period = Column(Date, nullable=False)
+    billing_model = Column(String, nullable=False)
+    trip_count = Column(Integer, nullable=False, default=0)
+    distance_km = Column(Float, nullable=False, default=0.0)
+    duration_minutes = Column(Integer, nullable=False, default=0)
+    extra_km = Column(Float, nullable=False, default=0.0)
+    extra_hours = Column(Float, nullable=False, default=0.0)
+    base_fee = Column(Float, nullable=False, default=0.0)
+    usage_amount = Column(Float, nullable=False, default=0.0)
+    total_amount = Column(Float, nullable=False, default=0.0)
+    closed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    vendor = relationship("Vendor")
+
+    __table_args__ = (
+        UniqueConstraint("vendor_id", "period", name="uq_monthly_invoices_vendor_period"),
+        Index("ix_monthly_invoices_tenant_period", "tenant_id", "period"),
+    )
@@ -0,0 +1,175 @@
+"""Monthly range partitions of ``invoice_rows`` on ``created_at`` (Postgres only).
+
+Partitions are named ``invoice_rows_yYYYYmMM``, with a default partition for anything
+outside them, and the primary key is ``(id, created_at)``; the ORM still identifies rows
+by ``id``. ``trips`` stays unpartitioned because ``invoice_rows`` and ``billing_jobs``
+reference ``trips.id``. Migration 0006 copies an existing unpartitioned table into the
+default partition, so run it in a maintenance window.
+"""
+from __future__ import annotations
+
+import csv
+import gzip
+import logging
+import os
+from datetime import date, datetime
+from typing import List, Optional
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from . import reporting
+from .config import settings
+from .models import InvoiceArchive, InvoiceRow
+
+logger = logging.getLogger(__name__)
+
+PARENT = InvoiceRow.__tablename__
+DEFAULT_PARTITION = f"{PARENT}_default"
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_of(value: date | datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_y{month.year:04d}m{month.month:02d}"
+
+
+async def ensure_partitions(conn: AsyncConnection, first: date, last: date) -> List[str]:
+    """Create monthly ``invoice_rows`` partitions for ``first``..``last`` (inclusive) on Postgres.
+
+    Rows that already landed in the default partition for a new month are moved into
+    it before it is attached. A no-op on other backends, where ``invoice_rows`` is a
+    plain table and the ``(vendor_id, created_at)``/``(tenant_id, created_at)`` indexes
+    serve the same month-range queries.
+    """
+    if conn.dialect.name != "postgresql":
+        return []
+    kind = (await conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"), {"name": PARENT})).scalar()
+    if kind != "p":
+        # Created before partitioning was introduced; migration 0006 rebuilds it partitioned.
+        logger.warning("%s is not a partitioned table (run `alembic upgrade head`); skipping partition maintenance", PARENT)
+        return []
+    await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT"))
+
+    created = []
+    month = month_of(first)
+    while month <= last:
+        name = partition_name(month)
+        exists = (await conn.execute(text("SELECT to_regclass(:name)"), {"name": name})).scalar()
+        if exists is None:
+            bounds = {"start": _midnight(month), "end": _midnight(add_months(month, 1))}
+            await conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+            await conn.execute(
+                text(
+                    f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end RETURNING *) "
+                    f"INSERT INTO {name} SELECT * FROM moved"
+                ),
+                bounds,
+            )
+            await conn.execute(
+                text(
+                    f"ALTER TABLE {PARENT} ATTACH PARTITION {name} "
+                    f"FOR VALUES FROM ('{bounds['start'].isoformat()}') TO ('{bounds['end'].isoformat()}')"
+                )
+            )
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+async def ensure_upcoming_partitions(conn: AsyncConnection) -> List[str]:
+    current = month_of(datetime.utcnow())
+    return await ensure_partitions(conn, current, add_months(current, settings.partition_months_ahead))
+
+
+async def archived_before(db: AsyncSession) -> Optional[date]:
+    """First day not covered by an archive, or None when nothing was archived."""
+    latest = (await db.execute(select(func.max(InvoiceArchive.month)))).scalar()
+    return add_months(latest, 1) if latest else None
+
+
+async def archive_before(db: AsyncSession, cutoff: date, archive_dir: str, batch_size: int = 5000) -> List[dict]:
+    """Move every month of ``invoice_rows`` before ``cutoff`` to gzip CSV files.
+
+    Each month is written to ``archive_dir`` and flushed to disk before its rows are
+    dropped (detach + drop of the partition on Postgres, a range DELETE elsewhere), and
+    is recorded in ``invoice_archives``. The daily rollup is kept, so totals of archived
+    months stay available while their row-level statements become empty.
+    """
+    cutoff = month_of(cutoff)
+    if cutoff > month_of(datetime.utcnow()):
+        raise ValueError("Cannot archive the current month or later")
+    oldest = (await db.execute(select(func.min(InvoiceRow.created_at)).where(InvoiceRow.created_at < _midnight(cutoff)))).scalar()
+    if oldest is None:
+        return []
+
+    os.makedirs(archive_dir, exist_ok=True)
+    columns = list(InvoiceRow.__table__.columns)
+    archived = []
+    month = month_of(oldest)
+    while month < cutoff:
+        start, end = _midnight(month), _midnight(add_months(month, 1))
+        path = os.path.join(archive_dir, f"{PARENT}_{month.year:04d}_{month.month:02d}.csv.gz")
+        if os.path.exists(path):
+            raise FileExistsError(f"Refusing to overwrite existing archive {path}")
+        row_count, total, vendors = await _export_month(db, columns, start, end, path, batch_size)
+
+        if db.get_bind().dialect.name == "postgresql":
+            name = partition_name(month)
+            if (await db.execute(text("SELECT to_regclass(:name)"), {"name": name})).scalar() is not None:
+                await db.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+                await db.execute(text(f"DROP TABLE {name}"))
+        # Catches rows outside a dedicated partition (the default partition, or SQLite).
+        await db.execute(
+            delete(InvoiceRow)
+            .where(InvoiceRow.created_at >= start)
+            .where(InvoiceRow.created_at < end)
+            .execution_options(synchronize_session=False)
+        )
+        db.add(InvoiceArchive(month=month, row_count=row_count, total_amount=round(total, 2), path=path))
+        await db.commit()
+
+        for vendor_id in vendors:
+            await reporting.invalidate_vendor_statements(vendor_id, [(month.year, month.month)])
+        archived.append({"month": month.isoformat(), "rows": row_count, "total": round(total, 2), "path": path})
+        month = add_months(month, 1)
+    return archived
+
+
+async def _export_month(db: AsyncSession, columns, start: datetime, end: datetime, path: str, batch_size: int):
+    query = (
+        select(*columns)
+        .where(InvoiceRow.created_at >= start)
+        .where(InvoiceRow.created_at < end)
+        .order_by(InvoiceRow.id)
+        .execution_options(yield_per=batch_size)
+    )
+    amount_index = [column.name for column in columns].index("amount")
+    vendor_index = [column.name for column in columns].index("vendor_id")
+    row_count, total, vendors = 0, 0.0, set()
+    partial = path + ".partial"
+    with open(partial, "wb") as raw:
+        with gzip.open(raw, "wt", newline="") as handle:
+            writer = csv.writer(handle)
+            writer.writerow([column.name for column in columns])
+            result = await db.stream(query)
+            async for partition in result.partitions():
+                writer.writerows(partition)
+                row_count += len(partition)
+                total += sum(row[amount_index] for row in partition)
+                vendors.update(row[vendor_index] for row in partition)
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(partial, path)
+    return row_count, total, vendors
+
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+from .cache import TTLCache
+from .config import settings
+from .models import User
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    # Detached snapshot of the fields authorization needs; safe to share across sessions.
+    id: int
+    email: str
+    tenant_id: int
+    role: str
+    is_admin: bool
+
+
+principal_cache = TTLCache(settings.principal_cache_size, settings.principal_cache_ttl_seconds)
+
+
+def principal_from_user(user: User) -> Principal:
+    return Principal(
+        id=user.id,
+        email=user.email,
+        tenant_id=user.tenant_id,
+        role=user.role,
+        is_admin=bool(user.is_admin),
+    )
+
+
+def get_cached_principal(email: str, tenant_id: int) -> Optional[Principal]:
+    return principal_cache.get((email, tenant_id))
+
+
+def cache_principal(principal: Principal) -> None:
+    principal_cache.set((principal.email, principal.tenant_id), principal)
+
+
+def invalidate_principal(email: str, tenant_id: int) -> None:
+    principal_cache.pop((email, tenant_id))
@@ -0,0 +1,79 @@
+"""Statements for hot paths, built once at import with bound parameters.
+
+Building a ``select()`` per call costs Python time on every request, and SQLAlchemy
+then walks the new construct to compute its cache key. These statements are immutable
+and memoize their cache key, so each execution only binds values and looks up the
+compiled SQL in the engine's ``query_cache_size`` LRU (``DB_QUERY_CACHE_SIZE``).
+Column selects return ``Row`` tuples where no ORM identity is needed.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Sequence
+
+from sqlalchemy import Date, DateTime, Integer, bindparam, func, select, tuple_
+
+from .models import InvoiceDailyRollup, InvoiceRow, Trip, User, UserTokenVersion, Vendor
+
+USER_BY_EMAIL = select(User).where(User.email == bindparam("email"))
+USER_BY_ID = select(User).where(User.id == bindparam("user_id"))
+PRINCIPAL_BY_EMAIL = select(User.id, User.email, User.tenant_id, User.role, User.is_admin).where(
+    User.email == bindparam("email")
+)
+
+VENDOR_BY_ID = select(Vendor).where(Vendor.id == bindparam("vendor_id"))
+VENDORS_BY_ID = select(Vendor).where(Vendor.id.in_(bindparam("vendor_ids", expanding=True)))
+
+TOKEN_VERSION = select(UserTokenVersion.version).where(UserTokenVersion.user_id == bindparam("user_id"))
+TOKEN_VERSIONS = select(UserTokenVersion.user_id, UserTokenVersion.version)
+
+# The three dashboard aggregates as scalar subqueries of one SELECT.
+DASHBOARD_SUMMARY = select(
+    select(func.sum(InvoiceDailyRollup.total_amount))
+    .where(InvoiceDailyRollup.tenant_id == bindparam("tenant_id", type_=Integer))
+    .where(InvoiceDailyRollup.day >= bindparam("since", type_=Date))
+    .scalar_subquery(),
+    select(func.count(Vendor.id)).where(Vendor.tenant_id == bindparam("tenant_id", type_=Integer)).scalar_subquery(),
+    select(func.count(Trip.id)).where(Trip.tenant_id == bindparam("tenant_id", type_=Integer)).scalar_subquery(),
+)
+
+
+@lru_cache(maxsize=128)
+def trip_page(columns: Sequence[str], by_employee: bool, after: bool):
+    """Keyset page of a tenant's trips, newest first, for one column projection.
+
+    Binds ``tenant_id`` and ``limit``, plus ``employee_id`` and ``after_date``/``after_id``
+    when the variant filters on them. Each projection/filter combination is built once.
+    """
+    stmt = (
+        select(*(getattr(Trip, name) for name in columns))
+        .where(Trip.tenant_id == bindparam("tenant_id"))
+        .order_by(Trip.date.desc(), Trip.id.desc())
+    )
+    if by_employee:
+        stmt = stmt.where(Trip.employee_id == bindparam("employee_id"))
+    if after:
+        stmt = stmt.where(
+            tuple_(Trip.date, Trip.id)
+            < tuple_(bindparam("after_date", type_=DateTime), bindparam("after_id", type_=Integer))
+        )
+    return stmt.limit(bindparam("limit", type_=Integer))
+
+
+# Statement lines of a vendor-month in id order, and the rows past the highest id a
+# cached copy holds.
+STATEMENT_ROWS = (
+    select(InvoiceRow.id, InvoiceRow.trip_id, InvoiceRow.amount, InvoiceRow.note)
+    .where(InvoiceRow.vendor_id == bindparam("vendor_id"))
+    .where(InvoiceRow.created_at >= bindparam("month_start", type_=DateTime))
+    .where(InvoiceRow.created_at < bindparam("month_end", type_=DateTime))
+    .order_by(InvoiceRow.id)
+)
+STATEMENT_ROWS_AFTER = STATEMENT_ROWS.where(InvoiceRow.id > bindparam("after", type_=Integer))
+STATEMENT_CHECKSUM = (
+    select(func.count(InvoiceRow.id), func.sum(func.round(InvoiceRow.amount * 100)))
+    .where(InvoiceRow.vendor_id == bindparam("vendor_id"))
+    .where(InvoiceRow.created_at >= bindparam("month_start", type_=DateTime))
+    .where(InvoiceRow.created_at < bindparam("month_end", type_=DateTime))
+    .where(InvoiceRow.id <= bindparam("upto", type_=Integer))
+)
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import queries
+from .cache import TTLCache
+from .config import settings
+from .models import Vendor
+from .reporting import report_cache
+
+logger = logging.getLogger(__name__)
+
+
+class RateCard:
+    """A vendor's billing model and config resolved once into rates and a formula.
+
+    ``rate`` and ``rate_arrays`` keep the operation order of the original per-model
+    branches, so scalar and vectorized results stay bit-identical.
+    """
+
+    __slots__ = (
+        "vendor_id",
+        "tenant_id",
+        "model",
+        "per_km",
+        "per_hour",
+        "extra_km_rate",
+        "extra_hour_rate",
+        "monthly_cost",
+        "_formula",
+    )
+
+    def __init__(self, vendor_id: int, tenant_id: int, model: str, cfg: Dict[str, Any]) -> None:
+        self.vendor_id = vendor_id
+        self.tenant_id = tenant_id
+        self.model = model
+        self.per_km = cfg.get("per_km", 1.0)
+        self.per_hour = cfg.get("per_hour", 0.0)
+        self.extra_km_rate = cfg.get("extra_km_rate", 2.0)
+        self.extra_hour_rate = cfg.get("extra_hour_rate", 5.0)
+        self.monthly_cost = cfg.get("monthly_cost", 500.0 if model == "hybrid" else 1000.0)
+        self._formula = {
+            "trip": self._trip,
+            "package": self._package,
+            "hybrid": self._hybrid,
+        }.get(model, self._distance_only)
+
+    def rate(self, trip: Any) -> float:
+        return round(self._formula(trip.distance_km, trip.duration_minutes, trip.extra_km, trip.extra_hours), 2)
+
+    def rate_arrays(
+        self,
+        distance_km: np.ndarray,
+        duration_minutes: np.ndarray,
+        extra_km: np.ndarray,
+        extra_hours: np.ndarray,
+    ) -> np.ndarray:
+        amount = self._formula(distance_km, duration_minutes, extra_km, extra_hours)
+        return round_cents(np.asarray(amount, dtype=np.float64))
+
+    def monthly_charges(
+        self, distance_km: float, duration_minutes: float, extra_km: float, extra_hours: float
+    ) -> tuple[float, float]:
+        """(base fee, usage) for a month from the summed trip metrics.
+
+        Unlike the per-trip formulas, package and hybrid vendors pay ``monthly_cost`` once.
+        """
+        if self.model == "trip":
+            return 0.0, round(self._trip(distance_km, duration_minutes, extra_km, extra_hours), 2)
+        if self.model == "package":
+            return self.monthly_cost, round(extra_km * self.extra_km_rate, 2)
+        if self.model == "hybrid":
+            return self.monthly_cost, round(distance_km * self.per_km + extra_km * self.extra_km_rate, 2)
+        return 0.0, round(self._distance_only(distance_km, duration_minutes, extra_km, extra_hours), 2)
+
+    # The formulas work on floats and NumPy arrays alike.
+    def _trip(self, distance_km, duration_minutes, extra_km, extra_hours):
+        amount = 0.0 + distance_km * self.per_km
+        amount = amount + (duration_minutes / 60) * self.per_hour
+        amount = amount + extra_km * self.extra_km_rate
+        return amount + extra_hours * self.extra_hour_rate
+
+    def _package(self, distance_km, duration_minutes, extra_km, extra_hours):
+        return self.monthly_cost + extra_km * self.extra_km_rate
+
+    def _hybrid(self, distance_km, duration_minutes, extra_km, extra_hours):
+        amount = self.monthly_cost + distance_km * self.per_km
+        return amount + extra_km * self.extra_km_rate
+
+    def _distance_only(self, distance_km, duration_minutes, extra_km, extra_hours):
+        return distance_km * 1.0
+
+
+def round_cents(amounts: np.ndarray) -> np.ndarray:
+    # np.round rounds the value scaled by 100, while round() rounds the exact binary
+    # value. They can only disagree when the scaled value sits on a .5 boundary, so
+    # those few entries are re-rounded with round() itself.
+    rounded = np.round(amounts, 2)
+    scaled = amounts * 100
+    for index in np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6):
+        rounded[index] = round(float(amounts[index]), 2)
+    return rounded
+
+
+def compile_rate_card(vendor: Vendor) -> RateCard:
+    return RateCard(vendor.id, vendor.tenant_id, vendor.billing_model, vendor.billing_config or {})
+
+
+rate_card_cache = TTLCache(settings.rate_card_cache_size, settings.rate_card_cache_ttl_seconds)
+
+
+async def get_rate_card(db: AsyncSession, vendor_id: int) -> Optional[RateCard]:
+    return (await get_rate_cards(db, [vendor_id])).get(vendor_id)
+
+
+async def get_rate_cards(db: AsyncSession, vendor_ids: Iterable[int]) -> Dict[int, RateCard]:
+    cards: Dict[int, RateCard] = {}
+    missing = set()
+    for vendor_id in set(vendor_ids):
+        card = rate_card_cache.get(vendor_id)
+        if card is None:
+            missing.add(vendor_id)
+        else:
+            cards[vendor_id] = card
+    if missing:
+        result = await db.execute(queries.VENDORS_BY_ID, {"vendor_ids": list(missing)})
+        for vendor in result.scalars():
+            card = cards[vendor.id] = compile_rate_card(vendor)
+            rate_card_cache.set(vendor.id, card)
+    return cards
+
+
+RATE_CARD_CHANNEL = "rate_cards:invalidate"
+
+
+async def invalidate_rate_card(vendor_id: int) -> None:
+    # Other workers drop their copy when the message arrives (see RateCardInvalidations).
+    rate_card_cache.pop(vendor_id)
+    await report_cache.redis_call(report_cache.redis.publish, RATE_CARD_CHANNEL, vendor_id)
+
+
+class RateCardInvalidations:
+    """Drops cached rate cards that another process changed, via Redis pub/sub.
+
+    Messages published while this process was not subscribed are lost, so the whole
+    cache is cleared when a subscription comes back after a failure. While Redis is
+    unreachable, other processes' changes apply once the cached card expires
+    (``RATE_CARD_CACHE_TTL_SECONDS``).
+    """
+
+    def __init__(self, retry_seconds: float = 5.0) -> None:
+        self.retry_seconds = retry_seconds
+        self.subscribed = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="rate-card-invalidations")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.subscribed = False
+
+    async def _run(self) -> None:
+        from redis.exceptions import RedisError
+
+        missed = False
+        while True:
+            try:
+                async with report_cache.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(RATE_CARD_CHANNEL)
+                    if missed:
+                        rate_card_cache.clear()
+                    self.subscribed, missed = True, False
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            rate_card_cache.pop(int(message["data"]))
+            except (RedisError, OSError) as exc:
+                if self.subscribed or not missed:
+                    logger.warning("Rate card invalidations unavailable, relying on the cache TTL: %s", exc)
+                self.subscribed, missed = False, True
+                await asyncio.sleep(self.retry_seconds)
+
+
+rate_card_invalidations = RateCardInvalidations()
@@ -1,70 +1,405 @@
 from __future__ import annotations
 
+import asyncio
 import csv
 import io
-from datetime import datetime, timedelta
-
 import json
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Sequence, Tuple
 
-from redis.asyncio import Redis
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from . import metrics, queries
+from .cache import TTLCache, TwoTierCache
 from .config import settings
-from .models import InvoiceRow, Trip, Vendor
+from .db import AsyncSessionLocal
+from .models import InvoiceDailyRollup, InvoiceRow
 
-redis = Redis.from_url(settings.redis_url, encoding="utf-8", decode_responses=True)
+report_cache = TwoTierCache(
+    settings.redis_url,
+    l1_size=settings.report_cache_l1_size,
+    l1_ttl=settings.report_cache_l1_ttl_seconds,
+    fresh_ttl=settings.report_cache_ttl_seconds,
+    stale_ttl=settings.report_cache_ttl_seconds + settings.report_cache_stale_seconds,
+    name="report_cache",
+)
+dashboard_memo = TTLCache(settings.dashboard_memo_size, settings.dashboard_memo_ttl_seconds)
+_dashboard_changed: Dict[int, asyncio.Event] = {}
 
+STATEMENT_CSV_HEADER = ["invoice_row_id", "trip_id", "amount", "note"]
 
-async def vendor_monthly_statement(db: AsyncSession, vendor_id: int, year: int, month: int) -> dict:
-    cache_key = f"reports:vendor:{vendor_id}:{year}:{month}"
-    cached = await redis.get(cache_key)
-    if cached:
-        return json.loads(cached)
 
+def month_bounds(year: int, month: int) -> Tuple[datetime, datetime]:
     month_start = datetime(year, month, 1)
-    month_end = month_start + timedelta(days=32)
-    month_end = month_end.replace(day=1)
+    month_end = (month_start + timedelta(days=32)).replace(day=1)
+    return month_start, month_end
+
+
+def statement_cache_key(vendor_id: int, year: int, month: int) -> str:
+    return f"reports:vendor:{vendor_id}:{year}:{month}"
+
+
+# A vendor-month statement lives in Redis as a sorted set of CSV lines scored by invoice
+# row id (``<key>:rows``) and a hash (``<key>:meta``) with the total in cents, the row
+# count and ``complete``. Rows are added at most once per id, in any order, so appends
+# from concurrent writers never need to arrive in id order.
+#
+# While a statement is being built, ``<key>:building`` holds the builder's token and
+# appends go into the partial set: a row committed after the build's query is kept
+# rather than dropped. The build only stores if its token is still there, so an
+# invalidation (or a newer build) in the meantime discards it.
+_ADD_ROW = """
+local function add(id, cents, line)
+    if #redis.call('ZRANGEBYSCORE', KEYS[1], id, id, 'LIMIT', 0, 1) > 0 then return 0 end
+    redis.call('ZADD', KEYS[1], id, line)
+    redis.call('HINCRBY', KEYS[2], 'total_cents', cents)
+    redis.call('HINCRBY', KEYS[2], 'rows', 1)
+    return 1
+end
+"""
+_READ_STATEMENT = """
+if redis.call('HGET', KEYS[2], 'complete') ~= '1' then return {} end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+local top = redis.call('ZRANGE', KEYS[1], -1, -1, 'WITHSCORES')
+return {redis.call('HGET', KEYS[2], 'total_cents'), top[2] or '0', redis.call('ZRANGE', KEYS[1], 0, -1)}
+"""
+# ARGV: ttl, then (id, cents, line) per row.
+_APPEND_STATEMENT = _ADD_ROW + """
+if redis.call('HGET', KEYS[2], 'complete') ~= '1' and redis.call('EXISTS', KEYS[3]) == 0 then return 0 end
+local added = 0
+for i = 2, #ARGV, 3 do added = added + add(ARGV[i], ARGV[i + 1], ARGV[i + 2]) end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return added
+"""
+# ARGV: ttl, builder token, then (id, cents, line) per row.
+_STORE_STATEMENT = _ADD_ROW + """
+if redis.call('GET', KEYS[3]) ~= ARGV[2] then return 0 end
+redis.call('DEL', KEYS[3])
+redis.call('HSETNX', KEYS[2], 'total_cents', 0)
+redis.call('HSETNX', KEYS[2], 'rows', 0)
+for i = 3, #ARGV, 3 do add(ARGV[i], ARGV[i + 1], ARGV[i + 2]) end
+redis.call('HSET', KEYS[2], 'complete', 1)
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return 1
+"""
+# Longer than any whole-month query; a build that outlives it is not stored.
+BUILD_MARKER_SECONDS = 300
+
+statement_builds = metrics.counter("statement_builds_total", "Statements materialized in Redis from a whole-month query.")
+statement_rows_appended = metrics.counter("statement_rows_appended_total", "Invoice rows appended to statements on write.")
+statement_catchup_rows = metrics.counter(
+    "statement_catchup_rows_total", "Invoice rows a statement read fetched past the highest cached id."
+)
+statement_rebuilds = metrics.counter("statement_rebuilds_total", "Statements rebuilt by compaction after a mismatch.")
+_materializing: Dict[str, asyncio.Task] = {}
+
+
+def statement_keys(vendor_id: int, year: int, month: int) -> Tuple[str, str, str]:
+    key = statement_cache_key(vendor_id, year, month)
+    return f"{key}:rows", f"{key}:meta", f"{key}:building"
+
+
+def _cents(amount: float) -> int:
+    return int(round(amount * 100))
+
+
+def _csv_lines(rows: Iterable[Sequence[Any]]) -> List[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    lines = []
+    for row in rows:
+        writer.writerow(row)
+        lines.append(buffer.getvalue())
+        buffer.seek(0)
+        buffer.truncate()
+    return lines
+
+
+def _script_rows(rows: Sequence[Sequence[Any]], lines: Sequence[str]) -> List[Any]:
+    args: List[Any] = []
+    for row, line in zip(rows, lines):
+        args += [row[0], _cents(row[2]), line]
+    return args
+
+
+STATEMENT_CSV_HEADER_LINE = _csv_lines([STATEMENT_CSV_HEADER])[0]
+
+
+async def _run_script(source: str, keys: Sequence[str], args: List[Any]) -> Any:
+    # None when Redis is unavailable.
+    return await report_cache.redis_call(report_cache.redis.register_script(source), keys=list(keys), args=args)
+
+
+async def vendor_monthly_statement(vendor_id: int, year: int, month: int) -> dict:
+    """The vendor-month statement, including every invoice row committed so far.
+
+    The first read of a month materializes it in Redis; later reads fetch the cached
+    lines plus only the rows with an id past the highest cached one (usually none,
+    since writers append their rows). Without Redis it falls back to the whole-month
+    query behind the in-process cache.
+    """
+    keys = statement_keys(vendor_id, year, month)
+    cached = await _run_script(_READ_STATEMENT, keys[:2], [settings.statement_cache_ttl_seconds])
+    if cached is None:
+        return await report_cache.get_or_load(
+            statement_cache_key(vendor_id, year, month),
+            lambda: _build_vendor_statement(vendor_id, year, month),
+        )
+    if not cached:
+        return await _materialize(vendor_id, year, month)
+
+    total_cents, top_id, lines = int(cached[0]), int(float(cached[1])), cached[2]
+    month_start, month_end = month_bounds(year, month)
+    async with AsyncSessionLocal() as db:
+        rows = (
+            await db.execute(
+                queries.STATEMENT_ROWS_AFTER,
+                {"vendor_id": vendor_id, "month_start": month_start, "month_end": month_end, "after": top_id},
+            )
+        ).all()
+    if rows:
+        statement_catchup_rows.inc(len(rows))
+        new_lines = _csv_lines(rows)
+        await _append(keys, rows, new_lines)
+        lines = lines + new_lines
+        total_cents += sum(_cents(row.amount) for row in rows)
+    return {"total": round(total_cents / 100, 2), "csv": STATEMENT_CSV_HEADER_LINE + "".join(lines)}
+
+
+async def append_statement_rows(rows: Iterable[Tuple[int, int, int, float, str, datetime]]) -> None:
+    """Add committed ``(invoice_row_id, vendor_id, trip_id, amount, note, created_at)`` rows
+    to the statements materialized, or being built, for their vendor-months."""
+    grouped: Dict[Tuple[int, int, int], List[Tuple[int, int, float, str]]] = {}
+    for row_id, vendor_id, trip_id, amount, note, created_at in rows:
+        grouped.setdefault((vendor_id, created_at.year, created_at.month), []).append((row_id, trip_id, amount, note))
+    for (vendor_id, year, month), statement_rows in grouped.items():
+        report_cache.l1.pop(statement_cache_key(vendor_id, year, month))
+        await _append(statement_keys(vendor_id, year, month), statement_rows, _csv_lines(statement_rows))
+
+
+async def _append(keys: Sequence[str], rows: Sequence[Sequence[Any]], lines: Sequence[str]) -> None:
+    args = [settings.statement_cache_ttl_seconds, *_script_rows(rows, lines)]
+    added = await _run_script(_APPEND_STATEMENT, keys, args)
+    if added:
+        statement_rows_appended.inc(added)
+
+
+async def _materialize(vendor_id: int, year: int, month: int) -> dict:
+    # One whole-month query per statement and process, however many readers arrive.
+    key = statement_cache_key(vendor_id, year, month)
+    task = _materializing.get(key)
+    if task is None:
+        task = _materializing[key] = asyncio.ensure_future(_store_statement(vendor_id, year, month))
+        task.add_done_callback(lambda _: _materializing.pop(key, None))
+    return await asyncio.shield(task)
+
+
+async def _store_statement(vendor_id: int, year: int, month: int) -> dict:
+    # The marker is set before the query, so every row committed after the query's
+    # snapshot is appended to the partial set by its writer.
+    keys = statement_keys(vendor_id, year, month)
+    token = uuid.uuid4().hex
+    marked = await report_cache.redis_call(report_cache.redis.set, keys[2], token, ex=BUILD_MARKER_SECONDS)
+    rows = await _statement_rows(vendor_id, year, month)
+    lines = _csv_lines(rows)
+    if marked:
+        args = [settings.statement_cache_ttl_seconds, token, *_script_rows(rows, lines)]
+        if await _run_script(_STORE_STATEMENT, keys, args):
+            statement_builds.inc()
+    total_cents = sum(_cents(row.amount) for row in rows)
+    return {"total": round(total_cents / 100, 2), "csv": STATEMENT_CSV_HEADER_LINE + "".join(lines)}
+
+
+async def _statement_rows(vendor_id: int, year: int, month: int) -> list:
+    month_start, month_end = month_bounds(year, month)
+    async with AsyncSessionLocal() as db:
+        params = {"vendor_id": vendor_id, "month_start": month_start, "month_end": month_end}
+        return (await db.execute(queries.STATEMENT_ROWS, params)).all()
+
+
+async def invalidate_vendor_statements(vendor_id: int, months: Iterable[Tuple[int, int]] | None = None) -> None:
+    # For changes to existing rows (re-rating, archiving); new rows are appended instead.
+    # Without months every cached statement of the vendor is dropped. Deleting the build
+    # marker keeps a build that read the old rows from being stored.
+    if months is None:
+        await report_cache.invalidate_prefix(f"reports:vendor:{vendor_id}:")
+        return
+    for year, month in set(months):
+        await report_cache.invalidate(statement_cache_key(vendor_id, year, month))
+        await report_cache.redis_call(report_cache.redis.delete, *statement_keys(vendor_id, year, month))
+
+
+async def compact_statements() -> dict:
+    """Check every materialized statement against ``invoice_rows`` and rebuild mismatches.
+
+    Compares the row count, total in cents and set size with the rows up to the
+    highest cached id. A mismatch means a write was missed: a process that stopped
+    between committing invoice rows and appending them, or an append or invalidation
+    that failed while Redis was unavailable.
+    """
+    redis = report_cache.redis
+    checked = 0
+    rebuilt = []
+    async for meta_key in redis.scan_iter(match="reports:vendor:*:meta"):
+        _, _, vendor_id, year, month, _ = meta_key.split(":")
+        vendor_id, year, month = int(vendor_id), int(year), int(month)
+        keys = statement_keys(vendor_id, year, month)
+        async with redis.pipeline(transaction=True) as pipe:
+            (complete, total_cents, row_count), size, top = await (
+                pipe.hmget(meta_key, "complete", "total_cents", "rows")
+                .zcard(keys[0])
+                .zrange(keys[0], -1, -1, withscores=True)
+                .execute()
+            )
+        if complete != "1":
+            continue
+        month_start, month_end = month_bounds(year, month)
+        upto = int(top[0][1]) if top else 0
+        async with AsyncSessionLocal() as db:
+            expected_rows, expected_cents = (
+                await db.execute(
+                    queries.STATEMENT_CHECKSUM,
+                    {"vendor_id": vendor_id, "month_start": month_start, "month_end": month_end, "upto": upto},
+                )
+            ).one()
+        checked += 1
+        cached = (int(row_count), int(total_cents), size)
+        expected = (expected_rows, int(expected_cents or 0), expected_rows)
+        if cached != expected:
+            await redis.delete(*keys)
+            await _store_statement(vendor_id, year, month)
+            statement_rebuilds.inc()
+            rebuilt.append({"vendor_id": vendor_id, "year": year, "month": month, "cached": cached, "expected": expected})
+    return {"checked": checked, "rebuilt": rebuilt}
+
+
+async def _build_vendor_statement(vendor_id: int, year: int, month: int) -> dict:
+    # Uses its own session: the result is shared by coalesced requests and may be
+    # computed in the background while a stale copy is served.
+    async with AsyncSessionLocal() as db:
+        return await _query_vendor_statement(db, vendor_id, year, month)
+
+
+async def _query_vendor_statement(db: AsyncSession, vendor_id: int, year: int, month: int) -> dict:
+    # Half-open created_at bounds match the monthly partitions, so Postgres scans one.
+    month_start, month_end = month_bounds(year, month)
 
     query = (
         select(InvoiceRow)
         .where(InvoiceRow.vendor_id == vendor_id)
         .where(InvoiceRow.created_at >= month_start)
         .where(InvoiceRow.created_at < month_end)
+        .order_by(InvoiceRow.id)
     )
     rows = (await db.execute(query)).scalars().all()
-    total = sum(row.amount for row in rows)
+    total_stmt = (
+        select(func.sum(InvoiceDailyRollup.total_amount))
+        .where(InvoiceDailyRollup.vendor_id == vendor_id)
+        .where(InvoiceDailyRollup.day >= month_start.date())
+        .where(InvoiceDailyRollup.day < month_end.date())
+    )
+    total = round((await db.execute(total_stmt)).scalar() or 0.0, 2)
 
     csv_buffer = io.StringIO()
     writer = csv.writer(csv_buffer)
-    writer.writerow(["invoice_row_id", "trip_id", "amount", "note"])
+    writer.writerow(STATEMENT_CSV_HEADER)
     for row in rows:
         writer.writerow([row.id, row.trip_id, row.amount, row.note])
 
     payload = csv_buffer.getvalue()
-    response = {"total": total, "csv": payload}
-    await redis.setex(cache_key, 3600, json.dumps(response))
-    return response
+    return {"total": total, "csv": payload}
+
+
+async def stream_vendor_statement_csv(
+    vendor_id: int,
+    year: int,
+    month: int,
+    *,
+    compress: bool = False,
+    batch_size: int = 2000,
+) -> AsyncIterator[bytes]:
+    # Opens its own session: the response body is produced after the request's
+    # dependencies have been torn down.
+    month_start, month_end = month_bounds(year, month)
+    query = (
+        select(InvoiceRow.id, InvoiceRow.trip_id, InvoiceRow.amount, InvoiceRow.note)
+        .where(InvoiceRow.vendor_id == vendor_id)
+        .where(InvoiceRow.created_at >= month_start)
+        .where(InvoiceRow.created_at < month_end)
+        .order_by(InvoiceRow.created_at, InvoiceRow.id)
+        .execution_options(yield_per=batch_size)
+    )
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(STATEMENT_CSV_HEADER)
+
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(query)
+        async for partition in result.partitions():
+            writer.writerows(partition)
+            chunk = buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            yield compressor.compress(chunk) if compressor else chunk
+
+    tail = buffer.getvalue().encode()
+    if compressor:
+        yield compressor.compress(tail) + compressor.flush()
+    elif tail:
+        yield tail
 
 
 async def dashboard_summary(db: AsyncSession, tenant_id: int) -> dict:
+    cached = dashboard_memo.get(tenant_id)
+    if cached is not None:
+        return cached
+
     today = datetime.utcnow()
     month_start = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
-    trip_total_stmt = (
-        select(func.sum(InvoiceRow.amount))
-        .where(InvoiceRow.tenant_id == tenant_id)
-        .where(InvoiceRow.created_at >= month_start)
-    )
-    vendor_count_stmt = select(func.count(Vendor.id)).where(Vendor.tenant_id == tenant_id)
-    pending_stmt = select(func.count(Trip.id)).where(Trip.tenant_id == tenant_id)
+    # One round-trip: the three aggregates are scalar subqueries of a single SELECT.
+    total, vendors, pending = (
+        await db.execute(queries.DASHBOARD_SUMMARY, {"tenant_id": tenant_id, "since": month_start.date()})
+    ).one()
 
-    total = (await db.execute(trip_total_stmt)).scalar() or 0.0
-    vendors = (await db.execute(vendor_count_stmt)).scalar() or 0
-    pending = (await db.execute(pending_stmt)).scalar() or 0
-
-    return {
-        "monthly_total": round(total, 2),
-        "vendors": vendors,
-        "pending": pending,
+    summary = {
+        "monthly_total": round(total or 0.0, 2),
+        "vendors": vendors or 0,
+        "pending": pending or 0,
     }
+    dashboard_memo.set(tenant_id, summary)
+    return summary
+
+
+def invalidate_dashboard(tenant_id: int) -> None:
+    dashboard_memo.pop(tenant_id)
+    changed = _dashboard_changed.pop(tenant_id, None)
+    if changed is not None:
+        changed.set()
+
+
+async def stream_dashboard_summary(tenant_id: int, is_disconnected: Callable[[], Awaitable[bool]]) -> AsyncIterator[str]:
+    # Server-sent events: pushes the summary whenever this worker sees a write for the
+    # tenant, and re-checks every DASHBOARD_STREAM_INTERVAL_SECONDS to pick up writes
+    # handled by other workers.
+    last = None
+    while not await is_disconnected():
+        changed = _dashboard_changed.setdefault(tenant_id, asyncio.Event())
+        async with AsyncSessionLocal() as db:
+            summary = await dashboard_summary(db, tenant_id)
+        if summary != last:
+            yield f"event: summary\ndata: {json.dumps(summary)}\n\n"
+            last = summary
+        else:
+            yield ": keep-alive\n\n"
+        try:
+            await asyncio.wait_for(changed.wait(), timeout=settings.dashboard_stream_interval_seconds)
+        except asyncio.TimeoutError:
+            pass
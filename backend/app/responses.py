@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """Default response class: orjson encodes datetimes, dataclasses and NumPy values natively.
+
+    FastAPI's own ORJSONResponse is deprecated in favour of response-model serialization,
+    which still validates every item; list endpoints return this class directly from
+    row tuples instead.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import queries
+from .config import settings
+from .db import AsyncSessionLocal
+from .models import UserTokenVersion
+
+logger = logging.getLogger(__name__)
+
+
+class TokenVersionMap:
+    """In-memory copy of ``user_token_versions`` used to reject revoked tokens without a query.
+
+    Only users whose tokens were ever revoked have a row, so the map stays small and is
+    reloaded whole every ``TOKEN_VERSION_REFRESH_SECONDS``. Revocations made in this
+    process apply immediately; those made by other processes are picked up by the next
+    refresh. Once the last successful refresh is older than
+    ``TOKEN_VERSION_MAX_STALENESS_SECONDS`` the map reports itself stale and callers
+    fall back to checking the database.
+    """
+
+    def __init__(self, refresh_interval: float, max_staleness: float) -> None:
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.versions: Dict[int, int] = {}
+        self.refreshed_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def version(self, user_id: int) -> int:
+        return self.versions.get(user_id, 0)
+
+    def is_stale(self) -> bool:
+        return self.refreshed_at is None or time.monotonic() - self.refreshed_at > self.max_staleness
+
+    async def refresh(self) -> None:
+        started = time.monotonic()
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(queries.TOKEN_VERSIONS)).all()
+        self.versions = dict(rows)
+        self.refreshed_at = started
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="token-version-refresh")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except SQLAlchemyError:
+                logger.exception("Failed to refresh token versions")
+            await asyncio.sleep(self.refresh_interval)
+
+
+token_versions = TokenVersionMap(settings.token_version_refresh_seconds, settings.token_version_max_staleness_seconds)
+
+
+async def current_token_version(db: AsyncSession, user_id: int) -> int:
+    version = await db.scalar(queries.TOKEN_VERSION, {"user_id": user_id})
+    return version or 0
+
+
+async def is_token_revoked(db: Optional[AsyncSession], user_id: int, token_version: int) -> bool:
+    if not token_versions.is_stale():
+        return token_version < token_versions.version(user_id)
+    if db is None:
+        async with AsyncSessionLocal() as session:
+            return token_version < await current_token_version(session, user_id)
+    return token_version < await current_token_version(db, user_id)
+
+
+async def revoke_user_tokens(db: AsyncSession, user_id: int) -> int:
+    """Invalidate every token issued to ``user_id`` so far; returns the new version."""
+    now = datetime.utcnow()
+    # One upsert, so concurrent first revocations of a user increment the same row
+    # instead of both inserting it.
+    dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(UserTokenVersion).values(user_id=user_id, version=1, updated_at=now)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserTokenVersion.user_id],
+        set_={"version": UserTokenVersion.version + 1, "updated_at": stmt.excluded.updated_at},
+    ).returning(UserTokenVersion.version)
+    version = (await db.execute(stmt)).scalar_one()
+    await db.commit()
+    token_versions.versions[user_id] = max(version, token_versions.version(user_id))
+    return version
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import InvoiceDailyRollup, InvoiceRow
+from .partitioning import archived_before
+
+# Rollup totals are float sums accumulated in a different order than a raw SUM.
+TOTAL_TOLERANCE = 0.005
+
+
+async def apply_invoice_rows(
+    db: AsyncSession,
+    rows: Iterable[Tuple[int, int, datetime, float]],
+) -> None:
+    """Add ``(tenant_id, vendor_id, created_at, amount)`` rows to the daily rollup.
+
+    Runs inside the caller's transaction so rollup and invoice rows commit together.
+    """
+    buckets: Dict[Tuple[int, date], List] = {}
+    for tenant_id, vendor_id, created_at, amount in rows:
+        bucket = buckets.setdefault((vendor_id, created_at.date()), [tenant_id, 0.0, 0])
+        bucket[1] += amount
+        bucket[2] += 1
+    if not buckets:
+        return
+
+    values = [
+        {"vendor_id": vendor_id, "day": day, "tenant_id": tenant_id, "total_amount": total, "row_count": count}
+        for (vendor_id, day), (tenant_id, total, count) in buckets.items()
+    ]
+    dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(InvoiceDailyRollup).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[InvoiceDailyRollup.vendor_id, InvoiceDailyRollup.day],
+        set_={
+            "total_amount": InvoiceDailyRollup.total_amount + stmt.excluded.total_amount,
+            "row_count": InvoiceDailyRollup.row_count + stmt.excluded.row_count,
+        },
+    )
+    await db.execute(stmt)
+
+
+async def rebuild(
+    db: AsyncSession,
+    *,
+    tenant_id: Optional[int] = None,
+    vendor_id: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> None:
+    """Recompute the rollup from ``invoice_rows`` for the given scope (days in ``[start, end)``).
+
+    Like ``apply_invoice_rows`` this leaves committing to the caller. Archived months
+    have no rows left to recompute from, so their rollup days are never touched.
+    """
+    live_from = await archived_before(db)
+    if live_from is not None:
+        start = max(start, live_from) if start is not None else live_from
+    clear = delete(InvoiceDailyRollup)
+    source = select(
+        InvoiceRow.vendor_id,
+        func.date(InvoiceRow.created_at).label("day"),
+        func.min(InvoiceRow.tenant_id),
+        func.sum(InvoiceRow.amount),
+        func.count(InvoiceRow.id),
+    ).group_by(InvoiceRow.vendor_id, func.date(InvoiceRow.created_at))
+
+    if tenant_id is not None:
+        clear = clear.where(InvoiceDailyRollup.tenant_id == tenant_id)
+        source = source.where(InvoiceRow.tenant_id == tenant_id)
+    if vendor_id is not None:
+        clear = clear.where(InvoiceDailyRollup.vendor_id == vendor_id)
+        source = source.where(InvoiceRow.vendor_id == vendor_id)
+    if start is not None:
+        clear = clear.where(InvoiceDailyRollup.day >= start)
+        source = source.where(InvoiceRow.created_at >= datetime.combine(start, datetime.min.time()))
+    if end is not None:
+        clear = clear.where(InvoiceDailyRollup.day < end)
+        source = source.where(InvoiceRow.created_at < datetime.combine(end, datetime.min.time()))
+
+    await db.execute(clear)
+    await db.execute(
+        insert(InvoiceDailyRollup).from_select(
+            ["vendor_id", "day", "tenant_id", "total_amount", "row_count"],
+            source,
+        )
+    )
+
+
+async def check(db: AsyncSession, *, tenant_id: Optional[int] = None) -> List[dict]:
+    """Compare the rollup with a raw aggregate of ``invoice_rows`` and return mismatching days."""
+    raw_stmt = select(
+        InvoiceRow.vendor_id,
+        func.date(InvoiceRow.created_at),
+        func.sum(InvoiceRow.amount),
+        func.count(InvoiceRow.id),
+    ).group_by(InvoiceRow.vendor_id, func.date(InvoiceRow.created_at))
+    rollup_stmt = select(
+        InvoiceDailyRollup.vendor_id,
+        InvoiceDailyRollup.day,
+        InvoiceDailyRollup.total_amount,
+        InvoiceDailyRollup.row_count,
+    )
+    if tenant_id is not None:
+        raw_stmt = raw_stmt.where(InvoiceRow.tenant_id == tenant_id)
+        rollup_stmt = rollup_stmt.where(InvoiceDailyRollup.tenant_id == tenant_id)
+    live_from = await archived_before(db)
+    if live_from is not None:
+        rollup_stmt = rollup_stmt.where(InvoiceDailyRollup.day >= live_from)
+
+    raw = {(vendor, _as_date(day)): (total, count) for vendor, day, total, count in await db.execute(raw_stmt)}
+    rolled = {(vendor, day): (total, count) for vendor, day, total, count in await db.execute(rollup_stmt)}
+
+    mismatches = []
+    for key in sorted(raw.keys() | rolled.keys()):
+        expected_total, expected_count = raw.get(key, (0.0, 0))
+        actual_total, actual_count = rolled.get(key, (0.0, 0))
+        if expected_count != actual_count or abs(expected_total - actual_total) > TOTAL_TOLERANCE:
+            mismatches.append(
+                {
+                    "vendor_id": key[0],
+                    "day": key[1].isoformat(),
+                    "expected_total": expected_total,
+                    "rollup_total": actual_total,
+                    "expected_count": expected_count,
+                    "rollup_count": actual_count,
+                }
+            )
+    return mismatches
+
+
+def _as_date(value) -> date:
+    # SQLite's date() returns ISO strings, Postgres returns date objects.
+    return date.fromisoformat(value) if isinstance(value, str) else value
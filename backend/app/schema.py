@@ -0,0 +1,97 @@
+"""The database schema's Alembic revision, checked or brought to head from the app."""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from . import models  # noqa: F401  (registers the tables)
+from .db import Base, engine
+
+ALEMBIC_INI = Path(__file__).resolve().parents[1] / "alembic.ini"
+BASELINE_REVISION = "0001"
+# Tables of revision 0001, the schema the original create_all produced.
+BASELINE_TABLES = {"tenants", "users", "vendors", "trips", "invoice_rows"}
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+def alembic_config(connection: Optional[Connection] = None) -> Config:
+    config = Config(str(ALEMBIC_INI))
+    if connection is not None:
+        # migrations/env.py runs on this connection instead of opening its own engine.
+        config.attributes["connection"] = connection
+    return config
+
+
+def head_revision() -> str:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(connection: Connection) -> Optional[str]:
+    return MigrationContext.configure(connection).get_current_revision()
+
+
+async def require_head(conn: AsyncConnection) -> None:
+    """Raise SchemaOutOfDate unless the database is at the latest migration."""
+    current, head = await conn.run_sync(current_revision), head_revision()
+    if current != head:
+        raise SchemaOutOfDate(
+            f"Database schema is at revision {current or 'none'}, expected {head}; run `alembic upgrade head`"
+        )
+
+
+async def exit_unless_head() -> None:
+    """For commands: exit with SchemaOutOfDate's message unless the database is at head."""
+    async with engine.connect() as conn:
+        try:
+            await require_head(conn)
+        except SchemaOutOfDate as exc:
+            raise SystemExit(str(exc)) from exc
+
+
+async def upgrade(conn: AsyncConnection) -> None:
+    """Bring the database to the latest migration, as ``alembic upgrade head`` does.
+
+    A database without Alembic's version table is stamped first: at ``0001`` when it has
+    exactly the original tables (such as the demo ``moviesync.db``), or at head when it
+    already matches the models. Anything else raises SchemaOutOfDate.
+    """
+    await conn.run_sync(_upgrade)
+
+
+def _upgrade(connection: Connection) -> None:
+    config = alembic_config(connection)
+    if current_revision(connection) is None:
+        stamp = _unversioned_revision(connection)
+        # Alembic runs each revision in its own transaction.
+        connection.commit()
+        if stamp is not None:
+            command.stamp(config, stamp)
+    else:
+        connection.commit()
+    command.upgrade(config, "head")
+
+
+def _unversioned_revision(connection: Connection) -> Optional[str]:
+    tables = set(inspect(connection).get_table_names())
+    if not tables:
+        return None
+    if tables == BASELINE_TABLES:
+        return BASELINE_REVISION
+    if not compare_metadata(MigrationContext.configure(connection), Base.metadata):
+        return "head"
+    raise SchemaOutOfDate(
+        "Database has tables but no Alembic revision, and matches neither revision 0001 nor the models; "
+        "mark it with `alembic stamp <revision>` and run `alembic upgrade head`"
+    )
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
@@ -30,6 +30,26 @@ class UserCreate(UserBase):
     password: str
 
 
+class UserProvisionRow(BaseModel):
+    email: EmailStr
+    password: str = Field(min_length=1)
+    role: str = Field("employee", pattern=r"^(admin|vendor|employee)$")
+
+
+class UserBulkResult(BaseModel):
+    index: int
+    email: Optional[str] = None
+    status: str
+    user_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class UserBulkOut(BaseModel):
+    created: int
+    failed: int
+    results: List[UserBulkResult]
+
+
 class UserOut(BaseModel):
     id: int
     email: EmailStr
@@ -45,6 +65,26 @@ class Token(BaseModel):
     token_type: str = "bearer"
 
 
+class TokenRevocationOut(BaseModel):
+    user_id: int
+    token_version: int
+
+
+class VendorBillingUpdate(BaseModel):
+    billing_model: str = Field(..., pattern=r"^(trip|package|hybrid)$")
+    billing_config: Dict[str, float] = {}
+
+
+class VendorOut(BaseModel):
+    id: int
+    tenant_id: int
+    name: str
+    billing_model: str
+    billing_config: Dict[str, Any] = {}
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class TripIn(BaseModel):
     tenant_id: int
     vendor_id: int
@@ -55,6 +95,7 @@ class TripIn(BaseModel):
     extra_km: float = 0.0
     extra_hours: float = 0.0
     payload: Dict[str, Any] = {}
+    external_id: Optional[str] = Field(None, min_length=1, max_length=128)
 
 
 class TripOut(TripIn):
@@ -63,6 +104,54 @@ class TripOut(TripIn):
     model_config = ConfigDict(from_attributes=True)
 
 
+class TripListItem(BaseModel):
+    # A /tasks row; with ``fields`` only the selected keys are present.
+    id: Optional[int] = None
+    tenant_id: Optional[int] = None
+    vendor_id: Optional[int] = None
+    employee_id: Optional[int] = None
+    distance_km: Optional[float] = None
+    duration_minutes: Optional[int] = None
+    date: Optional[datetime] = None
+    extra_km: Optional[float] = None
+    extra_hours: Optional[float] = None
+    payload: Optional[Dict[str, Any]] = None
+    external_id: Optional[str] = None
+
+
+class TripBulkResult(BaseModel):
+    index: int
+    status: str
+    trip_id: Optional[int] = None
+    invoice_row_id: Optional[int] = None
+    amount: Optional[float] = None
+    error: Optional[str] = None
+
+
+class TripBulkOut(BaseModel):
+    created: int
+    duplicates: int = 0
+    failed: int
+    results: List[TripBulkResult]
+
+
+class RerateOut(BaseModel):
+    vendor_id: int
+    year: int
+    month: int
+    rows: int
+    total: float
+
+
+class MonthCloseProgress(BaseModel):
+    tenant_id: int
+    period: str
+    vendors: int
+    closed: int
+    total_amount: float
+    running: bool
+
+
 class InvoiceRowOut(BaseModel):
     id: int
     vendor_id: int
@@ -71,3 +160,8 @@ class InvoiceRowOut(BaseModel):
     note: str
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class TripIngestOut(TripOut):
+    # None while billing is queued.
+    invoice: Optional[InvoiceRowOut] = None
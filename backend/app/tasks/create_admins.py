@@ -0,0 +1,24 @@
+import argparse
+import asyncio
+import json
+
+from .. import crud
+from ..db import AsyncSessionLocal
+
+
+async def main(tenant_name: str, emails: list[str], password: str) -> int:
+    async with AsyncSessionLocal() as session:
+        created = await crud.ensure_default_admins(session, tenant_name=tenant_name, emails=emails, password=password)
+    print(json.dumps({"tenant": tenant_name, "created": created, "existing": len(emails) - len(created)}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Create the default admin accounts (run once per deployment in STARTUP_MODE=production)."
+    )
+    parser.add_argument("--tenant", default="AcmeCorp", help="tenant name, created if missing")
+    parser.add_argument("--email", action="append", dest="emails", help="admin email; repeatable (default: the built-in accounts)")
+    parser.add_argument("--password", default="123")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.tenant, args.emails or list(crud.DEFAULT_ADMIN_EMAILS), args.password)))
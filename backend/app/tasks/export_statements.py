@@ -0,0 +1,38 @@
+import argparse
+import asyncio
+import json
+import time
+
+from .. import export
+from ..config import settings
+
+
+async def main(tenant_id: int, year: int, month: int, out_dir: str, fmt: str, concurrency: int) -> int:
+    started = time.perf_counter()
+    results = await export.export_tenant_month(tenant_id, year, month, out_dir, fmt, concurrency)
+    written = [result for result in results if result["path"]]
+    print(
+        json.dumps(
+            {
+                "files": written,
+                "vendors": len(results),
+                "rows": sum(result["rows"] for result in results),
+                "bytes": sum(result["bytes"] for result in results),
+                "seconds": round(time.perf_counter() - started, 3),
+            },
+            indent=2,
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a tenant's vendor statements as Parquet or Arrow files.")
+    parser.add_argument("--tenant", type=int, required=True)
+    parser.add_argument("--year", type=int, required=True)
+    parser.add_argument("--month", type=int, required=True, choices=range(1, 13), metavar="1-12")
+    parser.add_argument("--format", choices=sorted(export.FORMATS), default="parquet")
+    parser.add_argument("--out", default=settings.export_dir)
+    parser.add_argument("--concurrency", type=int, default=settings.export_concurrency, help="vendors exported at once")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.tenant, args.year, args.month, args.out, args.format, args.concurrency)))
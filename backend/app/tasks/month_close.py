@@ -0,0 +1,42 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from .. import month_close, schema
+
+
+async def main(tenant_id: int, year: int, month: int, recompute: bool, allow_open: bool, concurrency: int | None) -> int:
+    await schema.exit_unless_head()
+    started = time.perf_counter()
+
+    def progress(done: int, total: int) -> None:
+        print(f"{done}/{total} vendors closed ({time.perf_counter() - started:.1f}s)", file=sys.stderr)
+
+    result = await month_close.close_month(
+        tenant_id,
+        year,
+        month,
+        recompute=recompute,
+        allow_open=allow_open,
+        concurrency=concurrency,
+        progress=progress,
+    )
+    result["seconds"] = round(time.perf_counter() - started, 2)
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Close a month: one final invoice per vendor of a tenant.")
+    parser.add_argument("--tenant", type=int, required=True)
+    parser.add_argument("--year", type=int, required=True)
+    parser.add_argument("--month", type=int, required=True, choices=range(1, 13), metavar="1-12")
+    parser.add_argument("--recompute", action="store_true", help="recompute vendors that were already closed")
+    parser.add_argument("--allow-open", action="store_true", help="allow closing a month that has not ended (preview)")
+    parser.add_argument("--concurrency", type=int, default=None, help="chunks processed at once")
+    args = parser.parse_args()
+    raise SystemExit(
+        asyncio.run(main(args.tenant, args.year, args.month, args.recompute, args.allow_open, args.concurrency))
+    )
@@ -0,0 +1,44 @@
+import argparse
+import asyncio
+import json
+from datetime import date, datetime
+
+from .. import partitioning, schema
+from ..config import settings
+from ..db import AsyncSessionLocal, engine
+
+
+def _month(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+async def create(start: date | None, ahead: int) -> int:
+    await schema.exit_unless_head()
+    current = partitioning.month_of(datetime.utcnow())
+    async with engine.begin() as conn:
+        created = await partitioning.ensure_partitions(conn, start or current, partitioning.add_months(current, ahead))
+    print(json.dumps({"created": created}, indent=2))
+    return 0
+
+
+async def archive(before: date, archive_dir: str) -> int:
+    await schema.exit_unless_head()
+    async with AsyncSessionLocal() as session:
+        archived = await partitioning.archive_before(session, before, archive_dir)
+    print(json.dumps({"archived": archived}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain monthly invoice_rows partitions and archives.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create_parser = commands.add_parser("create", help="create partitions up to N months ahead (Postgres only)")
+    create_parser.add_argument("--from", dest="start", type=_month, default=None, help="first month, YYYY-MM (default: current)")
+    create_parser.add_argument("--ahead", type=int, default=settings.partition_months_ahead)
+    archive_parser = commands.add_parser("archive", help="move every month before --before to gzip CSV files")
+    archive_parser.add_argument("--before", type=_month, required=True, help="first month to keep, YYYY-MM")
+    archive_parser.add_argument("--dir", default=settings.archive_dir)
+    args = parser.parse_args()
+    if args.command == "create":
+        raise SystemExit(asyncio.run(create(args.start, args.ahead)))
+    raise SystemExit(asyncio.run(archive(args.before, args.dir)))
@@ -0,0 +1,42 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from .. import auth, provisioning
+from ..config import settings
+from ..db import AsyncSessionLocal
+from ..models import Tenant
+
+
+async def main(tenant_id: int, path: str) -> int:
+    started = time.perf_counter()
+    with open(path, encoding="utf-8-sig", newline="") as handle:
+        rows, results = provisioning.parse_users_csv(handle.read())
+    async with AsyncSessionLocal() as session:
+        if await session.get(Tenant, tenant_id) is None:
+            raise SystemExit(f"Tenant {tenant_id} not found")
+        # The only process hashing, so it may use every core unless BULK_HASH_PROCESSES says otherwise.
+        processes = settings.bulk_hash_processes or os.cpu_count() or 1
+        results.extend(await provisioning.provision_users(session, tenant_id, rows, hash_processes=processes))
+    auth.shutdown_bulk_hash_pool()
+    errors = sorted((result for result in results if result["status"] != "created"), key=lambda result: result["index"])
+    summary = {
+        "tenant_id": tenant_id,
+        "rows": len(results),
+        "created": len(results) - len(errors),
+        "failed": len(errors),
+        "seconds": round(time.perf_counter() - started, 2),
+        "errors": errors,
+    }
+    print(json.dumps(summary, indent=2))
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create a tenant's users from a CSV with email,password[,role] columns.")
+    parser.add_argument("--tenant", type=int, required=True, help="tenant id")
+    parser.add_argument("--csv", required=True, dest="path", help="CSV file with a header line")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.tenant, args.path)))
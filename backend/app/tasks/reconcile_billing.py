@@ -0,0 +1,66 @@
+import argparse
+import asyncio
+import json
+from datetime import datetime
+
+from sqlalchemy import insert, select, update
+
+from .. import billing_worker, partitioning, schema
+from ..db import AsyncSessionLocal
+from ..models import BillingJob, InvoiceRow, Trip
+
+
+async def main(enqueue: bool, tenant_id: int | None) -> int:
+    await schema.exit_unless_head()
+    async with AsyncSessionLocal() as session:
+        stmt = (
+            select(Trip.id, Trip.tenant_id, BillingJob.status)
+            .outerjoin(InvoiceRow, InvoiceRow.trip_id == Trip.id)
+            .outerjoin(BillingJob, BillingJob.trip_id == Trip.id)
+            .where(InvoiceRow.id.is_(None))
+        )
+        if tenant_id is not None:
+            stmt = stmt.where(Trip.tenant_id == tenant_id)
+        live_from = await partitioning.archived_before(session)
+        if live_from is not None:
+            # Invoice rows of archived months are gone; trips dated before them count as billed.
+            stmt = stmt.where(Trip.date >= datetime.combine(live_from, datetime.min.time()))
+        unbilled = (await session.execute(stmt)).all()
+
+        in_queue = [trip_id for trip_id, _, status in unbilled if status in ("pending", "running")]
+        without_job = [(trip_id, tenant) for trip_id, tenant, status in unbilled if status is None]
+        stuck = [trip_id for trip_id, _, status in unbilled if status in ("failed", "done")]
+
+        if enqueue:
+            if without_job:
+                await session.execute(
+                    insert(BillingJob),
+                    [{"trip_id": trip_id, "tenant_id": tenant} for trip_id, tenant in without_job],
+                )
+            if stuck:
+                await session.execute(
+                    update(BillingJob)
+                    .where(BillingJob.trip_id.in_(stuck))
+                    .values(status="pending", attempts=0, last_error=None, completed_at=None)
+                    .execution_options(synchronize_session=False)
+                )
+            await session.commit()
+
+        report = {
+            "unbilled_trips": len(unbilled),
+            "queued": len(in_queue),
+            "missing_job": [trip_id for trip_id, _ in without_job],
+            "failed_or_lost": stuck,
+            "enqueued": len(without_job) + len(stuck) if enqueue else 0,
+            "queue": await billing_worker.queue_stats(session),
+        }
+    print(json.dumps(report, indent=2))
+    return 1 if (without_job or stuck) and not enqueue else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find trips that have no invoice row.")
+    parser.add_argument("--enqueue", action="store_true", help="queue billing jobs for the trips found")
+    parser.add_argument("--tenant", type=int, default=None, help="limit to one tenant")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.enqueue, args.tenant)))
@@ -0,0 +1,28 @@
+import argparse
+import asyncio
+import json
+
+from .. import rollup, schema
+from ..db import AsyncSessionLocal
+
+
+async def main(command: str, tenant_id: int | None) -> int:
+    await schema.exit_unless_head()
+    async with AsyncSessionLocal() as session:
+        if command == "rebuild":
+            await rollup.rebuild(session, tenant_id=tenant_id)
+            await session.commit()
+            print("Rollup rebuilt")
+            return 0
+
+        mismatches = await rollup.check(session, tenant_id=tenant_id)
+        print(json.dumps({"mismatches": len(mismatches), "days": mismatches}, indent=2))
+        return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the invoice_daily_rollups table.")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--tenant", type=int, default=None, help="limit to one tenant")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.command, args.tenant)))
@@ -4,18 +4,30 @@ from datetime import datetime, timedelta
 
 from sqlalchemy import delete
 
+from .. import schema
 from ..auth import get_password_hash
-from ..db import AsyncSessionLocal, Base, engine
-from ..models import InvoiceRow, Tenant, Trip, User, Vendor
+from ..db import AsyncSessionLocal, engine
+from ..models import (
+    BillingJob,
+    InvoiceArchive,
+    InvoiceDailyRollup,
+    InvoiceRow,
+    MonthlyInvoice,
+    Tenant,
+    Trip,
+    User,
+    UserTokenVersion,
+    Vendor,
+)
 
 
 async def seed():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    async with engine.connect() as conn:
+        await schema.upgrade(conn)
 
     async with AsyncSessionLocal() as session:
         # Reset existing data so credentials are deterministic
-        for model in (InvoiceRow, Trip, Vendor, User, Tenant):
+        for model in (BillingJob, MonthlyInvoice, InvoiceArchive, InvoiceDailyRollup, InvoiceRow, Trip, Vendor, UserTokenVersion, User, Tenant):
             await session.execute(delete(model))
         await session.commit()
 
@@ -0,0 +1,54 @@
+"""Production launcher: one uvicorn worker process per core.
+
+Rate-card arithmetic and PBKDF2 hashing are CPU-bound, so one process uses one core.
+Workers share nothing: each has its own engine pool (size ``DB_POOL_SIZE`` and
+``DB_MAX_OVERFLOW`` per worker), hash pool, billing workers and caches, and ``/metrics``
+describes the worker that answered. Each worker warms its rate-card and principal
+caches before ``/ready`` reports ready. In development mode the schema migration and
+default admins run once here, before the workers start.
+"""
+import argparse
+import asyncio
+import os
+
+import uvicorn
+
+from ..config import settings
+
+
+async def bootstrap() -> None:
+    from ..db import engine
+    from ..main import bootstrap_development
+
+    await bootstrap_development()
+    await engine.dispose()
+
+
+def main(workers: int, host: str, port: int) -> int:
+    workers = workers or os.cpu_count() or 1
+    if settings.startup_mode == "development" and workers > 1:
+        # Bootstrap once here instead of racing migrations in every worker.
+        asyncio.run(bootstrap())
+        os.environ["STARTUP_MODE"] = "production"
+    # Each worker is a separate process with its own event loop, pools and caches. On
+    # SIGTERM it stops accepting connections, finishes in-flight requests for up to
+    # GRACEFUL_SHUTDOWN_SECONDS, then runs the shutdown hook, which drains billing workers.
+    uvicorn.run(
+        "app.main:app",
+        host=host,
+        port=port,
+        workers=workers,
+        timeout_graceful_shutdown=settings.graceful_shutdown_seconds,
+        proxy_headers=True,
+        forwarded_allow_ips="*",
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the API with one worker process per core.")
+    parser.add_argument("--workers", type=int, default=settings.web_workers, help="worker processes (default: WEB_WORKERS, 0 = CPU count)")
+    parser.add_argument("--host", default=settings.web_host)
+    parser.add_argument("--port", type=int, default=settings.web_port)
+    args = parser.parse_args()
+    raise SystemExit(main(args.workers, args.host, args.port))
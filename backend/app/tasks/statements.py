@@ -0,0 +1,24 @@
+import argparse
+import asyncio
+import json
+
+from .. import reporting
+
+
+async def compact(every: float | None) -> int:
+    while True:
+        result = await reporting.compact_statements()
+        print(json.dumps(result, indent=2), flush=True)
+        if every is None:
+            await reporting.report_cache.close()
+            return 1 if result["rebuilt"] else 0
+        await asyncio.sleep(every)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the vendor statements cached in Redis.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compact_parser = commands.add_parser("compact", help="verify cached statements against invoice_rows, rebuild mismatches")
+    compact_parser.add_argument("--every", type=float, default=None, help="repeat every N seconds instead of running once")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(compact(args.every)))
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from .config import settings
+from .db import AsyncSessionLocal
+from .models import User, Vendor
+from .principals import Principal, cache_principal
+from .ratecard import compile_rate_card, rate_card_cache
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_caches(rate_cards: int, principals: int) -> dict:
+    """Fill this process's rate card and principal caches with one capped query each.
+
+    Newest vendors and users come first, admins ahead of employees since they poll the
+    dashboard. Anything past the caps is loaded on first use as before.
+    """
+    started = time.perf_counter()
+    warmed = {"rate_cards": 0, "principals": 0}
+    async with AsyncSessionLocal() as db:
+        if rate_cards > 0:
+            vendors = await db.execute(select(Vendor).order_by(Vendor.id.desc()).limit(rate_cards))
+            for vendor in vendors.scalars():
+                rate_card_cache.set(vendor.id, compile_rate_card(vendor))
+                warmed["rate_cards"] += 1
+        if principals > 0:
+            users = await db.execute(
+                select(User.id, User.email, User.tenant_id, User.role, User.is_admin)
+                .order_by(User.is_admin.desc(), User.id.desc())
+                .limit(principals)
+            )
+            for user_id, email, tenant_id, role, is_admin in users:
+                cache_principal(Principal(id=user_id, email=email, tenant_id=tenant_id, role=role, is_admin=bool(is_admin)))
+                warmed["principals"] += 1
+    warmed["seconds"] = round(time.perf_counter() - started, 3)
+    return warmed
+
+
+async def warm_up() -> dict:
+    """Run ``warm_caches`` within ``WARMUP_TIMEOUT_SECONDS``; a failed warmup only costs cold caches."""
+    try:
+        warmed = await asyncio.wait_for(
+            warm_caches(settings.warmup_rate_cards, settings.warmup_principals), settings.warmup_timeout_seconds
+        )
+    except (asyncio.TimeoutError, SQLAlchemyError, OSError) as exc:
+        logger.warning("Cache warmup skipped: %r", exc)
+        return {"rate_cards": 0, "principals": 0, "error": type(exc).__name__}
+    logger.info("Caches warmed: %s", warmed)
+    return warmed
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import os
+import platform
+import subprocess
+import time
+from typing import Dict, Iterable, List
+
+# The suite shares one database; point DATABASE_URL at Postgres to benchmark it there.
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./bench_suite.db")
+
+from sqlalchemy.engine import make_url  # noqa: E402
+
+from app.config import settings  # noqa: E402
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(latencies: List[float], elapsed: float, statuses: Dict[int, int] | None = None) -> dict:
+    """Throughput and latency percentiles (milliseconds) for one scenario."""
+    return {
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 3),
+        "statuses": statuses or {},
+    }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "database": make_url(settings.database_url).get_backend_name(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def chunked(items: Iterable, size: int):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
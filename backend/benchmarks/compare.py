@@ -0,0 +1,46 @@
+"""Compare two ``benchmarks.harness`` result files scenario by scenario::
+
+    python -m benchmarks.compare before.json after.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+
+METRICS = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+    with open(args.before) as handle:
+        before = json.load(handle)
+    with open(args.after) as handle:
+        after = json.load(handle)
+
+    for label, result in (("before", before), ("after", after)):
+        env = result["environment"]
+        print(f"{label}: commit {env['commit']} on {env['database']}, dataset {result['dataset']}")
+    print(f"{'scenario':<16}{'metric':<16}{'before':>12}{'after':>12}{'change':>10}")
+    if "startup" in before and "startup" in after:
+        for metric in ("import_seconds", "ready_seconds"):
+            old, new = before["startup"][metric], after["startup"][metric]
+            print(f"{'startup':<16}{metric:<16}{old:>12}{new:>12}{_change(old, new):>10}")
+    for name, old in before["scenarios"].items():
+        new = after["scenarios"].get(name)
+        if new is None:
+            continue
+        for metric in METRICS:
+            print(f"{name:<16}{metric:<16}{old[metric]:>12}{new[metric]:>12}{_change(old[metric], new[metric]):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Statement export format benchmark.
+
+For one vendor-month of the benchmark database, compares the CSV payload built by
+``reporting`` with the Parquet and Arrow files written by ``app.export``: size on disk,
+time to produce and time to load back into columns::
+
+    cd backend
+    python -m benchmarks.seed --tenants 1 --vendors 1 --trips 200000 --days 30
+    python -m benchmarks.export_formats --vendor 1
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.common import environment
+
+import pyarrow as pa  # noqa: E402
+import pyarrow.csv as pa_csv  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+
+from app import export, reporting  # noqa: E402
+from app.db import AsyncSessionLocal  # noqa: E402
+from app.models import Vendor  # noqa: E402
+
+
+def _timed(function):
+    started = time.perf_counter()
+    value = function()
+    return value, round(time.perf_counter() - started, 4)
+
+
+async def run(vendor_id: int, year: int, month: int) -> dict:
+    async with AsyncSessionLocal() as db:
+        vendor = await db.get(Vendor, vendor_id)
+        started = time.perf_counter()
+        statement = await reporting._query_vendor_statement(db, vendor_id, year, month)
+        csv_build = round(time.perf_counter() - started, 4)
+    payload = statement["csv"].encode()
+    results = {
+        "csv": {
+            "bytes": len(payload),
+            "write_seconds": csv_build,
+            "load_seconds_csv_module": _timed(lambda: list(csv.reader(io.StringIO(statement["csv"]))))[1],
+            "load_seconds_pyarrow": _timed(lambda: pa_csv.read_csv(io.BytesIO(payload)))[1],
+        }
+    }
+    # The same joined columns as the columnar files, as CSV, for a like-for-like size.
+    joined = pa.Table.from_batches([batch async for batch in export.iter_statement_batches(vendor_id, year, month)])
+    joined_csv = io.BytesIO()
+    pa_csv.write_csv(joined, joined_csv)
+    results["csv_joined_columns"] = {"bytes": joined_csv.getbuffer().nbytes}
+    with tempfile.TemporaryDirectory() as out_dir:
+        for fmt in export.FORMATS:
+            started = time.perf_counter()
+            written = await export.export_vendor_month(vendor.tenant_id, vendor_id, year, month, out_dir, fmt)
+            elapsed = round(time.perf_counter() - started, 4)
+            reader = pq.read_table if fmt == "parquet" else (lambda path: pa.ipc.open_file(path).read_all())
+            table, load = _timed(lambda: reader(written["path"]))
+            results[fmt] = {"bytes": written["bytes"], "rows": table.num_rows, "write_seconds": elapsed, "load_seconds": load}
+    return {"environment": environment(), "vendor_id": vendor_id, "year": year, "month": month, "formats": results}
+
+
+def main() -> None:
+    today = datetime.utcnow()
+    parser = argparse.ArgumentParser(description="Compare CSV, Parquet and Arrow statement exports.")
+    parser.add_argument("--vendor", type=int, default=1)
+    parser.add_argument("--year", type=int, default=today.year)
+    parser.add_argument("--month", type=int, default=today.month)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.vendor, args.year, args.month)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""End-to-end benchmark harness.
+
+Drives the ASGI app in-process through an HTTP client against the database filled by
+``benchmarks.seed`` and reports throughput and p50/p95/p99 latency per scenario as
+JSON, tagged with the git commit and database backend::
+
+    cd backend
+    python -m benchmarks.seed --tenants 20 --vendors 10 --trips 200000
+    python -m benchmarks.harness --requests 500 --concurrency 16 --output before.json
+    # ...check out another commit, rerun, then:
+    python -m benchmarks.compare before.json after.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List
+
+from benchmarks.common import environment, summarize
+
+import httpx  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.db import AsyncSessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Tenant, Trip, User, Vendor  # noqa: E402
+from benchmarks.seed import BENCH_PASSWORD  # noqa: E402
+
+SCENARIOS = ("login", "tasks", "create_trip", "monthly_report", "dashboard")
+
+
+async def load_dataset() -> dict:
+    async with AsyncSessionLocal() as db:
+        admins = (
+            await db.execute(
+                select(User.email, User.tenant_id).where(User.is_admin.is_(True)).where(User.email.like("%.bench"))
+            )
+        ).all()
+        vendors: Dict[int, List[int]] = {}
+        for vendor_id, tenant_id in (await db.execute(select(Vendor.id, Vendor.tenant_id))).all():
+            vendors.setdefault(tenant_id, []).append(vendor_id)
+        employees: Dict[int, List[int]] = {}
+        for user_id, tenant_id in (await db.execute(select(User.id, User.tenant_id))).all():
+            employees.setdefault(tenant_id, []).append(user_id)
+        counts = {
+            "tenants": (await db.execute(select(func.count()).select_from(Tenant))).scalar(),
+            "vendors": (await db.execute(select(func.count()).select_from(Vendor))).scalar(),
+            "trips": (await db.execute(select(func.count()).select_from(Trip))).scalar(),
+        }
+    if not admins:
+        raise SystemExit("No benchmark tenants found; run `python -m benchmarks.seed` first.")
+    return {"admins": admins, "vendors": vendors, "employees": employees, "counts": counts}
+
+
+def cold_import_seconds() -> float:
+    """Import time of ``app.main`` in a fresh interpreter, the first part of a worker's cold start."""
+    probe = "import time; started = time.perf_counter(); import app.main; print(time.perf_counter() - started)"
+    output = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+async def run_scenario(
+    request: Callable[[], Awaitable[httpx.Response]], requests: int, concurrency: int
+) -> dict:
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await request()
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, statuses)
+
+
+async def run(scenarios: List[str], requests: int, concurrency: int, page_size: int) -> dict:
+    dataset = await load_dataset()
+    admins = dataset["admins"]
+    vendors = dataset["vendors"]
+    employees = dataset["employees"]
+    now = datetime.utcnow()
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    startup = {"mode": settings.startup_mode, "import_seconds": round(cold_import_seconds(), 3)}
+
+    started = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            startup["startup_seconds"] = round(time.perf_counter() - started, 3)
+            ready = await client.get("/ready")
+            startup["ready_seconds"] = round(time.perf_counter() - started, 3)
+            startup["ready_status"] = ready.status_code
+            tokens = {}
+            for email, tenant_id in admins:
+                response = await client.post("/auth/login", data={"username": email, "password": BENCH_PASSWORD})
+                tokens[tenant_id] = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            def pick():
+                email, tenant_id = random.choice(admins)
+                return email, tenant_id, tokens[tenant_id]
+
+            async def login():
+                email, _, _ = pick()
+                return await client.post("/auth/login", data={"username": email, "password": BENCH_PASSWORD})
+
+            async def tasks():
+                _, _, headers = pick()
+                return await client.get("/tasks", params={"limit": page_size}, headers=headers)
+
+            async def create_trip():
+                _, tenant_id, headers = pick()
+                body = {
+                    "tenant_id": tenant_id,
+                    "vendor_id": random.choice(vendors[tenant_id]),
+                    "employee_id": random.choice(employees[tenant_id]),
+                    "distance_km": round(random.uniform(2, 40), 2),
+                    "duration_minutes": random.randint(10, 120),
+                    "date": now.isoformat(),
+                }
+                return await client.post("/trips", json=body, headers=headers)
+
+            async def monthly_report():
+                _, tenant_id, headers = pick()
+                vendor_id = random.choice(vendors[tenant_id])
+                params = {"year": now.year, "month": now.month}
+                return await client.get(f"/reports/vendor/{vendor_id}/monthly", params=params, headers=headers)
+
+            async def dashboard():
+                _, _, headers = pick()
+                return await client.get("/dashboard/summary", headers=headers)
+
+            handlers = {
+                "login": login,
+                "tasks": tasks,
+                "create_trip": create_trip,
+                "monthly_report": monthly_report,
+                "dashboard": dashboard,
+            }
+            for name in scenarios:
+                results[name] = await run_scenario(handlers[name], requests, concurrency)
+
+    return {
+        "environment": environment(),
+        "dataset": dataset["counts"],
+        "requests": requests,
+        "concurrency": concurrency,
+        "startup": startup,
+        "scenarios": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the end-to-end benchmark scenarios.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--page-size", type=int, default=50, help="limit used by the /tasks scenario")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    result = asyncio.run(run(scenarios, args.requests, args.concurrency, args.page_size))
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Login storm benchmark.
+
+Floods ``/auth/login`` with concurrent requests while probing an unrelated endpoint
+(``/me``) and reports the probe's latency percentiles plus hash pool metrics as JSON.
+Compare ``HASH_POOL_WORKERS=0`` (hash on the event loop) with the default pool::
+
+    cd backend
+    HASH_POOL_WORKERS=0 python -m benchmarks.login_storm
+    python -m benchmarks.login_storm --logins 16 --duration 10
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./bench_login_storm.db")
+
+import httpx  # noqa: E402
+
+from app import auth  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from benchmarks.common import percentile  # noqa: E402
+
+
+async def run(logins: int, duration: float, probe_interval: float) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            credentials = {"username": "admin@acme.com", "password": "123"}
+            token = (await client.post("/auth/login", data=credentials)).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            deadline = time.perf_counter() + duration
+            login_statuses: dict[int, int] = {}
+            probe_latencies: list[float] = []
+
+            async def login_worker() -> None:
+                while time.perf_counter() < deadline:
+                    response = await client.post("/auth/login", data=credentials)
+                    login_statuses[response.status_code] = login_statuses.get(response.status_code, 0) + 1
+
+            async def probe() -> None:
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    await client.get("/me", headers=headers)
+                    probe_latencies.append(time.perf_counter() - started)
+                    await asyncio.sleep(probe_interval)
+
+            await asyncio.gather(probe(), *(login_worker() for _ in range(logins)))
+
+    return {
+        "hash_pool_workers": settings.hash_pool_workers,
+        "hash_queue_limit": settings.hash_queue_limit,
+        "concurrent_logins": logins,
+        "duration_seconds": duration,
+        "login_responses": login_statuses,
+        "probe": {
+            "endpoint": "/me",
+            "requests": len(probe_latencies),
+            "p50_ms": percentile(probe_latencies, 50) * 1000,
+            "p95_ms": percentile(probe_latencies, 95) * 1000,
+            "p99_ms": percentile(probe_latencies, 99) * 1000,
+            "mean_ms": (statistics.fmean(probe_latencies) * 1000) if probe_latencies else 0.0,
+        },
+        "hash_seconds": auth.hash_latency.snapshot(),
+        "hash_wait_seconds": auth.hash_wait.snapshot(),
+        "hash_rejected": auth.hash_rejected.value,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=16, help="concurrent login clients")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds to run the storm")
+    parser.add_argument("--probe-interval", type=float, default=0.01, help="seconds between probe requests")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.logins, args.duration, args.probe_interval)), indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
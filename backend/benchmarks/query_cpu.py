@@ -0,0 +1,146 @@
+"""Per-request CPU time of the hot read endpoints.
+
+Measures process CPU time (``time.process_time``) per request for ``/me``, ``/tasks``
+and ``/dashboard/summary`` driven in-process, with the principal cache and dashboard
+memo disabled so every request runs its query. It also executes each endpoint's query
+directly, once as a ``select()`` built per call (how these queries used to be
+written) and once as the prebuilt statement from ``app/queries.py``::
+
+    cd backend
+    python -m benchmarks.seed --tenants 5 --vendors 10 --trips 50000
+    python -m benchmarks.query_cpu --requests 2000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+
+# Settings are read when benchmarks.common imports them: make every request hit the database.
+os.environ.setdefault("PRINCIPAL_CACHE_SIZE", "0")
+os.environ.setdefault("DASHBOARD_MEMO_SIZE", "0")
+
+from benchmarks.common import environment  # noqa: E402
+
+import httpx  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+from app import queries  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.crud import TRIP_LIST_FIELDS  # noqa: E402
+from app.db import AsyncSessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import InvoiceDailyRollup, Trip, User, Vendor  # noqa: E402
+from benchmarks.seed import BENCH_PASSWORD  # noqa: E402
+
+
+def _adhoc_me(email: str, tenant_id: int, since):
+    return select(User).where(User.email == email), None
+
+
+def _adhoc_tasks(email: str, tenant_id: int, since):
+    stmt = (
+        select(*(getattr(Trip, name) for name in TRIP_LIST_FIELDS))
+        .where(Trip.tenant_id == tenant_id)
+        .order_by(Trip.date.desc(), Trip.id.desc())
+        .limit(settings.trip_page_size)
+    )
+    return stmt, None
+
+
+def _adhoc_dashboard(email: str, tenant_id: int, since):
+    total = (
+        select(func.sum(InvoiceDailyRollup.total_amount))
+        .where(InvoiceDailyRollup.tenant_id == tenant_id)
+        .where(InvoiceDailyRollup.day >= since)
+    )
+    vendors = select(func.count(Vendor.id)).where(Vendor.tenant_id == tenant_id)
+    pending = select(func.count(Trip.id)).where(Trip.tenant_id == tenant_id)
+    return select(total.scalar_subquery(), vendors.scalar_subquery(), pending.scalar_subquery()), None
+
+
+def _prebuilt_me(email: str, tenant_id: int, since):
+    return queries.PRINCIPAL_BY_EMAIL, {"email": email}
+
+
+def _prebuilt_tasks(email: str, tenant_id: int, since):
+    return queries.trip_page(TRIP_LIST_FIELDS, False, False), {"tenant_id": tenant_id, "limit": settings.trip_page_size}
+
+
+def _prebuilt_dashboard(email: str, tenant_id: int, since):
+    return queries.DASHBOARD_SUMMARY, {"tenant_id": tenant_id, "since": since}
+
+
+STATEMENTS = {
+    "me": (_adhoc_me, _prebuilt_me),
+    "tasks": (_adhoc_tasks, _prebuilt_tasks),
+    "dashboard": (_adhoc_dashboard, _prebuilt_dashboard),
+}
+ENDPOINTS = {"me": "/me", "tasks": "/tasks", "dashboard": "/dashboard/summary"}
+
+
+def _per_call(cpu: float, wall: float, count: int) -> dict:
+    return {"cpu_us": round(cpu / count * 1e6, 1), "wall_us": round(wall / count * 1e6, 1)}
+
+
+async def time_statement(build, args, count: int) -> dict:
+    async with AsyncSessionLocal() as db:
+        stmt, params = build(*args)
+        await db.execute(stmt, params)  # warm the compiled cache
+        cpu, wall = time.process_time(), time.perf_counter()
+        for _ in range(count):
+            stmt, params = build(*args)
+            (await db.execute(stmt, params)).all()
+        return _per_call(time.process_time() - cpu, time.perf_counter() - wall, count)
+
+
+async def run(requests: int) -> dict:
+    async with AsyncSessionLocal() as db:
+        admin = (
+            await db.execute(select(User.email, User.tenant_id).where(User.is_admin.is_(True)).where(User.email.like("%.bench")))
+        ).first()
+    if admin is None:
+        raise SystemExit("No benchmark tenants found; run `python -m benchmarks.seed` first.")
+    since = datetime.utcnow().replace(day=1).date()
+    args = (admin.email, admin.tenant_id, since)
+
+    statements = {}
+    for name, (adhoc, prebuilt) in STATEMENTS.items():
+        statements[name] = {
+            "adhoc": await time_statement(adhoc, args, requests),
+            "prebuilt": await time_statement(prebuilt, args, requests),
+        }
+
+    endpoints = {}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            login = await client.post("/auth/login", data={"username": admin.email, "password": BENCH_PASSWORD})
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+            for name, path in ENDPOINTS.items():
+                (await client.get(path, headers=headers)).raise_for_status()
+                cpu, wall = time.process_time(), time.perf_counter()
+                for _ in range(requests):
+                    await client.get(path, headers=headers)
+                endpoints[name] = _per_call(time.process_time() - cpu, time.perf_counter() - wall, requests)
+
+    return {
+        "environment": environment(),
+        "requests": requests,
+        "page_size": settings.trip_page_size,
+        "statements": statements,
+        "endpoints": endpoints,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure CPU time per request for /me, /tasks and the dashboard.")
+    parser.add_argument("--requests", type=int, default=1000, help="requests (and statement executions) per case")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Worker scaling benchmark.
+
+Starts ``app.tasks.serve`` with 1, 2, 4 and 8 worker processes against the database
+filled by ``benchmarks.seed`` and drives ``POST /trips`` and ``/dashboard/summary`` over
+real sockets from several load-generator processes, reporting throughput per worker
+count and the speedup over one worker::
+
+    cd backend
+    python -m benchmarks.seed --tenants 20 --vendors 10 --trips 200000
+    python -m benchmarks.scaling --workers 1,2,4,8 --duration 15
+
+Writes contend on SQLite's single writer lock; run against Postgres
+(``DATABASE_URL=postgresql+asyncpg://...``) to measure ``POST /trips`` scaling.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from benchmarks.common import environment, summarize
+
+import httpx  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from benchmarks.harness import load_dataset  # noqa: E402
+from benchmarks.seed import BENCH_PASSWORD  # noqa: E402
+
+SCENARIOS = ("create_trip", "dashboard")
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_URL=settings.database_url, STARTUP_MODE="production")
+    return subprocess.Popen(
+        [sys.executable, "-m", "app.tasks.serve", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(base_url: str, workers: int, timeout: float = 60.0) -> None:
+    # Connections are spread over workers by the kernel; several consecutive 200s make it
+    # likely that every worker has finished its startup hook and warmup.
+    deadline = time.monotonic() + timeout
+    streak = 0
+    while time.monotonic() < deadline:
+        try:
+            ok = httpx.get(f"{base_url}/ready", timeout=2.0).status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        streak = streak + 1 if ok else 0
+        if streak >= workers * 4:
+            return
+        time.sleep(0.05 if ok else 0.25)
+    raise SystemExit(f"Server on {base_url} did not become ready")
+
+
+def stop_server(process: subprocess.Popen) -> float:
+    started = time.perf_counter()
+    process.send_signal(signal.SIGTERM)
+    process.wait(timeout=settings.graceful_shutdown_seconds + 30)
+    return time.perf_counter() - started
+
+
+def _drive(job: dict) -> dict:
+    return asyncio.run(_drive_async(job))
+
+
+async def _drive_async(job: dict) -> dict:
+    rng = random.Random(job["seed"])
+    now = datetime.utcnow().isoformat()
+    tenants = job["tenants"]
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    limits = httpx.Limits(max_connections=job["concurrency"], max_keepalive_connections=job["concurrency"])
+
+    async with httpx.AsyncClient(base_url=job["base_url"], timeout=30.0, limits=limits) as client:
+
+        def request():
+            tenant = rng.choice(tenants)
+            if job["scenario"] == "dashboard":
+                return client.get("/dashboard/summary", headers=tenant["headers"])
+            body = {
+                "tenant_id": tenant["tenant_id"],
+                "vendor_id": rng.choice(tenant["vendors"]),
+                "employee_id": rng.choice(tenant["employees"]),
+                "distance_km": round(rng.uniform(2, 40), 2),
+                "duration_minutes": rng.randint(10, 120),
+                "date": now,
+            }
+            return client.post("/trips", json=body, headers=tenant["headers"])
+
+        async def worker() -> None:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    status = (await request()).status_code
+                except httpx.HTTPError:
+                    status = 0
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        deadline = started + job["duration"]
+        await asyncio.gather(*(worker() for _ in range(job["concurrency"])))
+    return {"latencies": latencies, "statuses": statuses, "seconds": time.perf_counter() - started}
+
+
+def run_load(pool, base_url: str, scenario: str, tenants: List[dict], clients: int, concurrency: int, duration: float) -> dict:
+    jobs = [
+        {
+            "base_url": base_url,
+            "scenario": scenario,
+            "tenants": tenants,
+            "concurrency": concurrency,
+            "duration": duration,
+            "seed": index,
+        }
+        for index in range(clients)
+    ]
+    # Generators time themselves, so pool dispatch and interpreter start are not counted.
+    parts = pool.map(_drive, jobs)
+    elapsed = max(part["seconds"] for part in parts)
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    for part in parts:
+        latencies.extend(part["latencies"])
+        for status, count in part["statuses"].items():
+            statuses[status] = statuses.get(status, 0) + count
+    return summarize(latencies, elapsed, statuses)
+
+
+def login_tenants(base_url: str, dataset: dict) -> List[dict]:
+    tenants = []
+    with httpx.Client(base_url=base_url, timeout=30.0) as client:
+        for email, tenant_id in dataset["admins"]:
+            response = client.post("/auth/login", data={"username": email, "password": BENCH_PASSWORD})
+            response.raise_for_status()
+            tenants.append(
+                {
+                    "tenant_id": tenant_id,
+                    "headers": {"Authorization": f"Bearer {response.json()['access_token']}"},
+                    "vendors": dataset["vendors"][tenant_id],
+                    "employees": dataset["employees"][tenant_id],
+                }
+            )
+    return tenants
+
+
+def run(worker_counts: List[int], scenarios: List[str], clients: int, concurrency: int, duration: float, port: int) -> dict:
+    dataset = asyncio.run(load_dataset())
+    base_url = f"http://127.0.0.1:{port}"
+    results = {}
+    with multiprocessing.get_context("spawn").Pool(clients) as pool:
+        for workers in worker_counts:
+            process = start_server(workers, port)
+            try:
+                wait_ready(base_url, workers)
+                tenants = login_tenants(base_url, dataset)
+                results[workers] = {
+                    name: run_load(pool, base_url, name, tenants, clients, concurrency, duration) for name in scenarios
+                }
+            finally:
+                results.setdefault(workers, {})["shutdown_seconds"] = round(stop_server(process), 3)
+
+    baseline = results[worker_counts[0]]
+    for workers, scenario_results in results.items():
+        for name in scenarios:
+            base_rps = baseline[name]["throughput_rps"]
+            rps = scenario_results[name]["throughput_rps"]
+            scenario_results[name]["speedup"] = round(rps / base_rps, 2) if base_rps else None
+            scenario_results[name]["efficiency"] = (
+                round(rps / base_rps / (workers / worker_counts[0]), 2) if base_rps else None
+            )
+    return {
+        "environment": dict(environment(), cpus=os.cpu_count()),
+        "dataset": dataset["counts"],
+        "clients": clients,
+        "concurrency_per_client": concurrency,
+        "duration_seconds": duration,
+        "billing_mode": settings.billing_mode,
+        "workers": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure throughput as web worker processes are added.")
+    parser.add_argument("--workers", default="1,2,4,8", help="comma-separated worker counts")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--clients", type=int, default=min(8, os.cpu_count() or 1), help="load-generator processes")
+    parser.add_argument("--concurrency", type=int, default=16, help="in-flight requests per load generator")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario and worker count")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    worker_counts = [int(count) for count in args.workers.split(",")]
+
+    result = run(worker_counts, scenarios, args.clients, args.concurrency, args.duration, args.port)
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Scalable benchmark seeder.
+
+Replaces the benchmark database contents with tenants x vendors x trips, their
+invoice rows and the daily rollup, using multi-row inserts with pre-assigned ids::
+
+    cd backend
+    python -m benchmarks.seed --tenants 100 --vendors 50 --trips 1000000
+
+Every tenant gets ``admin@tenant{N}.bench`` plus ``--employees`` employees, all with
+password ``bench``. The password is hashed once and the hash reused.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import chunked
+
+import numpy as np  # noqa: E402
+from sqlalchemy import delete, insert, text  # noqa: E402
+
+from app import partitioning, rollup  # noqa: E402
+from app.auth import get_password_hash  # noqa: E402
+from app.db import AsyncSessionLocal, Base, engine  # noqa: E402
+from app.models import (  # noqa: E402
+    BillingJob,
+    InvoiceArchive,
+    InvoiceDailyRollup,
+    InvoiceRow,
+    MonthlyInvoice,
+    Tenant,
+    Trip,
+    User,
+    UserTokenVersion,
+    Vendor,
+)
+from app.ratecard import RateCard  # noqa: E402
+
+BENCH_PASSWORD = "bench"
+BILLING_MODELS = (
+    ("trip", {"per_km": 2.0, "per_hour": 10.0, "extra_km_rate": 3.0}),
+    ("package", {"monthly_cost": 1500.0, "extra_km_rate": 2.5}),
+    ("hybrid", {"monthly_cost": 400.0, "per_km": 1.5}),
+)
+
+
+def admin_email(tenant_index: int) -> str:
+    return f"admin@tenant{tenant_index}.bench"
+
+
+async def seed(
+    tenants: int,
+    vendors_per_tenant: int,
+    trips: int,
+    employees_per_tenant: int,
+    days: int,
+    batch_size: int,
+    rng_seed: int,
+) -> dict:
+    started = time.perf_counter()
+    rng = np.random.default_rng(rng_seed)
+    now = datetime.utcnow().replace(microsecond=0)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await partitioning.ensure_partitions(
+            conn,
+            partitioning.month_of(now - timedelta(days=days)),
+            partitioning.add_months(partitioning.month_of(now), 1),
+        )
+        for model in (BillingJob, MonthlyInvoice, InvoiceArchive, InvoiceDailyRollup, InvoiceRow, Trip, Vendor, UserTokenVersion, User, Tenant):
+            await conn.execute(delete(model))
+
+    password_hash = get_password_hash(BENCH_PASSWORD)
+    tenant_rows, user_rows, vendor_rows = [], [], []
+    employees = []
+    cards = []
+    for index in range(tenants):
+        tenant_id = index + 1
+        tenant_rows.append({"id": tenant_id, "name": f"BenchTenant{index}"})
+        tenant_users = []
+        for position in range(employees_per_tenant + 1):
+            is_admin = position == 0
+            tenant_users.append(len(user_rows) + 1)
+            user_rows.append(
+                {
+                    "id": len(user_rows) + 1,
+                    "tenant_id": tenant_id,
+                    "email": admin_email(index) if is_admin else f"employee{position}@tenant{index}.bench",
+                    "hashed_password": password_hash,
+                    "is_admin": is_admin,
+                    "role": "admin" if is_admin else "employee",
+                }
+            )
+        employees.append(np.array(tenant_users))
+        for vendor_index in range(vendors_per_tenant):
+            model, config = BILLING_MODELS[vendor_index % len(BILLING_MODELS)]
+            vendor_id = len(vendor_rows) + 1
+            vendor_rows.append(
+                {
+                    "id": vendor_id,
+                    "tenant_id": tenant_id,
+                    "name": f"Vendor {vendor_index}",
+                    "billing_model": model,
+                    "billing_config": config,
+                }
+            )
+            cards.append(RateCard(vendor_id, tenant_id, model, config))
+
+    async with engine.begin() as conn:
+        for model, rows in ((Tenant, tenant_rows), (User, user_rows), (Vendor, vendor_rows)):
+            for batch in chunked(rows, batch_size):
+                await conn.execute(insert(model), batch)
+
+    written = 0
+    while written < trips:
+        size = min(batch_size, trips - written)
+        card_index = rng.integers(0, len(cards), size)
+        distance = np.round(rng.uniform(2.0, 40.0, size), 2)
+        duration = rng.integers(10, 120, size)
+        extra_km = rng.choice([0.0, 0.0, 1.0, 2.5], size)
+        extra_hours = rng.choice([0.0, 0.0, 0.5, 1.0], size)
+        age_seconds = rng.integers(0, days * 86400, size)
+
+        amounts = np.empty(size)
+        for index in np.unique(card_index):
+            mask = card_index == index
+            amounts[mask] = cards[index].rate_arrays(distance[mask], duration[mask], extra_km[mask], extra_hours[mask])
+
+        trip_rows, invoice_rows = [], []
+        for offset in range(size):
+            card = cards[card_index[offset]]
+            trip_id = written + offset + 1
+            when = now - timedelta(seconds=int(age_seconds[offset]))
+            staff = employees[card.tenant_id - 1]
+            trip_rows.append(
+                {
+                    "id": trip_id,
+                    "tenant_id": card.tenant_id,
+                    "vendor_id": card.vendor_id,
+                    "employee_id": int(staff[trip_id % len(staff)]),
+                    "distance_km": float(distance[offset]),
+                    "duration_minutes": int(duration[offset]),
+                    "date": when,
+                    "extra_km": float(extra_km[offset]),
+                    "extra_hours": float(extra_hours[offset]),
+                    "payload": {},
+                }
+            )
+            invoice_rows.append(
+                {
+                    "id": trip_id,
+                    "tenant_id": card.tenant_id,
+                    "vendor_id": card.vendor_id,
+                    "trip_id": trip_id,
+                    "amount": float(amounts[offset]),
+                    "note": "auto",
+                    "created_at": when,
+                }
+            )
+
+        async with engine.begin() as conn:
+            await conn.execute(insert(Trip), trip_rows)
+            await conn.execute(insert(InvoiceRow), invoice_rows)
+        written += size
+
+    async with AsyncSessionLocal() as session:
+        await rollup.rebuild(session)
+        await session.commit()
+
+    if engine.dialect.name == "postgresql":
+        # Explicit ids do not advance the serial sequences; later API inserts would collide.
+        async with engine.begin() as conn:
+            for table in ("tenants", "users", "vendors", "trips", "invoice_rows"):
+                await conn.execute(
+                    text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1)) FROM {table}")
+                )
+
+    return {
+        "tenants": tenants,
+        "vendors": len(vendor_rows),
+        "users": len(user_rows),
+        "trips": trips,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Seed the benchmark database.")
+    parser.add_argument("--tenants", type=int, default=5)
+    parser.add_argument("--vendors", type=int, default=10, help="vendors per tenant")
+    parser.add_argument("--trips", type=int, default=50_000, help="total trips across all tenants")
+    parser.add_argument("--employees", type=int, default=20, help="employees per tenant")
+    parser.add_argument("--days", type=int, default=90, help="spread trips over this many past days")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    args = parser.parse_args()
+    result = asyncio.run(
+        seed(args.tenants, args.vendors, args.trips, args.employees, args.days, args.batch_size, args.seed)
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
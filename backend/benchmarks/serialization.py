@@ -0,0 +1,107 @@
+"""Response serialization micro-benchmark.
+
+Loads one ``/tasks`` page of ``--trips`` rows from the benchmark database and times
+the ways of turning it into a response body: validating every row through
+``TripOut`` (the ``response_model`` path), stdlib ``JSONResponse`` over dicts, and
+``ORJSONResponse`` over the row tuples. It also times the full ``GET /tasks`` request
+for the same page::
+
+    cd backend
+    python -m benchmarks.seed --tenants 1 --vendors 10 --trips 20000
+    python -m benchmarks.serialization --trips 10000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+# Settings are read when benchmarks.common imports them, so the cap has to be lifted first.
+os.environ.setdefault("TRIP_PAGE_SIZE_MAX", "100000")
+
+from benchmarks.common import environment, percentile  # noqa: E402
+
+import httpx  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app import crud, schemas  # noqa: E402
+from app.db import AsyncSessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import User  # noqa: E402
+from app.responses import ORJSONResponse  # noqa: E402
+from benchmarks.seed import BENCH_PASSWORD  # noqa: E402
+
+
+def _response_model(rows):
+    items = [schemas.TripOut.model_validate(dict(row._mapping)) for row in rows]
+    return JSONResponse(jsonable_encoder(items)).body
+
+
+def _stdlib_dicts(rows):
+    return JSONResponse(
+        [{name: value.isoformat() if name == "date" else value for name, value in row._mapping.items()} for row in rows]
+    ).body
+
+
+def _orjson_tuples(rows):
+    fields = rows[0]._fields
+    return ORJSONResponse([dict(zip(fields, row)) for row in rows]).body
+
+
+PATHS = {"response_model": _response_model, "stdlib_json": _stdlib_dicts, "orjson_tuples": _orjson_tuples}
+
+
+def _time(function, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = function()
+        samples.append(time.perf_counter() - started)
+    return {"bytes": len(body), "p50_ms": round(percentile(samples, 50) * 1000, 2), "min_ms": round(min(samples) * 1000, 2)}
+
+
+async def run(trips: int, repeat: int) -> dict:
+    async with AsyncSessionLocal() as db:
+        admin = (
+            await db.execute(select(User.email, User.tenant_id).where(User.is_admin.is_(True)).where(User.email.like("%.bench")))
+        ).first()
+        if admin is None:
+            raise SystemExit("No benchmark tenants found; run `python -m benchmarks.seed` first.")
+        rows = await crud.list_trips_for_tenant(db, tenant_id=admin.tenant_id, limit=trips)
+    if len(rows) < trips:
+        raise SystemExit(f"Tenant {admin.tenant_id} has only {len(rows)} trips; seed more with --trips.")
+
+    results = {name: _time(lambda: path(rows), repeat) for name, path in PATHS.items()}
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            login = await client.post("/auth/login", data={"username": admin.email, "password": BENCH_PASSWORD})
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = await client.get("/tasks", params={"limit": trips}, headers=headers)
+                samples.append(time.perf_counter() - started)
+                response.raise_for_status()
+    results["http_get_tasks"] = {
+        "bytes": len(response.content),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "min_ms": round(min(samples) * 1000, 2),
+    }
+    return {"environment": environment(), "trips": trips, "repeat": repeat, "paths": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time /tasks response serialization.")
+    parser.add_argument("--trips", type=int, default=10_000, help="rows in the page")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.trips, args.repeat)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
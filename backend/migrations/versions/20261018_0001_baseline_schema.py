@@ -0,0 +1,121 @@
+"""baseline schema
+
+The original schema (tenants, users, vendors, trips, invoice_rows), as
+created by ``Base.metadata.create_all`` before any of the later revisions. Databases
+created that way are marked with ``alembic stamp 0001`` and then upgraded.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('tenants',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_tenants_id'), 'tenants', ['id'], unique=False)
+
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tenant_id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('hashed_password', sa.String(), nullable=False),
+    sa.Column('is_admin', sa.Boolean(), nullable=True),
+    sa.Column('role', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_users_tenant_id'), 'users', ['tenant_id'], unique=False)
+
+    op.create_table('vendors',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tenant_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('billing_model', sa.String(), nullable=False),
+    sa.Column('billing_config', sa.JSON(), nullable=True),
+    sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_vendors_id'), 'vendors', ['id'], unique=False)
+    op.create_index(op.f('ix_vendors_tenant_id'), 'vendors', ['tenant_id'], unique=False)
+
+    op.create_table('trips',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tenant_id', sa.Integer(), nullable=False),
+    sa.Column('vendor_id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('distance_km', sa.Float(), nullable=False),
+    sa.Column('duration_minutes', sa.Integer(), nullable=False),
+    sa.Column('date', sa.DateTime(), nullable=False),
+    sa.Column('extra_km', sa.Float(), nullable=True),
+    sa.Column('extra_hours', sa.Float(), nullable=True),
+    sa.Column('payload', sa.JSON(), nullable=True),
+    sa.ForeignKeyConstraint(['employee_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ),
+    sa.ForeignKeyConstraint(['vendor_id'], ['vendors.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_trips_employee_id'), 'trips', ['employee_id'], unique=False)
+    op.create_index(op.f('ix_trips_id'), 'trips', ['id'], unique=False)
+    op.create_index(op.f('ix_trips_tenant_id'), 'trips', ['tenant_id'], unique=False)
+    op.create_index(op.f('ix_trips_vendor_id'), 'trips', ['vendor_id'], unique=False)
+
+    op.create_table('invoice_rows',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tenant_id', sa.Integer(), nullable=False),
+    sa.Column('vendor_id', sa.Integer(), nullable=False),
+    sa.Column('trip_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('note', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ),
+    sa.ForeignKeyConstraint(['trip_id'], ['trips.id'], ),
+    sa.ForeignKeyConstraint(['vendor_id'], ['vendors.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_invoice_rows_id'), 'invoice_rows', ['id'], unique=False)
+    op.create_index(op.f('ix_invoice_rows_tenant_id'), 'invoice_rows', ['tenant_id'], unique=False)
+    op.create_index(op.f('ix_invoice_rows_trip_id'), 'invoice_rows', ['trip_id'], unique=False)
+    op.create_index(op.f('ix_invoice_rows_vendor_id'), 'invoice_rows', ['vendor_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_invoice_rows_vendor_id'), table_name='invoice_rows')
+    op.drop_index(op.f('ix_invoice_rows_trip_id'), table_name='invoice_rows')
+    op.drop_index(op.f('ix_invoice_rows_tenant_id'), table_name='invoice_rows')
+    op.drop_index(op.f('ix_invoice_rows_id'), table_name='invoice_rows')
+
+    op.drop_table('invoice_rows')
+    op.drop_index(op.f('ix_trips_vendor_id'), table_name='trips')
+    op.drop_index(op.f('ix_trips_tenant_id'), table_name='trips')
+    op.drop_index(op.f('ix_trips_id'), table_name='trips')
+    op.drop_index(op.f('ix_trips_employee_id'), table_name='trips')
+
+    op.drop_table('trips')
+    op.drop_index(op.f('ix_vendors_tenant_id'), table_name='vendors')
+    op.drop_index(op.f('ix_vendors_id'), table_name='vendors')
+
+    op.drop_table('vendors')
+    op.drop_index(op.f('ix_users_tenant_id'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+
+    op.drop_table('users')
+    op.drop_index(op.f('ix_tenants_id'), table_name='tenants')
+
+    op.drop_table('tenants')
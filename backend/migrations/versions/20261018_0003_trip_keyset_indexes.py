@@ -0,0 +1,34 @@
+"""trip keyset indexes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+TRIP_INDEXES = [
+    ('ix_trips_tenant_employee_date_id', ['tenant_id', 'employee_id', 'date', 'id']),
+    ('ix_trips_tenant_date_id', ['tenant_id', 'date', 'id']),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        # Built without blocking trip inserts on a large table.
+        with op.get_context().autocommit_block():
+            for name, columns in TRIP_INDEXES:
+                op.create_index(name, 'trips', columns, unique=False, postgresql_concurrently=True)
+    else:
+        for name, columns in TRIP_INDEXES:
+            op.create_index(name, 'trips', columns, unique=False)
+
+
+def downgrade() -> None:
+    for name, _ in TRIP_INDEXES:
+        op.drop_index(name, table_name='trips')
@@ -0,0 +1,44 @@
+"""billing jobs
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Trips that were never billed get a job from `python -m app.tasks.reconcile_billing --enqueue`.
+    op.create_table('billing_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('trip_id', sa.Integer(), nullable=False),
+    sa.Column('tenant_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('available_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ),
+    sa.ForeignKeyConstraint(['trip_id'], ['trips.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('trip_id')
+    )
+    op.create_index(op.f('ix_billing_jobs_id'), 'billing_jobs', ['id'], unique=False)
+    op.create_index('ix_billing_jobs_status_available_at', 'billing_jobs', ['status', 'available_at'], unique=False)
+    op.create_index(op.f('ix_billing_jobs_tenant_id'), 'billing_jobs', ['tenant_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_billing_jobs_tenant_id'), table_name='billing_jobs')
+    op.drop_index('ix_billing_jobs_status_available_at', table_name='billing_jobs')
+    op.drop_index(op.f('ix_billing_jobs_id'), table_name='billing_jobs')
+    op.drop_table('billing_jobs')
@@ -0,0 +1,86 @@
+"""invoice rows partitioning
+
+``invoice_rows.created_at`` becomes NOT NULL, rows without one taking their trip's
+date. On Postgres the table is rebuilt range-partitioned by month on ``created_at``,
+with primary key ``(id, created_at)`` and a default partition that receives the
+existing rows. The rebuild copies the table under an exclusive lock, so run it in a
+maintenance window; ``python -m app.tasks.partitions create --from YYYY-MM`` then
+moves the rows into monthly partitions.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+COLUMNS = "id, tenant_id, vendor_id, trip_id, amount, note, created_at"
+
+
+def upgrade() -> None:
+    op.execute(
+        "UPDATE invoice_rows SET created_at = COALESCE("
+        "(SELECT trips.date FROM trips WHERE trips.id = invoice_rows.trip_id), CURRENT_TIMESTAMP) "
+        "WHERE created_at IS NULL"
+    )
+    if op.get_bind().dialect.name == "postgresql":
+        _partition_invoice_rows()
+    else:
+        with op.batch_alter_table('invoice_rows') as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+
+    op.create_table('invoice_archives',
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Float(), nullable=False),
+    sa.Column('path', sa.String(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('month')
+    )
+
+
+def _partition_invoice_rows() -> None:
+    # A table cannot be partitioned in place: the rows move into a new parent, which
+    # keeps the old id sequence.
+    op.rename_table('invoice_rows', 'invoice_rows_unpartitioned')
+    op.execute("ALTER TABLE invoice_rows_unpartitioned RENAME CONSTRAINT invoice_rows_pkey TO invoice_rows_unpartitioned_pkey")
+    op.execute("ALTER SEQUENCE invoice_rows_id_seq OWNED BY NONE")
+    op.create_table('invoice_rows',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('invoice_rows_id_seq')"), nullable=False),
+    sa.Column('tenant_id', sa.Integer(), nullable=False),
+    sa.Column('vendor_id', sa.Integer(), nullable=False),
+    sa.Column('trip_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('note', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ),
+    sa.ForeignKeyConstraint(['trip_id'], ['trips.id'], ),
+    sa.ForeignKeyConstraint(['vendor_id'], ['vendors.id'], ),
+    # Postgres requires the partition key in the primary key of a partitioned table.
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+    op.execute("CREATE TABLE invoice_rows_default PARTITION OF invoice_rows DEFAULT")
+    op.execute(f"INSERT INTO invoice_rows ({COLUMNS}) SELECT {COLUMNS} FROM invoice_rows_unpartitioned")
+    op.drop_table('invoice_rows_unpartitioned')
+    op.execute("ALTER SEQUENCE invoice_rows_id_seq OWNED BY invoice_rows.id")
+    op.create_index(op.f('ix_invoice_rows_id'), 'invoice_rows', ['id'], unique=False)
+    op.create_index('ix_invoice_rows_tenant_created_at', 'invoice_rows', ['tenant_id', 'created_at'], unique=False)
+    op.create_index(op.f('ix_invoice_rows_tenant_id'), 'invoice_rows', ['tenant_id'], unique=False)
+    op.create_index(op.f('ix_invoice_rows_trip_id'), 'invoice_rows', ['trip_id'], unique=False)
+    op.create_index('ix_invoice_rows_vendor_created_at', 'invoice_rows', ['vendor_id', 'created_at'], unique=False)
+    op.create_index(op.f('ix_invoice_rows_vendor_id'), 'invoice_rows', ['vendor_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_table('invoice_archives')
+    # On Postgres invoice_rows stays partitioned: created_at is part of its primary key.
+    if op.get_bind().dialect.name != "postgresql":
+        with op.batch_alter_table('invoice_rows') as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
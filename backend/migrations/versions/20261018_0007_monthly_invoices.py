@@ -0,0 +1,52 @@
+"""monthly invoices
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('monthly_invoices',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tenant_id', sa.Integer(), nullable=False),
+    sa.Column('vendor_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.Date(), nullable=False),
+    sa.Column('billing_model', sa.String(), nullable=False),
+    sa.Column('trip_count', sa.Integer(), nullable=False),
+    sa.Column('distance_km', sa.Float(), nullable=False),
+    sa.Column('duration_minutes', sa.Integer(), nullable=False),
+    sa.Column('extra_km', sa.Float(), nullable=False),
+    sa.Column('extra_hours', sa.Float(), nullable=False),
+    sa.Column('base_fee', sa.Float(), nullable=False),
+    sa.Column('usage_amount', sa.Float(), nullable=False),
+    sa.Column('total_amount', sa.Float(), nullable=False),
+    sa.Column('closed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ),
+    sa.ForeignKeyConstraint(['vendor_id'], ['vendors.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('vendor_id', 'period', name='uq_monthly_invoices_vendor_period')
+    )
+    op.create_index(op.f('ix_monthly_invoices_id'), 'monthly_invoices', ['id'], unique=False)
+    op.create_index('ix_monthly_invoices_tenant_period', 'monthly_invoices', ['tenant_id', 'period'], unique=False)
+    if op.get_bind().dialect.name == "postgresql":
+        # Built without blocking trip inserts on a large table.
+        with op.get_context().autocommit_block():
+            op.create_index('ix_trips_vendor_date', 'trips', ['vendor_id', 'date'], unique=False, postgresql_concurrently=True)
+    else:
+        op.create_index('ix_trips_vendor_date', 'trips', ['vendor_id', 'date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_trips_vendor_date', table_name='trips')
+    op.drop_index('ix_monthly_invoices_tenant_period', table_name='monthly_invoices')
+    op.drop_index(op.f('ix_monthly_invoices_id'), table_name='monthly_invoices')
+    op.drop_table('monthly_invoices')
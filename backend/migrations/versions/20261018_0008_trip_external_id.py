@@ -0,0 +1,32 @@
+"""trip external id
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing trips keep a NULL external_id; NULLs never collide in the unique index.
+    op.add_column('trips', sa.Column('external_id', sa.String(), nullable=True))
+    columns = ['tenant_id', 'vendor_id', 'external_id']
+    if op.get_bind().dialect.name == "postgresql":
+        # Built without blocking trip inserts on a large table.
+        with op.get_context().autocommit_block():
+            op.create_index('uq_trips_tenant_vendor_external_id', 'trips', columns, unique=True, postgresql_concurrently=True)
+    else:
+        op.create_index('uq_trips_tenant_vendor_external_id', 'trips', columns, unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_trips_tenant_vendor_external_id', table_name='trips')
+    with op.batch_alter_table('trips') as batch_op:
+        batch_op.drop_column('external_id')
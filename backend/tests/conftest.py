@@ -0,0 +1,109 @@
+import os
+import tempfile
+from datetime import datetime
+from types import SimpleNamespace
+
+# Settings are read on import: point the app at a throwaway SQLite file and an address
+# where no Redis listens, so tests never touch a developer's database or cache.
+_DB_DIR = tempfile.mkdtemp(prefix="moviesync-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_DB_DIR}/test.db"
+os.environ["REDIS_URL"] = "redis://127.0.0.1:1/0"
+
+import fakeredis  # noqa: E402
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from redis.exceptions import RedisError  # noqa: E402
+
+from app import auth, idempotency, reporting  # noqa: E402
+from app.db import AsyncSessionLocal, Base, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Tenant, Trip, User, Vendor  # noqa: E402
+from app.principals import principal_cache  # noqa: E402
+from app.ratecard import rate_card_cache  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+async def schema(anyio_backend):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    for cache in (idempotency.recent_trips, rate_card_cache, principal_cache, reporting.report_cache.l1, reporting.dashboard_memo):
+        cache.clear()
+    reporting.report_cache._redis_down_until = 0.0
+    yield
+    await engine.dispose()
+
+
+@pytest.fixture
+async def redis(monkeypatch):
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(reporting.report_cache, "_redis", client)
+    monkeypatch.setattr(reporting.report_cache, "_redis_exceptions", (RedisError, OSError))
+    yield client
+    await client.aclose()
+
+
+@pytest.fixture
+async def client():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        yield http
+
+
+async def create_tenant(name: str = "acme") -> SimpleNamespace:
+    # A tenant with an admin, an employee and one per-trip vendor; passwords are never checked.
+    async with AsyncSessionLocal() as db:
+        tenant = Tenant(name=name)
+        db.add(tenant)
+        await db.flush()
+        admin = User(tenant_id=tenant.id, email=f"admin@{name}.com", hashed_password="!", role="admin", is_admin=True)
+        employee = User(tenant_id=tenant.id, email=f"rider@{name}.com", hashed_password="!", role="employee")
+        vendor = Vendor(tenant_id=tenant.id, name=f"{name} cabs", billing_model="trip", billing_config={"per_km": 2.0})
+        db.add_all([admin, employee, vendor])
+        await db.commit()
+        return SimpleNamespace(
+            id=tenant.id,
+            admin=admin,
+            employee=employee,
+            vendor_id=vendor.id,
+            headers=auth_headers(admin),
+        )
+
+
+def auth_headers(user: User) -> dict:
+    claims = {
+        "sub": user.email,
+        "tenant_id": user.tenant_id,
+        "role": user.role,
+        "user_id": user.id,
+        "is_admin": bool(user.is_admin),
+        "ver": 0,
+    }
+    return {"Authorization": f"Bearer {auth.create_access_token(claims)}"}
+
+
+def trip_payload(tenant: SimpleNamespace, **overrides) -> dict:
+    payload = {
+        "tenant_id": tenant.id,
+        "vendor_id": tenant.vendor_id,
+        "employee_id": tenant.employee.id,
+        "distance_km": 10.0,
+        "duration_minutes": 30,
+        "date": datetime.utcnow().isoformat(),
+    }
+    payload.update(overrides)
+    return payload
+
+
+async def create_trip(tenant: SimpleNamespace, **overrides) -> Trip:
+    values = trip_payload(tenant, **overrides)
+    values["date"] = datetime.fromisoformat(values["date"])
+    async with AsyncSessionLocal() as db:
+        trip = Trip(**values)
+        db.add(trip)
+        await db.commit()
+        return trip
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app import billing_worker, crud
+from app.config import settings
+from app.db import AsyncSessionLocal
+from app.models import BillingJob, InvoiceRow
+from tests.conftest import create_tenant, trip_payload
+
+pytestmark = pytest.mark.anyio
+
+
+async def _enqueue(tenant, count: int) -> None:
+    async with AsyncSessionLocal() as db:
+        for _ in range(count):
+            payload = trip_payload(tenant)
+            payload["date"] = datetime.fromisoformat(payload["date"])
+            await crud.create_trip(db, payload, enqueue_billing=True)
+
+
+async def _jobs() -> list:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(BillingJob.status, BillingJob.attempts).order_by(BillingJob.id))).all()
+
+
+async def _invoice_rows() -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(InvoiceRow))
+
+
+async def test_batch_claims_and_completes_jobs():
+    tenant = await create_tenant()
+    await _enqueue(tenant, 3)
+
+    assert await billing_worker.run_batch(2) == 2
+    assert [status for status, _ in await _jobs()] == ["done", "done", "pending"]
+    assert await billing_worker.run_batch(10) == 1
+    assert await billing_worker.run_batch(10) == 0
+    assert await _jobs() == [("done", 1)] * 3
+    assert await _invoice_rows() == 3
+
+
+async def test_claimed_jobs_are_not_claimed_again_within_the_lease():
+    tenant = await create_tenant()
+    await _enqueue(tenant, 2)
+    async with AsyncSessionLocal() as first, AsyncSessionLocal() as second:
+        assert len(await billing_worker.claim_jobs(first, 10)) == 2
+        assert await billing_worker.claim_jobs(second, 10) == []
+
+
+async def test_worker_that_lost_its_lease_does_not_bill_again():
+    tenant = await create_tenant()
+    await _enqueue(tenant, 2)
+    async with AsyncSessionLocal() as slow, AsyncSessionLocal() as other:
+        stale = await billing_worker.claim_jobs(slow, 10)
+        # The slow worker's lease lapses and another worker takes the jobs over.
+        lapsed = datetime.utcnow() - timedelta(seconds=settings.billing_job_lease_seconds + 1)
+        await other.execute(update(BillingJob).values(locked_at=lapsed))
+        await other.commit()
+        fresh = await billing_worker.claim_jobs(other, 10)
+        assert [job[0] for job in fresh] == [job[0] for job in stale]
+
+        await billing_worker._bill_jobs(other, fresh)
+        with pytest.raises(billing_worker.LeaseLost):
+            await billing_worker._bill_jobs(slow, stale)
+
+    assert await _invoice_rows() == 2
+    assert await _jobs() == [("done", 2)] * 2
+
+
+async def test_failed_job_is_rescheduled_with_backoff(monkeypatch):
+    tenant = await create_tenant()
+    await _enqueue(tenant, 1)
+
+    async def no_cards(db, vendor_ids):
+        return {}
+
+    monkeypatch.setattr(billing_worker, "get_rate_cards", no_cards)
+    assert await billing_worker.run_batch(10) == 1
+    async with AsyncSessionLocal() as db:
+        job = (await db.execute(select(BillingJob))).scalar_one()
+    assert (job.status, job.attempts) == ("pending", 1)
+    assert "Vendor" in job.last_error
+    assert job.available_at > datetime.utcnow()
+    assert await _invoice_rows() == 0
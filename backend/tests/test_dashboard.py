@@ -0,0 +1,26 @@
+import pytest
+
+from app import auth, reporting
+from app.db import engine
+from tests.conftest import auth_headers, create_tenant
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("claims", ["full", "legacy"])
+async def test_dashboard_stream_holds_no_connection(client, monkeypatch, claims):
+    tenant = await create_tenant()
+    if claims == "full":
+        headers = auth_headers(tenant.admin)
+    else:
+        # Issued before the role claims existed; the principal is loaded from the database.
+        token = auth.create_access_token({"sub": tenant.admin.email, "tenant_id": tenant.id})
+        headers = {"Authorization": f"Bearer {token}"}
+
+    async def stream(tenant_id, is_disconnected):
+        yield f"data: {engine.pool.checkedout()}\n\n"
+
+    monkeypatch.setattr(reporting, "stream_dashboard_summary", stream)
+    response = await client.get("/dashboard/stream", headers=headers)
+    assert response.status_code == 200
+    assert response.text == "data: 0\n\n"
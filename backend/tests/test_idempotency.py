@@ -0,0 +1,106 @@
+import pytest
+from sqlalchemy import func, select
+
+from app import billing, idempotency
+from app.config import settings
+from app.db import AsyncSessionLocal
+from app.models import BillingJob, InvoiceRow, Trip
+from tests.conftest import create_tenant, trip_payload
+
+pytestmark = pytest.mark.anyio
+
+
+async def _count(model) -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(model))
+
+
+@pytest.fixture
+def inline_billing(monkeypatch):
+    monkeypatch.setattr(settings, "billing_mode", "inline")
+
+
+async def test_replay_from_recent_keys(client, inline_billing):
+    tenant = await create_tenant()
+    headers = {**tenant.headers, "Idempotency-Key": "ride-1"}
+    first = await client.post("/trips", json=trip_payload(tenant), headers=headers)
+    replay = await client.post("/trips", json=trip_payload(tenant), headers=headers)
+
+    assert first.status_code == replay.status_code == 200
+    assert "Idempotent-Replayed" not in first.headers
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json()["id"] == first.json()["id"]
+    assert replay.json()["invoice"]["id"] == first.json()["invoice"]["id"]
+    assert (await _count(Trip), await _count(InvoiceRow)) == (1, 1)
+
+
+async def test_replay_through_the_unique_index(client, inline_billing):
+    tenant = await create_tenant()
+    first = await client.post("/trips", json=trip_payload(tenant, external_id="ride-1"), headers=tenant.headers)
+    # As in another process, or after the recent key expired.
+    idempotency.recent_trips.clear()
+    replay = await client.post("/trips", json=trip_payload(tenant, external_id="ride-1"), headers=tenant.headers)
+
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json()["id"] == first.json()["id"]
+    assert replay.json()["invoice"]["id"] == first.json()["invoice"]["id"]
+    assert (await _count(Trip), await _count(InvoiceRow)) == (1, 1)
+
+
+@pytest.mark.parametrize("forget_key", [False, True])
+async def test_replay_bills_a_trip_whose_inline_billing_failed(client, inline_billing, monkeypatch, forget_key):
+    tenant = await create_tenant()
+    bill = billing.bill_trip_and_store
+
+    async def fail_once(db, trip):
+        monkeypatch.setattr(billing, "bill_trip_and_store", bill)
+        raise RuntimeError("billing failed")
+
+    monkeypatch.setattr(billing, "bill_trip_and_store", fail_once)
+    with pytest.raises(RuntimeError):
+        await client.post("/trips", json=trip_payload(tenant, external_id="ride-1"), headers=tenant.headers)
+    assert (await _count(Trip), await _count(InvoiceRow)) == (1, 0)
+
+    if forget_key:
+        idempotency.recent_trips.clear()
+    replay = await client.post("/trips", json=trip_payload(tenant, external_id="ride-1"), headers=tenant.headers)
+    again = await client.post("/trips", json=trip_payload(tenant, external_id="ride-1"), headers=tenant.headers)
+
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json()["invoice"]["amount"] == 20.0
+    assert again.json()["invoice"]["id"] == replay.json()["invoice"]["id"]
+    assert (await _count(InvoiceRow), await _count(BillingJob)) == (1, 1)
+
+
+async def test_queued_replay_keeps_the_single_job(client):
+    tenant = await create_tenant()
+    first = await client.post("/trips", json=trip_payload(tenant, external_id="ride-1"), headers=tenant.headers)
+    replay = await client.post("/trips", json=trip_payload(tenant, external_id="ride-1"), headers=tenant.headers)
+
+    assert first.json()["invoice"] is None
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json()["invoice"] is None
+    assert (await _count(Trip), await _count(BillingJob), await _count(InvoiceRow)) == (1, 1, 0)
+
+
+async def test_bulk_reports_duplicates_within_and_across_uploads(client):
+    tenant = await create_tenant()
+    rows = [
+        trip_payload(tenant, external_id="a"),
+        trip_payload(tenant, external_id="a", distance_km=99.0),
+        trip_payload(tenant, external_id="b"),
+        trip_payload(tenant),
+    ]
+    first = (await client.post("/trips/bulk", json=rows, headers=tenant.headers)).json()
+    assert (first["created"], first["duplicates"], first["failed"]) == (3, 1, 0)
+    results = first["results"]
+    assert [result["status"] for result in results] == ["created", "duplicate", "created", "created"]
+    assert results[1]["trip_id"] == results[0]["trip_id"]
+    assert results[1]["invoice_row_id"] == results[0]["invoice_row_id"]
+    assert results[1]["amount"] == results[0]["amount"] == 20.0
+
+    idempotency.recent_trips.clear()
+    second = (await client.post("/trips/bulk", json=rows[:3], headers=tenant.headers)).json()
+    assert [result["status"] for result in second["results"]] == ["duplicate"] * 3
+    assert [result["trip_id"] for result in second["results"]] == [results[0]["trip_id"]] * 2 + [results[2]["trip_id"]]
+    assert (await _count(Trip), await _count(InvoiceRow)) == (3, 3)
@@ -0,0 +1,118 @@
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import schema
+from app.config import settings
+from app.db import Base, engine
+from app.tasks import rollup
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    path = tmp_path / "migrated.db"
+    monkeypatch.setattr(settings, "database_url", f"sqlite+aiosqlite:///{path}")
+    engine = create_engine(f"sqlite:///{path}")
+    yield engine
+    engine.dispose()
+
+
+def _migrate(database, revision):
+    with database.connect() as conn:
+        command.upgrade(schema.alembic_config(conn), revision)
+
+
+async def _upgrade_in_app():
+    engine = create_async_engine(settings.database_url)
+    try:
+        async with engine.connect() as conn:
+            await schema.upgrade(conn)
+        async with engine.connect() as conn:
+            await schema.require_head(conn)
+    finally:
+        await engine.dispose()
+
+
+def test_head_matches_the_models(database):
+    command.upgrade(schema.alembic_config(), "head")
+    with database.connect() as conn:
+        assert compare_metadata(MigrationContext.configure(conn), Base.metadata) == []
+
+
+def test_a_stamped_baseline_database_upgrades_to_the_models(database):
+    config = schema.alembic_config()
+    command.upgrade(config, "0001")
+    with database.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM alembic_version")
+        conn.exec_driver_sql("INSERT INTO tenants (id, name) VALUES (1, 'acme')")
+        conn.exec_driver_sql("INSERT INTO users (id, tenant_id, email, hashed_password) VALUES (1, 1, 'a@acme.com', '!')")
+        conn.exec_driver_sql("INSERT INTO vendors (id, tenant_id, name, billing_model) VALUES (1, 1, 'cabs', 'trip')")
+        conn.exec_driver_sql(
+            "INSERT INTO trips (id, tenant_id, vendor_id, employee_id, distance_km, duration_minutes, date) "
+            "VALUES (1, 1, 1, 1, 10.0, 30, '2026-09-03 10:00:00.000000')"
+        )
+        conn.exec_driver_sql("INSERT INTO invoice_rows (id, tenant_id, vendor_id, trip_id, amount) VALUES (1, 1, 1, 1, 20.0)")
+
+    # The README's path for a database made by the original create_all.
+    command.stamp(config, "0001")
+    command.upgrade(config, "head")
+    with database.connect() as conn:
+        assert compare_metadata(MigrationContext.configure(conn), Base.metadata) == []
+        created_at = conn.exec_driver_sql("SELECT created_at FROM invoice_rows").scalar()
+    assert created_at == "2026-09-03 10:00:00.000000"
+
+
+@pytest.mark.anyio
+async def test_development_startup_migrates_an_unversioned_baseline(database):
+    # Like the demo moviesync.db: the original tables and no alembic_version.
+    _migrate(database, "0001")
+    with database.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE alembic_version")
+
+    await _upgrade_in_app()
+    with database.connect() as conn:
+        assert "external_id" in {column["name"] for column in inspect(conn).get_columns("trips")}
+
+
+@pytest.mark.anyio
+async def test_development_startup_stamps_a_current_create_all_database(database):
+    Base.metadata.create_all(database)
+    await _upgrade_in_app()
+    with database.connect() as conn:
+        assert schema.current_revision(conn) == schema.head_revision()
+
+
+@pytest.mark.anyio
+async def test_a_database_behind_head_is_reported(database):
+    _migrate(database, "0007")
+    engine = create_async_engine(settings.database_url)
+    try:
+        async with engine.connect() as conn:
+            with pytest.raises(schema.SchemaOutOfDate, match="at revision 0007, expected 0008"):
+                await schema.require_head(conn)
+        with database.begin() as conn:
+            conn.exec_driver_sql("DROP TABLE alembic_version")
+            conn.exec_driver_sql("DROP TABLE monthly_invoices")
+        async with engine.connect() as conn:
+            with pytest.raises(schema.SchemaOutOfDate, match="matches neither"):
+                await schema.upgrade(conn)
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.anyio
+async def test_commands_require_the_schema_at_head():
+    # The test database comes from create_all and has no revision.
+    with pytest.raises(SystemExit, match="at revision none, expected 0008"):
+        await rollup.main("check", None)
+    async with engine.connect() as conn:
+        await conn.run_sync(lambda sync_conn: command.stamp(schema.alembic_config(sync_conn), "head"))
+        await conn.commit()
+    try:
+        assert await rollup.main("check", None) == 0
+    finally:
+        async with engine.begin() as conn:
+            await conn.exec_driver_sql("DROP TABLE alembic_version")
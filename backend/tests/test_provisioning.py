@@ -0,0 +1,41 @@
+import pytest
+
+from app import auth, provisioning
+from app.config import settings
+from tests.conftest import create_tenant
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize(
+    ("cores", "web_workers", "configured", "expected"),
+    [(8, 0, 0, 1), (8, 4, 0, 2), (8, 16, 0, 1), (8, 4, 3, 3)],
+)
+def test_bulk_hash_pool_is_a_share_of_the_cores(monkeypatch, cores, web_workers, configured, expected):
+    monkeypatch.setattr(auth.os, "cpu_count", lambda: cores)
+    monkeypatch.setattr(settings, "web_workers", web_workers)
+    monkeypatch.setattr(settings, "bulk_hash_processes", configured)
+    assert auth.bulk_hash_processes() == expected
+
+
+async def test_bulk_upload_is_capped_per_request(client, monkeypatch):
+    tenant = await create_tenant()
+    calls = []
+
+    async def hash_passwords(passwords, processes=None):
+        calls.append(processes)
+        return [f"hashed:{password}" for password in passwords]
+
+    monkeypatch.setattr(provisioning, "hash_passwords_parallel", hash_passwords)
+    monkeypatch.setattr(settings, "provision_request_max_rows", 2)
+    headers = {**tenant.headers, "Content-Type": "text/csv"}
+    lines = ["email,password"] + [f"{name}@acme.example.com,secret-{name}" for name in "abc"]
+
+    rejected = await client.post("/users/bulk", content="\n".join(lines), headers=headers)
+    assert rejected.status_code == 400
+    assert rejected.json()["detail"] == "CSV has more than 2 rows"
+    assert calls == []
+
+    accepted = await client.post("/users/bulk", content="\n".join(lines[:3]), headers=headers)
+    assert accepted.status_code == 200
+    assert (accepted.json()["created"], calls) == (2, [None])
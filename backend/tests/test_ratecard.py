@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from app.db import AsyncSessionLocal
+from app.ratecard import RATE_CARD_CHANNEL, get_rate_card, rate_card_cache, rate_card_invalidations
+from tests.conftest import create_tenant
+
+pytestmark = pytest.mark.anyio
+
+
+async def _eventually(condition) -> None:
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not met")
+
+
+@pytest.fixture
+async def listener(redis):
+    rate_card_invalidations.start()
+    await _eventually(lambda: rate_card_invalidations.subscribed)
+    yield rate_card_invalidations
+    await rate_card_invalidations.stop()
+
+
+async def test_change_published_by_another_worker_drops_the_card(redis, listener):
+    tenant = await create_tenant()
+    async with AsyncSessionLocal() as db:
+        assert (await get_rate_card(db, tenant.vendor_id)).per_km == 2.0
+    assert rate_card_cache.get(tenant.vendor_id) is not None
+
+    await redis.publish(RATE_CARD_CHANNEL, tenant.vendor_id)
+    await _eventually(lambda: rate_card_cache.get(tenant.vendor_id) is None)
+
+
+async def test_billing_update_is_published(redis, listener, client, monkeypatch):
+    tenant = await create_tenant()
+    async with AsyncSessionLocal() as db:
+        await get_rate_card(db, tenant.vendor_id)
+    received = []
+    publish = redis.publish
+
+    async def record(channel, message):
+        received.append((channel, message))
+        return await publish(channel, message)
+
+    monkeypatch.setattr(redis, "publish", record)
+    response = await client.put(
+        f"/vendors/{tenant.vendor_id}/billing",
+        json={"billing_model": "trip", "billing_config": {"per_km": 3.0}},
+        headers=tenant.headers,
+    )
+    assert response.status_code == 200
+    assert received == [(RATE_CARD_CHANNEL, tenant.vendor_id)]
+    async with AsyncSessionLocal() as db:
+        assert (await get_rate_card(db, tenant.vendor_id)).per_km == 3.0
+
+
+async def test_cache_is_cleared_after_a_missed_subscription(redis, monkeypatch):
+    monkeypatch.setattr(rate_card_invalidations, "retry_seconds", 0.01)
+    # Changes published while the subscription was down were never received.
+    rate_card_cache.set(1, object())
+    pubsub = redis.pubsub
+    failures = []
+
+    def flaky_pubsub(**kwargs):
+        if not failures:
+            failures.append(True)
+            raise ConnectionError("redis down")
+        return pubsub(**kwargs)
+
+    monkeypatch.setattr(redis, "pubsub", flaky_pubsub)
+    rate_card_invalidations.start()
+    try:
+        await _eventually(lambda: rate_card_invalidations.subscribed)
+        assert rate_card_cache.get(1) is None
+    finally:
+        await rate_card_invalidations.stop()
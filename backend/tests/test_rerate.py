@@ -0,0 +1,36 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app import billing, reporting
+from app.db import AsyncSessionLocal
+from app.models import InvoiceRow
+from tests.conftest import create_tenant, create_trip
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_rerate_covers_rows_by_invoice_month(client):
+    tenant = await create_tenant()
+    # A September trip billed on October 1st belongs to October's statement.
+    late = await create_trip(tenant, date=datetime(2026, 9, 30, 23, 50).isoformat())
+    on_time = await create_trip(tenant, date=datetime(2026, 10, 5, 9, 0).isoformat())
+    async with AsyncSessionLocal() as db:
+        await billing.insert_invoice_rows(db, [(tenant.id, tenant.vendor_id, late.id, 20.0)], datetime(2026, 10, 1, 0, 5))
+        await billing.insert_invoice_rows(db, [(tenant.id, tenant.vendor_id, on_time.id, 20.0)], datetime(2026, 10, 5, 9, 30))
+        await db.commit()
+
+    update = {"billing_model": "trip", "billing_config": {"per_km": 3.0}}
+    response = await client.put(f"/vendors/{tenant.vendor_id}/billing", json=update, headers=tenant.headers)
+    assert response.status_code == 200
+
+    url = f"/vendors/{tenant.vendor_id}/rerate"
+    september = (await client.post(url, params={"year": 2026, "month": 9}, headers=tenant.headers)).json()
+    october = (await client.post(url, params={"year": 2026, "month": 10}, headers=tenant.headers)).json()
+    assert (september["rows"], october["rows"], october["total"]) == (0, 2, 60.0)
+
+    async with AsyncSessionLocal() as db:
+        assert (await db.scalars(select(InvoiceRow.amount))).all() == [30.0, 30.0]
+        statement = await reporting._query_vendor_statement(db, tenant.vendor_id, 2026, 10)
+    assert statement["total"] == 60.0
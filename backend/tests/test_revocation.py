@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+from app import revocation
+from app.db import AsyncSessionLocal
+from tests.conftest import auth_headers, create_tenant
+
+pytestmark = pytest.mark.anyio
+
+
+async def _revoke(user_id: int) -> int:
+    async with AsyncSessionLocal() as db:
+        return await revocation.revoke_user_tokens(db, user_id)
+
+
+async def test_concurrent_first_revocations_both_count():
+    tenant = await create_tenant()
+    versions = await asyncio.gather(*(_revoke(tenant.employee.id) for _ in range(3)))
+    assert sorted(versions) == [1, 2, 3]
+    async with AsyncSessionLocal() as db:
+        assert await revocation.current_token_version(db, tenant.employee.id) == 3
+
+
+async def test_revoked_tokens_are_rejected(client):
+    tenant = await create_tenant()
+    headers = auth_headers(tenant.employee)
+    assert (await client.get("/me", headers=headers)).status_code == 200
+
+    response = await client.post(f"/users/{tenant.employee.id}/revoke-tokens", headers=tenant.headers)
+    assert response.json() == {"user_id": tenant.employee.id, "token_version": 1}
+    assert (await client.get("/me", headers=headers)).status_code == 401
@@ -0,0 +1,124 @@
+from datetime import datetime
+
+import pytest
+
+from app import billing, reporting
+from app.db import AsyncSessionLocal
+from tests.conftest import create_tenant, create_trip
+
+pytestmark = pytest.mark.anyio
+
+
+async def _bill(tenant, **overrides):
+    trip = await create_trip(tenant, **overrides)
+    async with AsyncSessionLocal() as db:
+        return await billing.bill_trip_and_store(db, trip)
+
+
+async def _expected(vendor_id: int, now: datetime) -> dict:
+    async with AsyncSessionLocal() as db:
+        return await reporting._query_vendor_statement(db, vendor_id, now.year, now.month)
+
+
+async def test_cached_statement_matches_query_and_takes_appends(redis):
+    tenant = await create_tenant()
+    now = datetime.utcnow()
+    for distance in (10.0, 12.5, 3.25):
+        await _bill(tenant, distance_km=distance)
+
+    assert await reporting.vendor_monthly_statement(tenant.vendor_id, now.year, now.month) == await _expected(tenant.vendor_id, now)
+    assert await redis.hget(f"reports:vendor:{tenant.vendor_id}:{now.year}:{now.month}:meta", "complete") == "1"
+
+    catchup = reporting.statement_catchup_rows.value
+    await _bill(tenant, distance_km=7.0)
+    statement = await reporting.vendor_monthly_statement(tenant.vendor_id, now.year, now.month)
+    assert statement == await _expected(tenant.vendor_id, now)
+    assert statement["csv"].count("\r\n") == 5
+    assert reporting.statement_catchup_rows.value == catchup
+
+
+async def test_rows_committed_during_a_build_are_kept(redis, monkeypatch):
+    # The build queries before row 1 commits, and row 1's append runs before the build
+    # is stored. Row 2 is appended afterwards; neither may go missing.
+    tenant = await create_tenant()
+    now = datetime.utcnow()
+    statement_rows = reporting._statement_rows
+
+    async def rows_then_commit(*args):
+        rows = await statement_rows(*args)
+        await _bill(tenant, distance_km=10.0)
+        return rows
+
+    monkeypatch.setattr(reporting, "_statement_rows", rows_then_commit)
+    first = await reporting.vendor_monthly_statement(tenant.vendor_id, now.year, now.month)
+    assert first["total"] == 0
+    monkeypatch.setattr(reporting, "_statement_rows", statement_rows)
+
+    await _bill(tenant, distance_km=20.0)
+    catchup = reporting.statement_catchup_rows.value
+    statement = await reporting.vendor_monthly_statement(tenant.vendor_id, now.year, now.month)
+    assert statement == await _expected(tenant.vendor_id, now)
+    assert statement["total"] == 60.0
+    assert reporting.statement_catchup_rows.value == catchup
+
+
+async def test_appends_in_any_id_order(redis):
+    tenant = await create_tenant()
+    now = datetime.utcnow()
+    await _bill(tenant)
+    await reporting.vendor_monthly_statement(tenant.vendor_id, now.year, now.month)
+
+    first, second = await create_trip(tenant), await create_trip(tenant)
+    async with AsyncSessionLocal() as db:
+        entries = [(tenant.id, tenant.vendor_id, first.id, 1.5), (tenant.id, tenant.vendor_id, second.id, 2.5)]
+        low, high = await billing.insert_invoice_rows(db, entries, now)
+        await db.commit()
+    # As when two writers commit out of id order: the higher id is appended first.
+    await reporting.append_statement_rows([(high, tenant.vendor_id, second.id, 2.5, "auto", now)])
+    await reporting.append_statement_rows([(low, tenant.vendor_id, first.id, 1.5, "auto", now)])
+    await reporting.append_statement_rows([(low, tenant.vendor_id, first.id, 1.5, "auto", now)])
+
+    catchup = reporting.statement_catchup_rows.value
+    statement = await reporting.vendor_monthly_statement(tenant.vendor_id, now.year, now.month)
+    assert statement == await _expected(tenant.vendor_id, now)
+    assert reporting.statement_catchup_rows.value == catchup
+
+
+async def test_invalidation_during_a_build_discards_it(redis, monkeypatch):
+    tenant = await create_tenant()
+    now = datetime.utcnow()
+    await _bill(tenant)
+    statement_rows = reporting._statement_rows
+
+    async def rows_then_invalidate(*args):
+        rows = await statement_rows(*args)
+        await reporting.invalidate_vendor_statements(tenant.vendor_id, [(now.year, now.month)])
+        return rows
+
+    monkeypatch.setattr(reporting, "_statement_rows", rows_then_invalidate)
+    await reporting.vendor_monthly_statement(tenant.vendor_id, now.year, now.month)
+    rows_key, meta_key, building_key = reporting.statement_keys(tenant.vendor_id, now.year, now.month)
+    assert await redis.exists(rows_key, meta_key, building_key) == 0
+
+
+async def test_compaction_rebuilds_a_drifted_statement(redis):
+    tenant = await create_tenant()
+    now = datetime.utcnow()
+    await _bill(tenant)
+    await _bill(tenant, distance_km=4.0)
+    await reporting.vendor_monthly_statement(tenant.vendor_id, now.year, now.month)
+    assert (await reporting.compact_statements())["rebuilt"] == []
+
+    meta_key = reporting.statement_keys(tenant.vendor_id, now.year, now.month)[1]
+    await redis.hincrby(meta_key, "total_cents", 100)
+    result = await reporting.compact_statements()
+    assert result["checked"] == 1
+    assert [(entry["vendor_id"], entry["cached"][1]) for entry in result["rebuilt"]] == [(tenant.vendor_id, 2900)]
+    assert await reporting.vendor_monthly_statement(tenant.vendor_id, now.year, now.month) == await _expected(tenant.vendor_id, now)
+
+
+async def test_statement_without_redis_uses_the_month_query():
+    tenant = await create_tenant()
+    now = datetime.utcnow()
+    await _bill(tenant)
+    assert await reporting.vendor_monthly_statement(tenant.vendor_id, now.year, now.month) == await _expected(tenant.vendor_id, now)
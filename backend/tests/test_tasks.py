@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import pytest
+
+from tests.conftest import auth_headers, create_tenant, create_trip
+
+pytestmark = pytest.mark.anyio
+
+
+async def _pages(client, headers, **params):
+    pages, cursor = [], None
+    while True:
+        query = {**params, **({"cursor": cursor} if cursor else {})}
+        response = await client.get("/tasks", params=query, headers=headers)
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+
+
+async def test_cursor_pages_cover_every_trip_once(client):
+    tenant = await create_tenant()
+    other = await create_tenant("globex")
+    await create_trip(other)
+    # Two trips share a date, so the id breaks the tie between pages.
+    dates = [datetime(2026, 10, day, 8, 0) for day in (1, 2, 2, 3, 4)]
+    trips = [await create_trip(tenant, date=date.isoformat()) for date in dates]
+
+    pages = await _pages(client, tenant.headers, limit=2)
+    assert [len(page) for page in pages] == [2, 2, 1]
+    expected = sorted(trips, key=lambda trip: (trip.date, trip.id), reverse=True)
+    assert [item["id"] for page in pages for item in page] == [trip.id for trip in expected]
+
+
+async def test_a_full_last_page_ends_with_an_empty_one(client):
+    tenant = await create_tenant()
+    for _ in range(2):
+        await create_trip(tenant)
+    assert [len(page) for page in await _pages(client, tenant.headers, limit=2)] == [2, 0]
+
+
+async def test_fields_and_employee_scope(client):
+    tenant = await create_tenant()
+    await create_trip(tenant, external_id="ride-1")
+    await create_trip(tenant, employee_id=tenant.admin.id)
+
+    pages = await _pages(client, auth_headers(tenant.employee), fields="id,external_id", user_id=tenant.admin.id)
+    assert [list(item) for page in pages for item in page] == [["id", "external_id"]]
+    assert pages[0][0]["external_id"] == "ride-1"
+
+
+async def test_bad_cursor_and_unknown_fields_are_rejected(client):
+    tenant = await create_tenant()
+    cursor = await client.get("/tasks", params={"cursor": "not-a-cursor"}, headers=tenant.headers)
+    fields = await client.get("/tasks", params={"fields": "id,secret"}, headers=tenant.headers)
+    assert (cursor.status_code, fields.status_code) == (400, 400)
+    assert fields.json()["detail"] == "Unknown fields: secret"
@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import select
+
+from app.config import settings
+from app.db import AsyncSessionLocal
+from app.models import InvoiceRow, Trip
+from tests.conftest import create_tenant, trip_payload
+
+pytestmark = pytest.mark.anyio
+
+
+async def _tenants_of(model):
+    async with AsyncSessionLocal() as db:
+        return sorted((await db.scalars(select(model.tenant_id))).all())
+
+
+async def test_bulk_rows_join_the_callers_tenant(client):
+    tenant, other = await create_tenant(), await create_tenant("globex")
+    rows = [
+        trip_payload(tenant, tenant_id=other.id),
+        trip_payload(tenant, vendor_id=other.vendor_id, tenant_id=other.id),
+        trip_payload(tenant, vendor_id=other.vendor_id),
+    ]
+    body = (await client.post("/trips/bulk", json=rows, headers=tenant.headers)).json()
+
+    assert [result["status"] for result in body["results"]] == ["created", "error", "error"]
+    assert [result.get("error") for result in body["results"][1:]] == ["Vendor not found"] * 2
+    assert await _tenants_of(Trip) == await _tenants_of(InvoiceRow) == [tenant.id]
+
+
+@pytest.mark.parametrize("billing_mode", ["inline", "queue"])
+async def test_single_trip_joins_the_callers_tenant(client, monkeypatch, billing_mode):
+    monkeypatch.setattr(settings, "billing_mode", billing_mode)
+    tenant, other = await create_tenant(), await create_tenant("globex")
+
+    created = await client.post("/trips", json=trip_payload(tenant, tenant_id=other.id), headers=tenant.headers)
+    foreign = await client.post("/trips", json=trip_payload(tenant, vendor_id=other.vendor_id), headers=tenant.headers)
+
+    assert created.status_code == 200
+    assert created.json()["tenant_id"] == tenant.id
+    assert (foreign.status_code, foreign.json()["detail"]) == (404, "Vendor not found")
+    assert await _tenants_of(Trip) == [tenant.id]
@@ -1,6 +1,6 @@
 "use client";
 
-import { FormEvent, useEffect, useMemo, useState } from "react";
+import { FormEvent, useEffect, useState } from "react";
 
 import { BillingConfigForm } from "../components/billing-config-form";
 import { Dashboard } from "../components/dashboard";
@@ -11,7 +11,7 @@ import {
   fetchUsers,
   login,
   signup,
-  type Task,
+  type TaskRow,
   type User,
 } from "../lib/api";
 
@@ -26,10 +26,12 @@ export default function Home() {
   const [token, setToken] = useState<string | null>(null);
   const [status, setStatus] = useState<string | null>(null);
   const [currentUser, setCurrentUser] = useState<User | null>(null);
-  const [tasks, setTasks] = useState<Task[]>([]);
+  const [tasks, setTasks] = useState<TaskRow[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [userOptions, setUserOptions] = useState<User[]>([]);
   const [selectedUserId, setSelectedUserId] = useState("all");
   const [loadingTasks, setLoadingTasks] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     const cached = typeof window !== "undefined" ? localStorage.getItem(TOKEN_STORAGE_KEY) : null;
@@ -89,13 +91,14 @@ export default function Home() {
     async function loadTasks() {
       if (!token || !currentUser) {
         setTasks([]);
+        setNextCursor(null);
         return;
       }
       setLoadingTasks(true);
       try {
-        const filterForAdmin = currentUser.is_admin && selectedUserId !== "all" ? Number(selectedUserId) : undefined;
-        const data = await fetchTasks(token, filterForAdmin);
-        setTasks(data);
+        const page = await fetchTasks(token, { userId: taskFilter() });
+        setTasks(page.tasks);
+        setNextCursor(page.nextCursor);
       } catch (error) {
         console.error(error);
         setStatus("Unable to load tasks for this user");
@@ -106,6 +109,25 @@ export default function Home() {
     loadTasks();
   }, [token, currentUser, selectedUserId]);
 
+  function taskFilter() {
+    return currentUser?.is_admin && selectedUserId !== "all" ? Number(selectedUserId) : undefined;
+  }
+
+  async function handleLoadMore() {
+    if (!token || !nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchTasks(token, { userId: taskFilter(), cursor: nextCursor });
+      setTasks((loaded) => [...loaded, ...page.tasks]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error(error);
+      setStatus("Unable to load more tasks");
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   async function handleLogin(e: FormEvent) {
     e.preventDefault();
     setStatus("Signing in...");
@@ -141,6 +163,7 @@ export default function Home() {
     setToken(null);
     setCurrentUser(null);
     setTasks([]);
+    setNextCursor(null);
     setSelectedUserId("all");
     setStatus("Signed out.");
   }
@@ -163,7 +186,6 @@ export default function Home() {
     }
   }, [canViewSwitcher, selectedUserId, userOptions]);
 
-  const visibleTasks = useMemo(() => tasks.slice(0, 100), [tasks]);
   const isAuthenticated = Boolean(token && currentUser);
 
   const authForm = (
@@ -301,18 +323,18 @@ export default function Home() {
           <div className="rounded-2xl border bg-white/95 p-6 shadow-sm backdrop-blur">
             <div className="flex items-center justify-between">
               <h2 className="text-xl font-semibold">Recent trips</h2>
-              <span className="text-xs uppercase tracking-wide text-slate-500">{visibleTasks.length} entries</span>
+              <span className="text-xs uppercase tracking-wide text-slate-500">{tasks.length}{nextCursor ? "+" : ""} entries</span>
             </div>
             <p className="text-sm text-muted-foreground">
               Showing activity for {viewerLabel}.
             </p>
             {loadingTasks && <p className="mt-4 text-sm text-muted-foreground">Loading tasks…</p>}
-            {!loadingTasks && visibleTasks.length === 0 && (
+            {!loadingTasks && tasks.length === 0 && (
               <p className="mt-4 text-sm text-muted-foreground">No trips recorded for this view.</p>
             )}
-            {!loadingTasks && visibleTasks.length > 0 && (
+            {!loadingTasks && tasks.length > 0 && (
               <ul className="mt-4 space-y-3">
-                {visibleTasks.map((task) => (
+                {tasks.map((task) => (
                   <li key={task.id} className="rounded-xl border bg-slate-50 p-4">
                     <div className="flex items-center justify-between">
                       <div>
@@ -327,6 +349,16 @@ export default function Home() {
                 ))}
               </ul>
             )}
+            {!loadingTasks && nextCursor && (
+              <button
+                type="button"
+                onClick={handleLoadMore}
+                disabled={loadingMore}
+                className="mt-4 w-full rounded-md border px-4 py-2 text-sm font-medium text-slate-600 hover:bg-slate-50 disabled:opacity-60"
+              >
+                {loadingMore ? "Loading…" : "Load more"}
+              </button>
+            )}
           </div>
 
           <div className="space-y-4 rounded-2xl border bg-white/95 p-6 shadow-sm backdrop-blur">
@@ -116,9 +116,28 @@ export async function fetchUsers(token: string) {
   });
 }
 
-export async function fetchTasks(token: string, userId?: number) {
-  const params = userId ? `?user_id=${userId}` : "";
-  return request<Task[]>(`/tasks${params}`, {
+// The trip list shows one page at a time, with only the columns it renders.
+const TASK_PAGE_SIZE = 100;
+const TASK_FIELDS = ["id", "distance_km", "duration_minutes", "date", "extra_km", "extra_hours"] as const;
+
+export type TaskRow = Pick<Task, (typeof TASK_FIELDS)[number]>;
+export type TaskPage = { tasks: TaskRow[]; nextCursor: string | null };
+
+export async function fetchTasks(
+  token: string,
+  { userId, cursor }: { userId?: number; cursor?: string | null } = {}
+): Promise<TaskPage> {
+  // /tasks is keyset-paginated: pass nextCursor back to get the following page.
+  const params = new URLSearchParams({ limit: `${TASK_PAGE_SIZE}`, fields: TASK_FIELDS.join(",") });
+  if (userId) params.set("user_id", `${userId}`);
+  if (cursor) params.set("cursor", cursor);
+  const response = await fetch(`${API_BASE_URL}/tasks?${params.toString()}`, {
     headers: { Authorization: `Bearer ${token}` },
+    cache: "no-store",
   });
+  if (!response.ok) {
+    const message = await response.text();
+    throw new Error(message || "API request failed");
+  }
+  return { tasks: (await response.json()) as TaskRow[], nextCursor: response.headers.get("X-Next-Cursor") };
 }